@@ -1,5 +1,7 @@
 from .action import AbstractAction
 from .action_manager import AbstractActionManager
 from .discrete_action_manager import DiscreteActionManager
+from .continuous_exposition_action_manager import ContinuousExpositionActionManager
 from .discrete_exposition_action import DiscreteExpositionAction
-from .discrete_do_nothing import DiscreteDoNothing
\ No newline at end of file
+from .discrete_do_nothing import DiscreteDoNothing
+from .rebalancing import solve_rebalancing, rebalance
\ No newline at end of file
@@ -0,0 +1,75 @@
+import numpy as np
+from gymnasium.spaces import Space, Box
+from typing import List
+
+from ..core import Asset
+from .action_manager import AbstractActionManager
+from .rebalancing import rebalance
+
+
+class ContinuousExpositionActionManager(AbstractActionManager):
+    """
+    The action is the target exposition of assets, as a Box vector (one weight per asset, in fraction of the portfolio valuation).
+    The quote asset takes the rest (1 - sum of the weights). The weights are mapped directly onto the vector rebalancing
+    (see actions.rebalancing), without building any action object.
+
+    Parameters
+    ----------
+    assets : List[Asset]
+        Assets of the action vector. The quote asset must not be one of them.
+    quote_asset : Asset
+    mode : str
+        "simplex" : weights in [0, 1], scaled down to sum to 1 at most (long only).
+        "leverage" : weights in [-max_leverage, max_leverage], scaled down so that the gross exposition (sum of absolute weights) is at most max_leverage.
+    max_leverage : float
+        Only used in "leverage" mode.
+    min_turnover : float
+        Orders below min_turnover (in fraction of the portfolio valuation) are skipped.
+    """
+    def __init__(self, assets : List[Asset], quote_asset : Asset, mode : str = "simplex", max_leverage : float = 1., min_turnover : float = 0.) -> None:
+        super().__init__()
+        if mode not in ["simplex", "leverage"]: raise ValueError("mode must be in ['simplex', 'leverage'].")
+        if quote_asset in assets: raise ValueError(f"The quote asset {quote_asset} takes the rest of the exposition : it must not be in assets.")
+        if max_leverage <= 0: raise ValueError("max_leverage must be positive.")
+        self.assets = list(assets)
+        self.quote_asset = quote_asset
+        self.mode = mode
+        self.max_leverage = max_leverage
+        self.min_turnover = min_turnover
+
+    async def reset(self, seed = None):
+        await super().reset(seed = seed)
+        self.exchange_manager = self.get_trading_env().exchange_manager
+        asset_indexes = self.exchange_manager.asset_indexes
+        self.indexes = np.array([asset_indexes[asset] for asset in self.assets], dtype= int)
+        self.quote_index = asset_indexes[self.quote_asset]
+        self.target_vector = np.zeros(len(asset_indexes))
+
+    def action_space(self) -> Space:
+        if self.mode == "simplex":
+            return Box(low= 0, high= 1, shape= (len(self.assets),), dtype= np.float32)
+        return Box(low= -self.max_leverage, high= self.max_leverage, shape= (len(self.assets),), dtype= np.float32)
+
+    def get_weights(self, action) -> np.ndarray:
+        weights = np.nan_to_num(np.asarray(action, dtype= float).reshape(len(self.assets)))
+        if self.mode == "simplex":
+            weights = np.clip(weights, 0, 1)
+            total = weights.sum()
+        else:
+            weights = np.clip(weights, -self.max_leverage, self.max_leverage)
+            total = np.abs(weights).sum() / self.max_leverage
+        if total > 1: weights = weights / total
+        return weights
+
+    async def execute(self, action) -> None:
+        await super().execute(action= action)
+        weights = self.get_weights(action)
+        self.target_vector[:] = 0
+        self.target_vector[self.indexes] = weights
+        self.target_vector[self.quote_index] = 1 - weights.sum()
+        return await rebalance(
+            trading_env= self.get_trading_env(),
+            target_exposition= self.target_vector,
+            quote_asset= self.quote_asset,
+            min_turnover= self.min_turnover
+        )
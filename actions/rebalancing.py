@@ -0,0 +1,73 @@
+import numpy as np
+from datetime import datetime
+from typing import List, Tuple, TYPE_CHECKING
+
+from ..core import Asset, Pair, Value
+
+if TYPE_CHECKING:
+    from ..environments import AbstractTradingEnv
+
+
+def solve_rebalancing(current_exposition : np.ndarray, target_exposition : np.ndarray, min_turnover : float = 0.) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Netted orders moving current_exposition to target_exposition (vectors of the same assets, in fraction of the portfolio valuation).
+    Each asset is only decreased or only increased. The increases are matched with the decreases in order, on the cumulative sums of both,
+    which needs at most (nb increases + nb decreases - 1) orders.
+    Orders smaller than min_turnover (in fraction of the valuation) are skipped, to avoid burning fees in no-op trades.
+
+    Returns (decrease_indexes, increase_indexes, fractions) : order i sells the asset at decrease_indexes[i] to buy
+    the asset at increase_indexes[i], for fractions[i] of the valuation.
+    """
+    difference = np.asarray(target_exposition, dtype= float) - np.asarray(current_exposition, dtype= float)
+    increases, decreases = np.flatnonzero(difference > 0), np.flatnonzero(difference < 0)
+    if len(increases) == 0 or len(decreases) == 0:
+        return np.empty(0, dtype= int), np.empty(0, dtype= int), np.empty(0, dtype= float)
+
+    increase_cumsum, decrease_cumsum = np.cumsum(difference[increases]), np.cumsum(-difference[decreases])
+    total = min(increase_cumsum[-1], decrease_cumsum[-1])
+
+    # Each segment between two consecutive cumulative sums is an order between one increase and one decrease
+    bounds = np.unique(np.concatenate([increase_cumsum, decrease_cumsum]))
+    bounds = np.append(bounds[bounds < total], total)
+    starts = np.concatenate([[0.], bounds[:-1]])
+    middles = (starts + bounds) / 2
+    fractions = bounds - starts
+    keep = fractions > max(min_turnover, 1E-12) # Segments of a few ulps come from rounding
+    return (
+        decreases[np.searchsorted(decrease_cumsum, middles[keep])],
+        increases[np.searchsorted(increase_cumsum, middles[keep])],
+        fractions[keep]
+    )
+
+
+async def rebalance(trading_env : "AbstractTradingEnv", target_exposition : np.ndarray, quote_asset : Asset, min_turnover : float = 0.):
+    """
+    Rebalance the portfolio to target_exposition, a vector indexed by exchange_manager.asset_indexes, in a single batch of market orders.
+    Returns the OrderFillsResponse of the batch, or [] if there is nothing to trade.
+    """
+    exchange_manager = trading_env.exchange_manager
+    date = await trading_env.time_manager.get_current_datetime()
+    report = await trading_env.portfolio_manager.report(
+        portfolio= await exchange_manager.get_portfolio(),
+        date= date,
+        quote_asset= quote_asset
+    )
+    total_valuation = report.total.amount
+
+    current_exposition = np.zeros(len(exchange_manager.asset_indexes))
+    for asset, valuation in report.valuations.items():
+        current_exposition[exchange_manager.asset_indexes[asset]] = valuation.amount / total_valuation
+
+    decrease_indexes, increase_indexes, fractions = solve_rebalancing(current_exposition, target_exposition, min_turnover= min_turnover)
+    if len(fractions) == 0: return []
+
+    # Quantities are expressed in the asset to decrease : only their prices are needed
+    assets = list(exchange_manager.asset_indexes.keys())
+    prices = await exchange_manager.get_prices(quote_asset= quote_asset, date= date, assets= [assets[i] for i in set(decrease_indexes.tolist())])
+    quantities = - fractions * total_valuation / prices[decrease_indexes]
+
+    orders : List[Tuple[Pair, Value]] = []
+    for decrease_index, increase_index, quantity in zip(decrease_indexes.tolist(), increase_indexes.tolist(), quantities.tolist()):
+        asset_to_decrease, asset_to_increase = assets[decrease_index], assets[increase_index]
+        orders.append((Pair(asset= asset_to_increase, quote_asset= asset_to_decrease), Value(quantity, asset_to_decrease)))
+    return await exchange_manager.market_orders(orders)
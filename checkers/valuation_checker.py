@@ -21,13 +21,7 @@ class ValuationChecker(AbstractChecker):
 
     
     async def check(self) -> Tuple[bool, bool]:
-        portfolio = await self.exchange_manager.get_portfolio()
-        date = await self.time_manager.get_current_datetime()
-        valuation = await self.portfolio_manager.valuation(
-            portfolio = portfolio,
-            date = date,
-            quote_asset= self.quote_asset
-        )
+        valuation = await self.get_step_context().get_valuation(quote_asset= self.quote_asset)
         terminated = valuation <= self.valuation_threeshold
 
         truncated, trainable = False, True
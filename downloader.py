@@ -6,6 +6,8 @@ import numpy as np
 import nest_asyncio
 nest_asyncio.apply()
 
+from .utils.rate_limiter import RateLimiter
+
 EXCHANGE_LIMIT_RATES = {
     "bitfinex2": {
         "limit":10_000,
@@ -24,7 +26,8 @@ EXCHANGE_LIMIT_RATES = {
     }
 }
 
-async def __ohlcv(exchange, symbol, timeframe, limit, step_since, timedelta):
+async def __ohlcv(exchange, symbol, timeframe, limit, step_since, timedelta, rate_limiter : RateLimiter):
+    await rate_limiter.acquire()
     result = await exchange.fetch_ohlcv(symbol = symbol, timeframe= timeframe, limit= limit, since=step_since)
     result_df = pd.DataFrame(result, columns=["timestamp_open", "open", "high", "low", "close", "volume"])
     for col in ["open", "high", "low", "close", "volume"]:
@@ -36,18 +39,14 @@ async def __ohlcv(exchange, symbol, timeframe, limit, step_since, timedelta):
 
 async def __download_symbol(exchange, symbol, timeframe = '5m', since = int(datetime.datetime(year=2020, month= 1, day= 1).timestamp()*1E3), until = int(datetime.datetime.now().timestamp()*1E3), limit = 1000, pause_every = 10, pause = 1):
     timedelta = int(pd.Timedelta(timeframe).to_timedelta64()/1E6)
+    # Requests queue in the limiter shared by every download from this exchange : at most pause_every requests every pause seconds
+    rate_limiter = RateLimiter.get_shared(key= f"downloader-{exchange.id}", limits= [(pause_every, pause)])
     tasks = []
-    results = []
     for step_since in range(since, until, limit * timedelta):
         tasks.append(
-            asyncio.create_task(__ohlcv(exchange, symbol, timeframe, limit, step_since, timedelta))
+            asyncio.create_task(__ohlcv(exchange, symbol, timeframe, limit, step_since, timedelta, rate_limiter))
         )
-        if len(tasks) >= pause_every:
-            results.extend(await asyncio.gather(*tasks))
-            await asyncio.sleep(pause)
-            tasks = []
-    if len(tasks) > 0 :
-        results.extend(await asyncio.gather(*tasks))
+    results = await asyncio.gather(*tasks)
     final_df = pd.concat(results, ignore_index= True)
     final_df = final_df.loc[(since < final_df["timestamp_open"]) & (final_df["timestamp_open"] < until), :]
     del final_df["timestamp_open"]
@@ -23,6 +23,11 @@ class AbstractEnvironmentElement(ABC):
     def simulation_warmup_steps(self) -> int:
         return 0
 
+    @property
+    def history_pairs(self) -> list:
+        """Pairs whose past bars the element requests (e.g during its warmup). In PRODUCTION, their history is backfilled at reset."""
+        return []
+
     def set_trading_env(self, trading_env):
         self.__trading_env = trading_env
 
@@ -38,6 +43,10 @@ class AbstractEnvironmentElement(ABC):
             """)
         return self.__trading_env
 
+    def get_step_context(self) -> "StepContext":
+        """Facts of the current step (date, portfolio, valuation, tickers ...) shared by every element."""
+        return self.get_trading_env().step_context
+
     @property
     def order_index(self):
         return 0
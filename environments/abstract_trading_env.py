@@ -7,7 +7,7 @@ from typing import List
 from ..time_managers import AbstractTimeManager
 from ..exchanges import AbstractExchange
 from ..renderers import AbstractRenderer
-from ..managers import PortfolioManager
+from ..managers import PortfolioManager, StepContext
 from ..checkers import AbstractChecker, checker_deep_search
 from ..element import AbstractEnvironmentElement, element_deep_search, Mode
 from ..infos_manager import InfosManager
@@ -57,8 +57,10 @@ class AbstractTradingEnv(gym.Env, AbstractChecker, AbstractEnvironmentElement, A
         
         for element in self.env_elements:
             warm_steps_needed = max(warm_steps_needed, element.simulation_warmup_steps)
+        self.warmup_steps = warm_steps_needed
             
         # Reset all environment elements.
+        self.step_context = StepContext(trading_env= self)
         for element in self.env_elements:
             await element.__reset__(seed = seed)
         
@@ -83,7 +85,8 @@ class AbstractTradingEnv(gym.Env, AbstractChecker, AbstractEnvironmentElement, A
     async def __step__(self):
         # Perform a step in the environment
         await self.time_manager.step()
-        current_date = await self.time_manager.get_current_datetime()
+        self.step_context = StepContext(trading_env= self)
+        current_date = await self.step_context.get_date()
         for element in self.env_elements:
             await element.__forward__(date= current_date)
 
@@ -1,4 +1,5 @@
 from .exchange import AbstractExchange
 from .simulation_exchange import SimulationExchange
 from .production_exchange import BinanceProductionExchange
-from .exceptions import PairNotFound
\ No newline at end of file
+from .exceptions import PairNotFound
+from .replay import RecordingClient, ReplayClient
\ No newline at end of file
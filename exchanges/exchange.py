@@ -1,11 +1,12 @@
 from abc import ABC, abstractmethod, abstractproperty
 from decimal import Decimal
 from datetime import datetime
-from typing import List
+from typing import List, Tuple
+import numpy as np
 
 from ..core import Pair, Quotation, Portfolio, Value
 from ..element import AbstractEnvironmentElement
-from .responses import OrderResponse, TickerResponse
+from .responses import OrderResponse, OrderFillsResponse, TickerResponse, TickersResponse
 from .exceptions import PairNotFound
 
 class AbstractExchange(AbstractEnvironmentElement, ABC):
@@ -22,6 +23,37 @@ class AbstractExchange(AbstractEnvironmentElement, ABC):
     async def get_ticker(self, pair : Pair, date) -> TickerResponse:
         ...
 
+    async def get_bars(self, pairs : List[Pair], date) -> np.ndarray:
+        """Bars of several pairs at date, as a (len(pairs), 5) array of open, high, low, close and volume.
+        Like get_ticker, the pairs must be given in the direction listed by the exchange : there is no fallback on the reversed pair
+        (unlike get_quotation, a reversed volume can not be derived from the bar). PairNotFound is raised otherwise.
+        By default, the tickers are requested concurrently (in PRODUCTION). Exchanges able to batch them should override this method."""
+        tickers = await self.gather(*[
+            self.get_ticker(pair= pair, date= date) for pair in pairs
+        ])
+        bars = np.empty((len(pairs), 5), dtype= float)
+        for i, ticker in enumerate(tickers):
+            bars[i] = (ticker.open.amount, ticker.high.amount, ticker.low.amount, ticker.close.amount, ticker.volume.amount)
+        return bars
+
+    async def get_tickers(self, pairs : List[Pair], dates : List[datetime]) -> TickersResponse:
+        """Bars of several pairs (in the listed direction, see get_bars) at several dates, in a columnar TickersResponse.
+        By default, get_bars is called for every date (concurrently in PRODUCTION)."""
+        bars = await self.gather(*[
+            self.get_bars(pairs= pairs, date= date) for date in dates
+        ])
+        return TickersResponse(
+            status_code = 200,
+            dates = list(dates),
+            pairs = list(pairs),
+            bars = np.stack(bars) if len(bars) > 0 else np.empty((0, len(pairs), 5), dtype= float)
+        )
+
+    async def backfill(self, pairs : List[Pair], start : datetime, end : datetime) -> None:
+        """Fetch in advance the bars of pairs between start and end, so that the following get_ticker calls over this period are served locally.
+        Nothing to do by default."""
+        pass
+
     async def get_quotation(self, pair : Pair, date) -> Quotation:
         try:
             return (await self.get_ticker(pair = pair, date= date)).price
@@ -34,4 +66,17 @@ class AbstractExchange(AbstractEnvironmentElement, ABC):
 
     @abstractmethod
     async def market_order(self, quantity : Value, pair : Pair) -> OrderResponse:
-        ...
\ No newline at end of file
+        ...
+
+    async def market_orders(self, orders : List[Tuple[Pair, Value]]) -> OrderFillsResponse:
+        """Perform several market orders, given as (pair, quantity) couples, and return a columnar record of the fills.
+        By default, the orders are sent one by one. Exchanges able to batch them should override this method."""
+        date = await self.get_trading_env().time_manager.get_current_datetime()
+        order_responses = await self.gather(*[
+            self.market_order(quantity= quantity, pair= pair) for pair, quantity in orders
+        ])
+        return OrderFillsResponse.from_order_responses(
+            date = date,
+            pairs = [pair for pair, quantity in orders],
+            order_responses = order_responses
+        )
\ No newline at end of file
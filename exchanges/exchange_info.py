@@ -0,0 +1,99 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Optional
+from warnings import warn
+
+
+@dataclass
+class SymbolFilters:
+    """Trading rules of a symbol, pre-parsed from the exchange info document. Only the rules of market orders are kept (no price filter)."""
+    symbol : str
+    base_asset : str
+    quote_asset : str
+    step_size : Decimal
+    min_quantity : Decimal
+    min_notional : Decimal
+
+    @classmethod
+    def from_symbol_info(cls, symbol_info : dict) -> "SymbolFilters":
+        filters = {_filter["filterType"] : _filter for _filter in symbol_info.get("filters", [])}
+        lot_size = filters.get("LOT_SIZE", {})
+        notional = filters.get("NOTIONAL", filters.get("MIN_NOTIONAL", {}))
+        return cls(
+            symbol = symbol_info["symbol"],
+            base_asset = symbol_info["baseAsset"],
+            quote_asset = symbol_info["quoteAsset"],
+            # Normalize helps get rid of the excess zeros
+            step_size = Decimal(lot_size.get("stepSize", "0")).normalize(),
+            min_quantity = Decimal(lot_size.get("minQty", "0")).normalize(),
+            min_notional = Decimal(notional.get("minNotional", "0")).normalize(),
+        )
+
+
+class ExchangeInfoCache:
+    """
+    Keep the exchange info document in memory for ttl seconds, with its symbols filters pre-parsed.
+    Once started, a background task refreshes it before it expires, so that reading it
+    never requires a request on the critical path. If a refresh fails, the previous document is kept.
+    """
+    def __init__(self, client, ttl : float = 3600, refresh_ratio : float = 0.8) -> None:
+        self.client = client
+        self.ttl = ttl
+        self.refresh_ratio = refresh_ratio
+        self.info : dict = None
+        self.symbol_infos : Dict[str, dict] = {}
+        self.symbol_filters : Dict[str, SymbolFilters] = {}
+        self.last_update = None
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    @property
+    def is_expired(self) -> bool:
+        return self.last_update is None or (time.monotonic() - self.last_update) > self.ttl
+
+    async def refresh(self) -> dict:
+        info = await self.client.get_exchange_info()
+        self.symbol_infos = {symbol_info["symbol"] : symbol_info for symbol_info in info["symbols"]}
+        self.symbol_filters = {symbol : SymbolFilters.from_symbol_info(symbol_info) for symbol, symbol_info in self.symbol_infos.items()}
+        self.info = info
+        self.last_update = time.monotonic()
+        return info
+
+    async def get(self) -> dict:
+        if self.is_expired:
+            async with self._lock:
+                # Another coroutine may have refreshed it while we were waiting
+                if self.is_expired: await self.refresh()
+        return self.info
+
+    async def get_symbol_info(self, symbol : str) -> Optional[dict]:
+        await self.get()
+        return self.symbol_infos.get(symbol, None)
+
+    async def get_symbol_filters(self, symbol : str) -> Optional[SymbolFilters]:
+        await self.get()
+        return self.symbol_filters.get(symbol, None)
+
+    async def start(self) -> None:
+        await self.get()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try: await self._task
+            except asyncio.CancelledError: pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl * self.refresh_ratio)
+            try:
+                async with self._lock:
+                    await self.refresh()
+            except Exception as e:
+                # Keep serving the previous document, get() will retry once it has expired
+                warn(f"Exchange info refresh failed ({e!r}) : retrying in {self.ttl * self.refresh_ratio}s.")
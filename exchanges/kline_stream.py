@@ -0,0 +1,155 @@
+import asyncio
+import json
+from decimal import Decimal
+from typing import Dict, List, Optional, Set, Tuple
+from warnings import warn
+import websockets
+
+KLINE_INTERVALS_MS = {
+    "1s": 1_000,
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000, "8h": 28_800_000, "12h": 43_200_000,
+    "1d": 86_400_000, "3d": 259_200_000, "1w": 604_800_000,
+}
+
+# (open, high, low, close, volume)
+Bar = Tuple[Decimal, Decimal, Decimal, Decimal, Decimal]
+
+class KlineStore:
+    """
+    Bounded in-memory store of closed klines, per symbol, keyed by their open time (ms).
+    """
+    def __init__(self, interval : str = "1m", max_bars : int = 10_000) -> None:
+        self.interval = interval
+        self.interval_ms = KLINE_INTERVALS_MS[interval]
+        self.max_bars = max_bars
+        self.bars : Dict[str, Dict[int, Bar]] = {}
+        self._new_bar_events : Dict[str, asyncio.Event] = {}
+
+    def add_bar(self, symbol : str, open_time : int, bar : Bar) -> None:
+        symbol_bars = self.bars.setdefault(symbol, {})
+        symbol_bars[open_time] = bar
+
+        # Remove the oldest bars once we exceed the capacity by 25%, to avoid sorting at each insertion
+        if len(symbol_bars) > self.max_bars * 1.25:
+            for old_open_time in sorted(symbol_bars)[:len(symbol_bars) - self.max_bars]:
+                del symbol_bars[old_open_time]
+
+        event = self._new_bar_events.pop(symbol, None)
+        if event is not None: event.set()
+
+    def add_klines(self, symbol : str, klines : List[list]) -> None:
+        """Add raw klines as returned by the REST API : [open_time, open, high, low, close, volume, ...]"""
+        for kline in klines:
+            self.add_bar(symbol, int(kline[0]), tuple(Decimal(cell) for cell in kline[1:6]))
+
+    def missing_range(self, symbol : str, start : int, end : int) -> Optional[Tuple[int, int]]:
+        """Smallest [first, last) range (ms) covering the bars opened in [start, end) that are missing, or None if none is missing."""
+        symbol_bars = self.bars.get(symbol, {})
+        start = start - start % self.interval_ms
+        missing = [open_time for open_time in range(start, end, self.interval_ms) if open_time not in symbol_bars]
+        if len(missing) == 0: return None
+        return missing[0], missing[-1] + self.interval_ms
+
+    def get_bars(self, symbol : str, start : int, end : int) -> Optional[List[Bar]]:
+        """Return the bars opened in [start, end) (ms), or None if at least one of them is missing."""
+        symbol_bars = self.bars.get(symbol)
+        if symbol_bars is None or start % self.interval_ms != 0: return None
+
+        result = []
+        for open_time in range(start, end, self.interval_ms):
+            bar = symbol_bars.get(open_time)
+            if bar is None: return None
+            result.append(bar)
+        return result if len(result) > 0 else None
+
+    async def wait_for_bar(self, symbol : str, open_time : int, timeout : float) -> bool:
+        """Wait until the bar opened at open_time is stored. Return False on timeout."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while open_time not in self.bars.get(symbol, {}):
+            remaining = deadline - loop.time()
+            if remaining <= 0: return False
+            event = self._new_bar_events.setdefault(symbol, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), timeout= remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+
+class BinanceKlineStream:
+    """
+    Keep a KlineStore up to date with the kline streams of the subscribed symbols.
+    It connects to a Binance combined stream endpoint (or any local stand-in speaking the same protocol)
+    and reconnects automatically. Missing bars (e.g during a reconnection) are left to the REST fallback.
+    """
+    def __init__(self, store : KlineStore, url : str = "wss://stream.binance.com:9443/stream", reconnect_delay : float = 1) -> None:
+        self.store = store
+        self.url = url
+        self.reconnect_delay = reconnect_delay
+        self.symbols : Set[str] = set()
+        self._websocket = None
+        self._task = None
+        self._request_id = 0
+
+    @property
+    def is_connected(self) -> bool:
+        return self._websocket is not None
+
+    def _stream_name(self, symbol : str) -> str:
+        return f"{symbol.lower()}@kline_{self.store.interval}"
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try: await self._task
+            except asyncio.CancelledError: pass
+        self._task, self._websocket = None, None
+
+    async def subscribe(self, symbol : str) -> None:
+        if symbol in self.symbols: return
+        self.symbols.add(symbol)
+        if self.is_connected:
+            await self._send_subscription([symbol])
+
+    async def _send_subscription(self, symbols : List[str]) -> None:
+        if len(symbols) == 0: return
+        self._request_id += 1
+        await self._websocket.send(json.dumps({
+            "method" : "SUBSCRIBE",
+            "params" : [self._stream_name(symbol) for symbol in symbols],
+            "id" : self._request_id
+        }))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with websockets.connect(self.url) as websocket:
+                    self._websocket = websocket
+                    await self._send_subscription(list(self.symbols))
+                    async for message in websocket:
+                        self.handle_message(json.loads(message))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e: # Handshake rejections, malformed messages, ... : the stream must keep running
+                warn(f"Kline stream interrupted ({e!r}) : reconnecting in {self.reconnect_delay}s.")
+            finally:
+                self._websocket = None
+            await asyncio.sleep(self.reconnect_delay)
+
+    def handle_message(self, message : dict) -> None:
+        data = message.get("data", message) # Combined streams wrap the payload
+        if not isinstance(data, dict) or data.get("e") != "kline": return
+        kline = data["k"]
+        if not kline["x"]: return # Only keep closed bars
+
+        self.store.add_bar(
+            symbol = kline["s"],
+            open_time = int(kline["t"]),
+            bar = (Decimal(kline["o"]), Decimal(kline["h"]), Decimal(kline["l"]), Decimal(kline["c"]), Decimal(kline["v"]))
+        )
@@ -1,45 +1,131 @@
+import asyncio
 from decimal import Decimal, ROUND_FLOOR
 from datetime import datetime
-import pandas as pd
 import numpy as np
 import pytz
 from typing import List
+from warnings import warn
 from binance import AsyncClient
 
 from ..core import Asset, Pair, Quotation, Portfolio, Value
 
 from .responses import OrderResponse, TickerResponse
 from .exchange import AbstractExchange
+from .kline_stream import KlineStore, BinanceKlineStream
+from .exchange_info import ExchangeInfoCache, SymbolFilters
+from .user_data_stream import PortfolioMirror, BinanceUserDataStream, parse_margin_account
+from .replay import RecordingClient
+from .rate_limited_client import get_shared_client
 
 class BinanceProductionExchange(AbstractExchange):
-    def __init__(self, api_key : str, api_secret : str, testnet = False, kline_interval = AsyncClient.KLINE_INTERVAL_1MINUTE) -> None:
+    def __init__(self, api_key : str, api_secret : str, testnet = False, kline_interval = AsyncClient.KLINE_INTERVAL_1MINUTE,
+            kline_stream = False, kline_stream_url : str = None, kline_stream_timeout : float = 2, kline_store_size : int = 10_000,
+            exchange_info_ttl : float = 3600,
+            user_data_stream = False, user_data_stream_url : str = None, reconciliation_interval : float = 60,
+            client = None, record_path : str = None) -> None:
+        """
+        Parameters
+        ----------
+        client :
+            Client to use instead of the shared rate limited client created at reset, e.g a ReplayClient to run offline.
+        record_path : str
+            If provided, every request and its response are recorded into this file (see RecordingClient).
+        user_data_stream : bool
+            Mirror the portfolio locally from the margin user data stream, so that get_portfolio is a memory read.
+        user_data_stream_url : str
+            User data stream endpoint (the listen key is appended). Defaults to the Binance (or Binance testnet) one. Can target a local stand-in.
+        reconciliation_interval : float
+            Seconds between two reconciliations of the mirrored portfolio with the REST margin account.
+        exchange_info_ttl : float
+            Seconds the exchange info document (and the symbols filters) is kept. It is refreshed in background.
+        kline_stream : bool
+            Serve get_ticker from klines received through a WebSocket stream, falling back to REST only on gaps.
+        kline_stream_url : str
+            Combined stream endpoint. Defaults to the Binance (or Binance testnet) one. Can target a local stand-in.
+        kline_stream_timeout : float
+            Seconds get_ticker waits for the last bar to come through the stream before falling back to REST.
+        kline_store_size : int
+            Number of bars kept in memory per symbol. Enlarged for an episode if its warmup window needs more (see backfill).
+        """
         super().__init__()
-        self.client = None
+        self.client = client
+        self.record_path = record_path
         self.api_key = api_key
         self.api_secret = api_secret
         self.testnet = testnet
         self.kline_interval = kline_interval
 
+        self.kline_store_size = kline_store_size
+        self.kline_store = KlineStore(interval= kline_interval, max_bars= kline_store_size)
+        self.kline_stream = None
+        if kline_stream:
+            if kline_stream_url is None:
+                kline_stream_url = "wss://testnet.binance.vision/stream" if testnet else "wss://stream.binance.com:9443/stream"
+            self.kline_stream = BinanceKlineStream(store= self.kline_store, url= kline_stream_url)
+        self.kline_stream_timeout = kline_stream_timeout
+
+        self.exchange_info_ttl = exchange_info_ttl
+        self.exchange_info = None
+        self.__available_pairs, self.__available_pairs_update = None, None
+
+        self.portfolio_mirror = PortfolioMirror() if user_data_stream else None
+        self.user_data_stream = None
+        if user_data_stream_url is None:
+            user_data_stream_url = "wss://testnet.binance.vision/ws" if testnet else "wss://stream.binance.com:9443/ws"
+        self.user_data_stream_url = user_data_stream_url
+        self.reconciliation_interval = reconciliation_interval
+
     async def reset(self, seed = None) -> None:
         await super().reset(seed = seed)
         if self.client is None:
-            self.client = await AsyncClient.create(self.api_key, self.api_secret, testnet= self.testnet)
+            # Shared by every env of the process : one pooled session and one rate limiter
+            self.client = await get_shared_client(self.api_key, self.api_secret, testnet= self.testnet)
+        if self.record_path is not None and not isinstance(self.client, RecordingClient):
+            self.client = RecordingClient(client= self.client, path= self.record_path)
+        # Back to the configured size : the store is only enlarged for the warmup window of the current episode (see backfill)
+        self.kline_store.max_bars = self.kline_store_size
+        if self.exchange_info is None:
+            self.exchange_info = ExchangeInfoCache(client= self.client, ttl= self.exchange_info_ttl)
+            await self.exchange_info.start()
+        if self.kline_stream is not None:
+            await self.kline_stream.start()
+        if self.portfolio_mirror is not None and self.user_data_stream is None:
+            await self.exchange_info.get()
+            self.portfolio_mirror.add_symbols({
+                symbol : (symbol_filters.base_asset, symbol_filters.quote_asset)
+                for symbol, symbol_filters in self.exchange_info.symbol_filters.items()
+            })
+            self.user_data_stream = BinanceUserDataStream(
+                client= self.client,
+                mirror= self.portfolio_mirror,
+                url= self.user_data_stream_url,
+                reconciliation_interval= self.reconciliation_interval
+            )
+            await self.user_data_stream.start()
         
         self.time_manager = self.get_trading_env().time_manager
+
+    def _symbol(self, pair : Pair) -> str:
+        return f"{pair.asset.name}{pair.quote_asset.name}"
     
     async def get_info(self):
-        info = await self.client.get_exchange_info()
-        self.__symbol_infos = {}
-        for symbol_info in info["symbols"]:
-            self.__symbol_infos[symbol_info["symbol"]] = symbol_info
-        return info
+        return await self.exchange_info.get()
     
     async def get_pair_info(self, pair : Pair):
-        await self.get_info()
-        return self.__symbol_infos[pair.__repr__(separator="")]
+        symbol_info = await self.exchange_info.get_symbol_info(self._symbol(pair))
+        if symbol_info is None: raise KeyError(self._symbol(pair))
+        return symbol_info
+
+    async def get_pair_filters(self, pair : Pair) -> SymbolFilters:
+        symbol_filters = await self.exchange_info.get_symbol_filters(self._symbol(pair))
+        if symbol_filters is None: raise KeyError(self._symbol(pair))
+        return symbol_filters
 
     async def get_available_pairs(self) -> List[Pair]:
         info = await self.get_info()
+        # The pairs only need to be built again when the document has been refreshed
+        if self.__available_pairs_update == self.exchange_info.last_update:
+            return self.__available_pairs
         symbols_info = info["symbols"]
 
         # Retrieve all assets
@@ -49,82 +135,116 @@ class BinanceProductionExchange(AbstractExchange):
 
         # Retrieve all pairs
         pairs = [Pair(asset= assets[d["baseAsset"]], quote_asset=assets[d["quoteAsset"]]) for d in symbols_info]
+        self.__available_pairs, self.__available_pairs_update = pairs, self.exchange_info.last_update
         return pairs
 
+    async def backfill(self, pairs : List[Pair], start : datetime, end : datetime) -> None:
+        """Download the klines of pairs opened in [start, end) into the kline store : one paged request per pair
+        (only over the missing bars), sent concurrently. The store is enlarged if needed to keep the whole period :
+        the observers read a window that long at every step. It is set back to kline_store_size at the next reset."""
+        start, end = int(start.timestamp() * 1E3), int(end.timestamp() * 1E3)
+        self.kline_store.max_bars = max(self.kline_store.max_bars, (end - start) // self.kline_store.interval_ms + 1)
+
+        async def backfill_symbol(symbol : str) -> None:
+            missing_range = self.kline_store.missing_range(symbol, start= start, end= end)
+            if missing_range is None: return
+            klines = await self.client.get_historical_klines(
+                symbol = symbol,
+                interval = self.kline_interval,
+                start_str= missing_range[0],
+                end_str= missing_range[1] - 1,
+            )
+            self.kline_store.add_klines(symbol, klines)
+
+        await asyncio.gather(*[backfill_symbol(symbol) for symbol in dict.fromkeys(self._symbol(pair) for pair in pairs)])
+
     async def get_ticker(self, pair : Pair, date : datetime = None) -> TickerResponse:
         if date is None: date = await self.time_manager.get_current_datetime()
 
         open_date = await self.time_manager.get_historical_datetime(step_back=1,relative_date= date)
+        symbol = self._symbol(pair)
+        start, end = int(open_date.timestamp() * 1E3), int(date.timestamp() * 1E3)
 
-        klines = await self.client.get_historical_klines(
-            symbol = pair.__repr__(separator= ""),
-            interval = '1m',
-            end_str= str(int(date.timestamp() * 1E6) - 1),
-            start_str= str(int(open_date.timestamp() * 1E6)),
-        )
+        # Closed bars never change : any bar already received (from the stream or REST) is served from memory
+        bars = self.kline_store.get_bars(symbol, start= start, end= end)
+        if self.kline_stream is not None:
+            await self.kline_stream.subscribe(symbol)
+            # At bar close, the last bar may still be on its way
+            if bars is None and self.kline_stream.is_connected:
+                if await self.kline_store.wait_for_bar(symbol, open_time= end - self.kline_store.interval_ms, timeout= self.kline_stream_timeout):
+                    bars = self.kline_store.get_bars(symbol, start= start, end= end)
 
-        klines = [kline[0:7] for kline in klines]
-        klines = pd.DataFrame(klines, columns= ["date_open", "open", "high", "low", "close", "volume", "date_close"])
-        klines["date_open"] = pd.to_datetime(klines["date_open"], unit = "ms", utc = True)
-        klines["date_close"] = pd.to_datetime(klines["date_close"], unit = "ms", utc = True)
-        klines.sort_values(by="date_close", ascending= True, inplace= True)
-        # Convert to Decimal
-        klines[["open", "high", "low", "close", "volume"]] = \
-            klines[["open", "high", "low", "close", "volume"]].map(lambda cell : Decimal(cell))
+        if bars is None:
+            klines = await self.client.get_historical_klines(
+                symbol = symbol,
+                interval = self.kline_interval,
+                start_str= start,
+                end_str= end - 1,
+            )
+            klines = sorted(klines, key= lambda kline : kline[0])
+            self.kline_store.add_klines(symbol, klines)
+            bars = [tuple(Decimal(cell) for cell in kline[1:6]) for kline in klines]
 
         return TickerResponse(
             status_code= 200,
             date_open=open_date,
             date_close= date,
-            open = Quotation(klines["open"].iloc[0], pair),
-            high = Quotation(klines["high"].max(), pair),
-            low = Quotation(klines["low"].min(), pair),
-            close = Quotation(klines["close"].iloc[-1], pair),
-            volume = Value(klines["volume"].sum(), pair.asset),
-            price= Quotation(klines["close"].iloc[-1], pair)
+            open = Quotation(bars[0][0], pair),
+            high = Quotation(max(bar[1] for bar in bars), pair),
+            low = Quotation(min(bar[2] for bar in bars), pair),
+            close = Quotation(bars[-1][3], pair),
+            volume = Value(sum(bar[4] for bar in bars), pair.asset),
+            price= Quotation(bars[-1][3], pair)
         )
     
     async def get_portfolio(self) -> Portfolio:
+        if self.user_data_stream is not None and self.user_data_stream.is_live:
+            return self.portfolio_mirror.get_portfolio()
+
         margin_account = await self.client.get_margin_account(recvWindow = 10000)
-        user_assets_info = margin_account["userAssets"]
         positions = []
-        for asset_info in user_assets_info:
-            amount = Decimal(asset_info["free"]) - Decimal(asset_info["borrowed"]) - Decimal(asset_info["interest"])
+        for asset, amount in parse_margin_account(margin_account).items():
             if amount > 0:
                 positions.append(Value(
                     amount = amount,
-                    asset= Asset(name = asset_info["asset"])
+                    asset= Asset(name = asset)
                 ))
         return Portfolio(positions= positions)
 
     async def market_order(self, quantity : Value, pair : Pair) -> OrderResponse:
         try:
-            info = await self.get_pair_info(pair=pair)
+            filters = await self.get_pair_filters(pair=pair)
         except KeyError as e:
             pair = pair.reverse()
-            info = await self.get_pair_info(pair= pair)
-        for _filter in info["filters"]:
-            if _filter["filterType"] == "LOT_SIZE":
-                base_asset_precision = Decimal(_filter["stepSize"]).normalize() # Normalize helps get rid of the excess zeros
-                break
+            filters = await self.get_pair_filters(pair= pair)
         
-        quantity.amount = quantity.amount.quantize(base_asset_precision, rounding= ROUND_FLOOR)
+        amount = Decimal(repr(quantity.amount)).quantize(filters.step_size, rounding= ROUND_FLOOR)
         # Example on pair BTCUSDT
-        if quantity.amount == 0: return
+        if amount == 0: return
 
         # E.g : quantity = 1.2 BTC
         if quantity.asset == pair.asset:
-            quantity_base_asset = abs(quantity.amount)
+            quantity_base_asset = abs(amount)
             quantity_quote_asset = None
-            side = AsyncClient.SIDE_BUY if quantity.amount > 0 else AsyncClient.SIDE_SELL
+            side = AsyncClient.SIDE_BUY if amount > 0 else AsyncClient.SIDE_SELL
         # E.g : quantity = -156 USDT
         elif quantity.asset == pair.quote_asset:
             quantity_base_asset = None
-            quantity_quote_asset = abs(quantity.amount)
-            side = AsyncClient.SIDE_SELL if quantity.amount > 0 else AsyncClient.SIDE_BUY
+            quantity_quote_asset = abs(amount)
+            side = AsyncClient.SIDE_SELL if amount > 0 else AsyncClient.SIDE_BUY
 
+        # The exchange would reject the order : skip it, as the orders rounded down to 0
+        if quantity_base_asset is not None and quantity_base_asset < filters.min_quantity:
+            warn(f"Order of {quantity} on {pair} skipped : below the minimum quantity of {filters.min_quantity} {pair.asset}.")
+            return
+        if filters.min_notional > 0:
+            if quantity_quote_asset is not None: notional = quantity_quote_asset
+            else: notional = quantity_base_asset * Decimal(repr((await self.get_ticker(pair= pair)).close.amount))
+            if notional < filters.min_notional:
+                warn(f"Order of {quantity} on {pair} skipped : below the minimum notional of {filters.min_notional} {pair.quote_asset}.")
+                return
 
-        params = dict(symbol = pair.__repr__(separator=""),
+        params = dict(symbol = self._symbol(pair),
             isIsolated = "FALSE",
             side = side,
             type = AsyncClient.ORDER_TYPE_MARKET,
@@ -137,7 +257,7 @@ class BinanceProductionExchange(AbstractExchange):
         print(params)
         order_response = await self.client.create_margin_order(**params)
 
-        counterpart_quantity = Value(order_response["cummulativeQuoteQty"], pair.quote_asset)
+        counterpart_quantity = Value(Decimal(order_response["cummulativeQuoteQty"]), pair.quote_asset)
         
         average_price = Decimal('0')
         sum_qty = Decimal('0')
@@ -145,7 +265,7 @@ class BinanceProductionExchange(AbstractExchange):
         for fill in order_response["fills"]:
             average_price += Decimal(fill["price"]) * Decimal(fill["qty"])
             sum_qty += Decimal(fill["qty"])
-            sum_fees = Value(fill["commission"], Asset(fill["commissionAsset"])) + sum_fees
+            sum_fees = Value(Decimal(fill["commission"]), Asset(fill["commissionAsset"])) + sum_fees
         average_price /= sum_qty
 
         return OrderResponse(
@@ -0,0 +1,94 @@
+import asyncio
+import weakref
+from typing import Dict, Tuple
+from binance import AsyncClient
+from binance.exceptions import BinanceAPIException
+from binance.helpers import interval_to_milliseconds
+
+from ..utils.rate_limiter import RateLimiter
+
+# Request weight of the client methods we use (Binance API documentation). Other methods weigh 1.
+# get_historical_klines is paged with get_klines (see RateLimitedClient.get_historical_klines) : the weight is acquired per page.
+BINANCE_REQUEST_WEIGHTS = {
+    "get_exchange_info" : 20,
+    "get_historical_klines" : 2,
+    "get_klines" : 2,
+    "get_margin_account" : 10,
+    "create_margin_order" : 6,
+    "margin_stream_get_listen_key" : 1,
+    "margin_stream_keepalive" : 1,
+}
+# (weight limit, interval in seconds), per IP
+BINANCE_RATE_LIMITS = [(6_000, 60)]
+
+
+class RateLimitedClient:
+    """
+    Wrap a client (e.g binance.AsyncClient) so that every awaited call first acquires its weight
+    from a shared RateLimiter, and reports the usage headers of the response back to it.
+    429 / 418 responses block the limiter for the Retry-After duration and the request is queued again.
+    """
+    KLINES_PAGE_SIZE = 1000
+
+    def __init__(self, client, rate_limiter : RateLimiter, request_weights : Dict[str, int] = BINANCE_REQUEST_WEIGHTS, max_retries = 3) -> None:
+        self._client = client
+        self._rate_limiter = rate_limiter
+        self._request_weights = request_weights
+        self._max_retries = max_retries
+
+    async def get_historical_klines(self, symbol : str, interval : str, start_str = None, end_str = None, limit = None, **kwargs) -> list:
+        """
+        The client would page internally after acquiring the weight of a single request : page explicitly with get_klines instead,
+        so that every page acquires its weight. Only periods given as timestamps (in ms) are paged here, others are forwarded.
+        """
+        if not isinstance(start_str, int) or limit is not None or len(kwargs) > 0:
+            return await self.__getattr__("get_historical_klines")(symbol, interval, start_str= start_str, end_str= end_str, limit= limit, **kwargs)
+        interval_ms = interval_to_milliseconds(interval)
+        klines, start = [], start_str
+        while end_str is None or start <= end_str:
+            params = dict(symbol= symbol, interval= interval, startTime= start, limit= self.KLINES_PAGE_SIZE)
+            if end_str is not None: params["endTime"] = end_str
+            page = await self.get_klines(**params)
+            klines += page
+            if len(page) < self.KLINES_PAGE_SIZE: break
+            start = page[-1][0] + interval_ms
+        return klines
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if not asyncio.iscoroutinefunction(attribute): return attribute
+
+        async def rate_limited(*args, **kwargs):
+            for retry in range(self._max_retries + 1):
+                await self._rate_limiter.acquire(weight= self._request_weights.get(name, 1))
+                try:
+                    return await attribute(*args, **kwargs)
+                except BinanceAPIException as e:
+                    if e.status_code not in (418, 429) or retry >= self._max_retries: raise e
+                    retry_after = e.response.headers.get("Retry-After", 60) if e.response is not None else 60
+                    self._rate_limiter.block(float(retry_after))
+                finally:
+                    response = getattr(self._client, "response", None)
+                    if response is not None: self._rate_limiter.update_from_headers(response.headers)
+        return rate_limited
+
+
+# The HTTP session of a client (and an asyncio.Lock) is bound to the event loop it was created in : one set per running loop
+_shared_clients : "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, bool], RateLimitedClient]]" = weakref.WeakKeyDictionary()
+_shared_clients_locks : "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+async def get_shared_client(api_key : str, api_secret : str, testnet = False) -> RateLimitedClient:
+    """
+    Return the client of the running event loop for these credentials. All of them share the same
+    rate limiter per server, and each one keeps a single pooled HTTP session, whatever the number of envs.
+    """
+    loop = asyncio.get_running_loop()
+    lock = _shared_clients_locks.setdefault(loop, asyncio.Lock())
+    async with lock:
+        clients = _shared_clients.setdefault(loop, {})
+        key = (api_key, testnet)
+        if key not in clients:
+            client = await AsyncClient.create(api_key, api_secret, testnet= testnet)
+            rate_limiter = RateLimiter.get_shared(key = f"binance{'-testnet' if testnet else ''}", limits= BINANCE_RATE_LIMITS)
+            clients[key] = RateLimitedClient(client= client, rate_limiter= rate_limiter)
+        return clients[key]
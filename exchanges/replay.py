@@ -0,0 +1,108 @@
+import asyncio
+import json
+import time
+from collections import defaultdict, deque
+from typing import Dict, List, Union
+
+
+def _request_key(method : str, args : tuple, kwargs : dict) -> str:
+    return json.dumps([method, list(args), kwargs], sort_keys= True, default= str)
+
+
+class RecordingClient:
+    """
+    Wrap an exchange client (e.g binance.AsyncClient) and record every awaited call
+    with its response (or error) and its duration, one JSON line per call.
+    Non-coroutine attributes are forwarded untouched.
+    """
+    def __init__(self, client, path : str) -> None:
+        self._client = client
+        self._path = path
+        self._file = open(path, "a")
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if not asyncio.iscoroutinefunction(attribute): return attribute
+
+        async def recorded(*args, **kwargs):
+            record = {"method" : name, "args" : list(args), "kwargs" : kwargs, "time" : time.time()}
+            start = time.perf_counter()
+            try:
+                response = await attribute(*args, **kwargs)
+                record["response"] = response
+                return response
+            except Exception as e:
+                record["error"] = {"type" : e.__class__.__name__, "message" : str(e)}
+                raise e
+            finally:
+                record["elapsed"] = time.perf_counter() - start
+                self._file.write(json.dumps(record, default= str) + "\n")
+                self._file.flush()
+        return recorded
+
+    async def close_connection(self):
+        self._file.close()
+        if hasattr(self._client, "close_connection"):
+            await self._client.close_connection()
+
+
+class ReplayError(Exception):
+    pass
+
+
+class ReplayClient:
+    """
+    Serve the calls recorded by RecordingClient, without any network access.
+    A call is answered by the recording of the same request (same method and parameters)
+    or, if there is none, by the next unused recording of the same method.
+
+    Parameters
+    ----------
+    path : str
+        Recording file.
+    latency : Union[float, str]
+        "recorded" to wait as long as the original call did, or a fixed delay in seconds.
+    latency_scale : float
+        Multiplier applied to the latency (e.g 0 to replay as fast as possible).
+    """
+    def __init__(self, path : str, latency : Union[float, str] = "recorded", latency_scale : float = 1) -> None:
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.by_request : Dict[str, deque] = defaultdict(deque)
+        self.by_method : Dict[str, deque] = defaultdict(deque)
+        self.calls : List[dict] = [] # Replayed calls, for latency and concurrency analysis
+        with open(path, "r") as file:
+            for line in file:
+                if len(line.strip()) == 0: continue
+                record = json.loads(line)
+                self.by_request[_request_key(record["method"], record["args"], record["kwargs"])].append(record)
+                self.by_method[record["method"]].append(record)
+
+    def _pop(self, method : str, args : tuple, kwargs : dict) -> dict:
+        records = self.by_request.get(_request_key(method, args, kwargs), None)
+        if records:
+            record = records.popleft()
+            self.by_method[method].remove(record)
+            return record
+        if self.by_method[method]:
+            record = self.by_method[method].popleft()
+            self.by_request[_request_key(record["method"], record["args"], record["kwargs"])].remove(record)
+            return record
+        raise ReplayError(f"No recorded response left for {method}.")
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name not in self.by_method: raise AttributeError(name)
+
+        async def replayed(*args, **kwargs):
+            start = time.perf_counter()
+            record = self._pop(name, args, kwargs)
+            delay = record["elapsed"] if self.latency == "recorded" else self.latency
+            await asyncio.sleep(delay * self.latency_scale)
+            self.calls.append({"method" : name, "start" : start, "end" : time.perf_counter()})
+            if "error" in record:
+                raise ReplayError(f"{record['error']['type']} : {record['error']['message']}")
+            return record["response"]
+        return replayed
+
+    async def close_connection(self):
+        pass
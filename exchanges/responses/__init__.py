@@ -1,4 +1,4 @@
 from .response import AbstractResponse
-from .order import OrderResponse
+from .order import OrderResponse, OrderFillsResponse
 from .pair_info import PairInfoResponse
-from .ticker import TickerResponse
\ No newline at end of file
+from .ticker import TickerResponse, TickersResponse
\ No newline at end of file
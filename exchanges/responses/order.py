@@ -1,5 +1,8 @@
 from dataclasses import dataclass
 from datetime import datetime
+from typing import List
+import numpy as np
+
 from .response import AbstractResponse
 from ...core import Pair, Value, Quotation
 
@@ -13,4 +16,59 @@ class OrderResponse(AbstractResponse):
     fees : Value
 
     def __repr__(self):
-        return f"OrderResponse({'; '.join([f'{key}={value.__repr__()}' for key, value in self.__dict__.items()])})"
\ No newline at end of file
+        return f"OrderResponse({'; '.join([f'{key}={value.__repr__()}' for key, value in self.__dict__.items()])})"
+
+
+@dataclass
+class OrderFillsResponse(AbstractResponse):
+    """Columnar record of a batch of market orders. Row i describes the order on pairs[i] where :
+        - quantities[i] is the signed quantity traded, expressed in pairs[i].asset
+        - counterpart_quantities[i] is the signed quantity of pairs[i].quote_asset given (> 0) or received (< 0), fees included
+        - prices[i] is the price used, expressed in pairs[i].quote_asset / pairs[i].asset
+        - fees[i] is expressed in pairs[i].quote_asset
+    """
+    date : datetime
+    pairs : List[Pair]
+    quantities : np.ndarray
+    counterpart_quantities : np.ndarray
+    prices : np.ndarray
+    fees : np.ndarray
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def to_order_responses(self) -> List[OrderResponse]:
+        return [
+            OrderResponse(
+                status_code = self.status_code,
+                pair = pair,
+                date = self.date,
+                original_quantity = Value(self.quantities[i], pair.asset),
+                counterpart_quantity = Value(self.counterpart_quantities[i], pair.quote_asset),
+                price = Quotation(self.prices[i], pair),
+                fees = Value(self.fees[i], pair.quote_asset)
+            )
+            for i, pair in enumerate(self.pairs)
+        ]
+
+    @classmethod
+    def from_order_responses(cls, date : datetime, pairs : List[Pair], order_responses : List[OrderResponse]) -> "OrderFillsResponse":
+        """Build the columnar record from individual OrderResponse.
+        A None response (nothing traded) is recorded as an empty fill on the requested pair."""
+        pairs, columns = list(pairs), np.zeros(shape = (4, len(order_responses)))
+        for i, order_response in enumerate(order_responses):
+            if order_response is None: continue
+            pairs[i] = order_response.pair
+            for j, value in enumerate([order_response.original_quantity, order_response.counterpart_quantity, order_response.price, order_response.fees]):
+                if value is None: columns[j, i] = np.nan
+                elif isinstance(value, (Value, Quotation)): columns[j, i] = float(value.amount)
+                else: columns[j, i] = float(value)
+        return cls(
+            status_code = 200,
+            date = date,
+            pairs = pairs,
+            quantities = columns[0],
+            counterpart_quantities = columns[1],
+            prices = columns[2],
+            fees = columns[3]
+        )
@@ -1,7 +1,9 @@
 from dataclasses import dataclass
 from datetime import datetime
+from typing import List
+import numpy as np
 
-from ...core import Quotation, Value
+from ...core import Pair, Quotation, Value
 from .response import AbstractResponse
 
 @dataclass
@@ -14,3 +16,22 @@ class TickerResponse(AbstractResponse):
     close : Quotation
     volume : Value
     price : Quotation
+
+
+@dataclass
+class TickersResponse(AbstractResponse):
+    """Columnar bars of several pairs at several dates : bars[i, j] holds the open, high, low, close and volume
+    of pairs[j] at dates[i] (bar closing at dates[i])."""
+    dates : List[datetime]
+    pairs : List[Pair]
+    bars : np.ndarray
+
+    columns = ("open", "high", "low", "close", "volume")
+
+    def get(self, column : str) -> np.ndarray:
+        """(len(dates), len(pairs)) array of column."""
+        return self.bars[:, :, self.columns.index(column)]
+
+    def get_pair(self, pair : Pair) -> np.ndarray:
+        """(len(dates), 5) array of the bars of pair."""
+        return self.bars[:, self.pairs.index(pair)]
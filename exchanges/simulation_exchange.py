@@ -1,13 +1,15 @@
 from decimal import Decimal
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Tuple
+import numpy as np
+import pandas as pd
 
 from ..core import Asset, Pair, Quotation, Portfolio, Value
 from ..simulations.simulation import AbstractPairSimulation
 from ..time_managers import AbstractTimeManager
 from ..utils.speed_analyser import astep_timer
 
-from .responses import OrderResponse, TickerResponse
+from .responses import OrderResponse, OrderFillsResponse, TickerResponse, TickersResponse
 from .exceptions import PairNotFound
 from .exchange import AbstractExchange
 
@@ -65,6 +67,23 @@ class SimulationExchange(AbstractExchange):
             price = Quotation(data["close"], pair),
         )
 
+    async def get_bars(self, pairs : List[Pair], date : datetime) -> np.ndarray:
+        """Bars read directly from the pair simulations, without building any TickerResponse."""
+        bars = np.empty((len(pairs), 5), dtype= float)
+        for i, pair in enumerate(pairs):
+            if pair not in self.pair_simulations : raise PairNotFound(pair= pair)
+            data = self.pair_simulations[pair].get_data(date = date)
+            bars[i] = (data["open"], data["high"], data["low"], data["close"], data["volume"])
+        return bars
+
+    async def get_tickers(self, pairs : List[Pair], dates : List[datetime]) -> TickersResponse:
+        """Bars sliced from the arrays of the pair simulations (see AbstractPairSimulation.get_data_array)."""
+        bars = np.empty((len(dates), len(pairs), 5), dtype= float)
+        date_index = pd.DatetimeIndex(dates).as_unit("ns") # Converted once for all the pairs
+        for j, pair in enumerate(pairs):
+            if pair not in self.pair_simulations : raise PairNotFound(pair= pair)
+            bars[:, j] = self.pair_simulations[pair].get_data_array(dates = date_index)
+        return TickersResponse(status_code = 200, dates = list(dates), pairs = list(pairs), bars = bars)
     
     async def get_portfolio(self) -> Portfolio:
         return self.portfolio.copy()
@@ -129,3 +148,59 @@ class SimulationExchange(AbstractExchange):
             price = price,
             fees = fees
         )
+
+    def _get_price(self, pair : Pair, date : datetime) -> float:
+        """Close price of pair at date, looked up in pair_simulations without building any Quotation."""
+        if pair in self.pair_simulations:
+            return self.pair_simulations[pair].get_data(date = date)["close"]
+        reversed_pair = pair.reverse()
+        if reversed_pair in self.pair_simulations:
+            return 1 / (self.pair_simulations[reversed_pair].get_data(date = date)["close"] + 1E-9) # Same as Quotation.reverse
+        raise PairNotFound(pair= pair)
+
+    async def market_orders(self, orders : List[Tuple[Pair, Value]]) -> OrderFillsResponse:
+        """Perform several orders in the simulation in a single pass. Each (pair, quantity)
+        follows the logic of market_order. All the orders are validated before any of them is applied.
+
+        Returns:
+            OrderFillsResponse: Columnar record of the fills (pairs are expressed so that quantities are in pair.asset)
+        """
+        date = await self.time_manager.get_current_datetime()
+
+        pairs, quantities, prices = [], np.empty(len(orders)), np.empty(len(orders))
+        for i, (pair, quantity) in enumerate(orders):
+            if quantity.asset == pair.quote_asset:
+                pair = pair.reverse()
+            elif quantity.asset != pair.asset:
+                raise ValueError(f"quantity.quote_asset {quantity.asset} must match either pair.asset {pair.asset} or pair.quote_asset {pair.quote_asset}")
+            pairs.append(pair)
+            quantities[i] = quantity.amount
+            prices[i] = self._get_price(pair = pair, date = date)
+
+        counterpart_quantities = quantities * prices
+        # Buying : we need to sell more to equilibrate fees. Selling : we need to buy less.
+        post_fees_counterpart_quantities = np.where(
+            quantities > 0,
+            counterpart_quantities / self.trading_fees_ratio,
+            counterpart_quantities * self.trading_fees_ratio
+        )
+        fees = np.abs(post_fees_counterpart_quantities - counterpart_quantities)
+
+        # Net the position changes per asset before touching the portfolio
+        position_changes : Dict[Asset, float] = {}
+        for i, pair in enumerate(pairs):
+            position_changes[pair.asset] = position_changes.get(pair.asset, 0) + quantities[i]
+            position_changes[pair.quote_asset] = position_changes.get(pair.quote_asset, 0) - post_fees_counterpart_quantities[i]
+        self.portfolio.add_positions(
+            positions = [Value(float(amount), asset) for asset, amount in position_changes.items()]
+        )
+
+        return OrderFillsResponse(
+            status_code = 200,
+            date = date,
+            pairs = pairs,
+            quantities = quantities,
+            counterpart_quantities = post_fees_counterpart_quantities,
+            prices = prices,
+            fees = fees
+        )
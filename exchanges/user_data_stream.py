@@ -0,0 +1,216 @@
+import asyncio
+import json
+import time
+from decimal import Decimal
+from typing import Dict, List, Tuple
+from warnings import warn
+import websockets
+
+from ..core import Asset, Portfolio, Value
+
+
+def parse_margin_account(margin_account : dict) -> Dict[str, Decimal]:
+    """Net position (free - borrowed - interest) of each asset of a margin account response."""
+    positions = {}
+    for asset_info in margin_account["userAssets"]:
+        positions[asset_info["asset"]] = Decimal(asset_info["free"]) - Decimal(asset_info["borrowed"]) - Decimal(asset_info["interest"])
+    return positions
+
+
+class PortfolioMirror:
+    """
+    Local copy of the net positions of an account, kept in sync with user data events :
+        - executionReport (trades) : the base asset increases (BUY) or decreases (SELL) of the last executed quantity,
+          the quote asset moves the other way of the last quote quantity, and the commission is deducted.
+        - balanceUpdate (deposits, withdrawals, transfers) : the balance delta is applied.
+    Borrowing and repaying do not change net positions. Interests are not streamed : they are
+    caught up by the periodic reconciliation with the REST account.
+
+    While a REST snapshot is requested (between begin_reconciliation and end_reconciliation), the events are buffered.
+    Once the snapshot is received, the events older than the request are dropped (the snapshot includes them) and the events
+    newer than the response are applied on top of it. Events in between may or may not be in the snapshot : the mirror is
+    then not reconciled, until a next snapshot.
+    """
+    def __init__(self, symbols : Dict[str, Tuple[str, str]] = None, event_time_tolerance : int = 1000) -> None:
+        """symbols : symbol -> (base_asset, quote_asset), used to read the execution reports.
+        event_time_tolerance : margin (ms) for the clock difference between the event times and the local clock."""
+        self.symbols = dict(symbols) if symbols is not None else {}
+        self.event_time_tolerance = event_time_tolerance
+        self.positions : Dict[str, Decimal] = {}
+        self.is_reconciled = False
+        self.version = 0
+        self.reconciliation_start = None
+        self.pending_events : List[dict] = []
+
+    def reconcile(self, positions : Dict[str, Decimal]) -> None:
+        """Replace the positions by positions, known to include every event."""
+        self.positions = dict(positions)
+        self.is_reconciled = True
+        self.version += 1
+
+    def begin_reconciliation(self, request_time : int) -> None:
+        """A snapshot is requested at request_time (ms) : buffer the events until end_reconciliation."""
+        self.reconciliation_start = request_time
+        self.pending_events = []
+
+    def end_reconciliation(self, positions : Dict[str, Decimal], response_time : int) -> bool:
+        """Apply the snapshot received at response_time (ms) and the buffered events it does not include.
+        Return False if some events can not be placed before or after the snapshot (the mirror is then not reconciled)."""
+        pending_events, request_time = self.pending_events, self.reconciliation_start
+        self.reconciliation_start, self.pending_events = None, []
+        self.reconcile(positions)
+        is_consistent = True
+        for data in pending_events:
+            event_time = data.get("E")
+            if event_time is not None and event_time < request_time - self.event_time_tolerance: continue # In the snapshot
+            if event_time is not None and event_time > response_time + self.event_time_tolerance: self.apply_event(data)
+            else: is_consistent = False
+        if not is_consistent: self.is_reconciled = False
+        return is_consistent
+
+    def cancel_reconciliation(self) -> None:
+        """The snapshot request failed : apply the buffered events on the current positions, which can not be trusted anymore."""
+        pending_events = self.pending_events
+        self.reconciliation_start, self.pending_events = None, []
+        self.is_reconciled = False
+        for data in pending_events: self.apply_event(data)
+
+    def _add(self, asset : str, amount : Decimal) -> None:
+        self.positions[asset] = self.positions.get(asset, Decimal("0")) + amount
+
+    def handle_message(self, message : dict) -> None:
+        data = message.get("data", message)
+        if not isinstance(data, dict) or data.get("e") not in ["executionReport", "balanceUpdate"]: return
+        if self.reconciliation_start is not None:
+            self.pending_events.append(data)
+        else:
+            self.apply_event(data)
+
+    def apply_event(self, data : dict) -> None:
+        event = data.get("e")
+        if event == "executionReport" and data.get("x") == "TRADE":
+            if data["s"] not in self.symbols:
+                # Can not be applied : wait for the next reconciliation
+                self.is_reconciled = False
+                return
+            base_asset, quote_asset = self.symbols[data["s"]]
+            quantity, quote_quantity = Decimal(data["l"]), Decimal(data["Y"])
+            sign = 1 if data["S"] == "BUY" else -1
+            self._add(base_asset, sign * quantity)
+            self._add(quote_asset, - sign * quote_quantity)
+            if data.get("N") is not None:
+                self._add(data["N"], - Decimal(data["n"]))
+            self.version += 1
+
+        elif event == "balanceUpdate":
+            self._add(data["a"], Decimal(data["d"]))
+            self.version += 1
+
+    def add_symbols(self, symbols : Dict[str, Tuple[str, str]]) -> None:
+        self.symbols.update(symbols)
+
+    def get_portfolio(self) -> Portfolio:
+        return Portfolio(positions= [
+            Value(amount = amount, asset = Asset(name = asset))
+            for asset, amount in self.positions.items() if amount > 0
+        ])
+
+
+class BinanceUserDataStream:
+    """
+    Keep a PortfolioMirror in sync with the margin user data stream : get a listen key,
+    listen to the events (the URL can point to a local stand-in), keep the key alive
+    and periodically reconcile the mirror with the REST margin account.
+    """
+    def __init__(self, client, mirror : PortfolioMirror, url : str = "wss://stream.binance.com:9443/ws",
+            reconciliation_interval : float = 60, keepalive_interval : float = 30*60, reconnect_delay : float = 1,
+            reconciliation_retry_delay : float = 1) -> None:
+        """reconciliation_retry_delay : seconds before a new snapshot, when events arrived while the previous one was requested."""
+        self.client = client
+        self.mirror = mirror
+        self.url = url
+        self.reconciliation_interval = reconciliation_interval
+        self.reconciliation_retry_delay = reconciliation_retry_delay
+        self.keepalive_interval = keepalive_interval
+        self.reconnect_delay = reconnect_delay
+        self.listen_key = None
+        self._websocket = None
+        self._tasks = []
+
+    @property
+    def is_live(self) -> bool:
+        """The mirror can be trusted : it has been reconciled and no event can be missed."""
+        return self._websocket is not None and self.mirror.is_reconciled and self.mirror.reconciliation_start is None
+
+    async def reconcile(self) -> bool:
+        """Reconcile the mirror with a REST snapshot. Return False if the mirror could not be reconciled (see PortfolioMirror)."""
+        if self.mirror.reconciliation_start is not None: return False # Already in progress
+        self.mirror.begin_reconciliation(request_time= int(time.time() * 1E3))
+        try:
+            margin_account = await self.client.get_margin_account(recvWindow = 10000)
+        except BaseException as e:
+            self.mirror.cancel_reconciliation()
+            raise e
+        return self.mirror.end_reconciliation(parse_margin_account(margin_account), response_time= int(time.time() * 1E3))
+
+    async def reconcile_until_consistent(self) -> None:
+        """Reconcile again, after a quiet period, while events arrive during the snapshots (or while the snapshot request fails)."""
+        while True:
+            try:
+                if await self.reconcile(): return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                warn(f"User data stream reconciliation failed ({e!r}) : retrying in {self.reconciliation_retry_delay}s.")
+            await asyncio.sleep(self.reconciliation_retry_delay)
+
+    async def start(self) -> None:
+        if len(self._tasks) > 0: return
+        self._tasks = [
+            asyncio.create_task(self._run()),
+            asyncio.create_task(self._maintain())
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+            try: await task
+            except asyncio.CancelledError: pass
+        self._tasks, self._websocket = [], None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self.listen_key = (await self.client.margin_stream_get_listen_key())
+                if isinstance(self.listen_key, dict): self.listen_key = self.listen_key["listenKey"]
+                async with websockets.connect(f"{self.url}/{self.listen_key}") as websocket:
+                    self._websocket = websocket
+                    # Reconcile once connected : events received from now on are buffered, then applied on top of the REST state
+                    reconciliation = asyncio.create_task(self.reconcile_until_consistent())
+                    try:
+                        async for message in websocket:
+                            self.mirror.handle_message(json.loads(message))
+                    finally:
+                        reconciliation.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                warn(f"User data stream interrupted ({e!r}) : reconnecting in {self.reconnect_delay}s.")
+            finally:
+                self._websocket = None
+                self.mirror.is_reconciled = False
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _maintain(self) -> None:
+        elapsed_since_keepalive = 0
+        while True:
+            await asyncio.sleep(self.reconciliation_interval)
+            elapsed_since_keepalive += self.reconciliation_interval
+            try:
+                if self._websocket is not None:
+                    await self.reconcile_until_consistent()
+                if self.listen_key is not None and elapsed_since_keepalive >= self.keepalive_interval:
+                    await self.client.margin_stream_keepalive(listenKey = self.listen_key)
+                    elapsed_since_keepalive = 0
+            except Exception as e:
+                warn(f"User data stream maintenance failed ({e!r}) : retrying in {self.reconciliation_interval}s.")
@@ -34,16 +34,15 @@ class InfosManager(AbstractRenderer):
     
     async def _get_infos(self):
         # Retrieve data
-        date = await self.time_manager.get_current_datetime()
-        portfolio = await self.exchange_manager.get_portfolio()
+        step_context = self.get_step_context()
+        date, portfolio = await self.gather(step_context.get_date(), step_context.get_portfolio())
         results = await self.gather(
-            self.portfolio_manager.valuation(portfolio= portfolio, date= date, quote_asset= self.quote_asset),
-            self.portfolio_manager.exposition(portfolio= portfolio, date= date, quote_asset= self.quote_asset),
-            *[self.exchange_manager.get_ticker(pair= pair, date=date) for pair in self.pairs],
+            step_context.get_report(quote_asset= self.quote_asset),
+            *[step_context.get_ticker(pair= pair) for pair in self.pairs],
         )
-        portfolio_valuation = results[0]
-        portfolio_exposition : PortfolioExposition =  results[1]
-        ticker_dict : List[TickerResponse] = dict(zip(self.pairs, results[2:]))
+        portfolio_valuation = results[0].total
+        portfolio_exposition : PortfolioExposition =  results[0].exposition
+        ticker_dict : List[TickerResponse] = dict(zip(self.pairs, results[1:]))
 
         # Process data
         portfolio_per_asset  = {asset : portfolio.get_position(asset = asset) for asset in self.assets}
@@ -1,2 +1,3 @@
-from .portfolio import PortfolioManager
+from .portfolio import PortfolioManager, ValuationReport
 from .exchange import ExchangeManager
+from .step_context import StepContext
@@ -1,18 +1,34 @@
 import asyncio
+import heapq
 from functools import lru_cache
 from datetime import datetime
 from decimal import Decimal
-from typing import List
+from typing import Dict, List, Tuple
+import numpy as np
 
-from ..element import AbstractEnvironmentElement
+from ..element import AbstractEnvironmentElement, Mode
 from ..exchanges import AbstractExchange
-from ..exchanges.responses import OrderResponse, TickerResponse
-from ..core import Pair, Asset, Value, Portfolio
+from ..exchanges.responses import OrderResponse, OrderFillsResponse, TickerResponse, TickersResponse
+from ..core import Pair, Asset, Value, Portfolio, Quotation
 from ..utils.async_lru import alru_cache
+from ..utils.step_memo import StepMemo
 
 class ExchangeManager(AbstractExchange):
-    def __init__(self, exchange : AbstractExchange) -> None:
+    def __init__(self, exchange : AbstractExchange, pair_costs : Dict[Pair, float] = {}, backfill_pairs : List[Pair] = [], trading_fees_pct : float = None) -> None:
+        """pair_costs : cost of going through each listed pair (e.g its fees, or the inverse of its liquidity) used to choose
+        the conversion routes. Pairs are given a cost of 1 by default : routes then have the fewest hops.
+        backfill_pairs : in PRODUCTION, pairs whose history is backfilled at reset, in addition to the history_pairs of the env elements
+        (e.g the pairs used to value the portfolio over a window).
+        trading_fees_pct : fees anticipated when planning routed orders. By default, the trading_fees_ratio of the exchange if it has one, no fees otherwise."""
         self.exchange = exchange
+        self.pair_costs = pair_costs
+        self.backfill_pairs = backfill_pairs
+        if trading_fees_pct is not None: self.trading_fees_ratio = 1 - trading_fees_pct
+        else: self.trading_fees_ratio = getattr(exchange, "trading_fees_ratio", 1)
+        # Quotations and tickers are memoized for the current step only
+        self.quotation_memo = StepMemo()
+        self.ticker_memo = StepMemo()
+        self.market_data_version = 0
     
     @property
     def order_index(self):
@@ -22,33 +38,87 @@ class ExchangeManager(AbstractExchange):
         # Reset cached memory
         # self.get_available_pairs.cache_clear()
         # self.__lru_get_portfolio.cache_clear()
-        # self.__lru_get_quotation.cache_clear()
-        # self.__lru_get_ticker.cache_clear()
+        self.quotation_memo.clear()
+        self.ticker_memo.clear()
         
         self.time_manager = self.get_trading_env().time_manager
         # Create a set for unique assets
+        self.available_pairs = set(await self.get_available_pairs())
         self.assets = set()
-        for pair in await self.get_available_pairs():
+        for pair in self.available_pairs:
             self.assets.add(pair.asset)
             self.assets.add(pair.quote_asset)
 
         # Initialize the graph
         self.graph = {asset: set() for asset in self.assets}
-        for pair in await self.get_available_pairs():
+        self.exchange_pairs : Dict[Tuple[Asset, Asset], Pair] = {} # (asset, quote_asset) -> listed pair
+        self.hop_pairs : Dict[Tuple[Asset, Asset], Pair] = {} # (asset, quote_asset) -> Pair(asset, quote_asset)
+        for pair in self.available_pairs:
             self.graph[pair.asset].add(pair.quote_asset)
             self.graph[pair.quote_asset].add(pair.asset)  # Assuming you can trade in both directions
+            self.exchange_pairs[(pair.asset, pair.quote_asset)] = self.exchange_pairs[(pair.quote_asset, pair.asset)] = pair
+            self.hop_pairs[(pair.asset, pair.quote_asset)] = pair
+            self.hop_pairs[(pair.quote_asset, pair.asset)] = pair.reverse()
+        self.build_route_table()
+        self.asset_indexes : Dict[Asset, int] = {asset : i for i, asset in enumerate(self.assets)}
+        self.price_vectors : Dict[Tuple[Asset, datetime], np.ndarray] = {}
         
         # Used for caching portfolio.
         self.nb_orders = 0
 
+        if self.get_trading_env().mode == Mode.PRODUCTION:
+            await self.backfill_history()
+
+    async def backfill_history(self) -> None:
+        """Backfill the history needed by the warmup of the env (its longest warmup), in one paged fetch per pair instead of one request per step."""
+        trading_env = self.get_trading_env()
+        pairs = list(dict.fromkeys(
+            [pair for element in trading_env.env_elements for pair in element.history_pairs] + list(self.backfill_pairs)
+        ))
+        if len(pairs) == 0: return
+        end = await self.time_manager.get_current_datetime()
+        start = await self.time_manager.get_historical_datetime(step_back= trading_env.warmup_steps + 1, relative_date= end)
+        await self.backfill(pairs= pairs, start= start, end= end)
+
+    async def backfill(self, pairs : List[Pair], start : datetime, end : datetime) -> None:
+        await self.exchange.backfill(pairs= pairs, start= start, end= end)
+
+    async def forward(self, date : datetime, seed = None):
+        self.set_memo_scope(date = date)
+
+    def set_memo_scope(self, date : datetime):
+        scope = (date, self.market_data_version)
+        if scope != self.quotation_memo.scope:
+            self.price_vectors = {}
+        for memo in (self.quotation_memo, self.ticker_memo):
+            memo.set_scope(scope)
+
+    def invalidate_market_data(self):
+        """Drop the memoized quotations and tickers of the current step, e.g when the exchange received fresher market data.
+        The valuation reports of PortfolioManager and the tickers of the StepContext are keyed on market_data_version : they are dropped too."""
+        self.market_data_version += 1
+        self.set_memo_scope(date = self.quotation_memo.scope[0] if self.quotation_memo.scope is not None else None)
+
+    def get_memo_stats(self) -> Dict[str, Dict[str, float]]:
+        return {"quotation" : self.quotation_memo.get_stats(), "ticker" : self.ticker_memo.get_stats()}
+
     # @alru_cache(maxsize=1)
     async def get_available_pairs(self) -> List[Pair]:
         return await self.exchange.get_available_pairs()
     
 
     async def get_ticker(self, pair : Pair, date : datetime) -> TickerResponse:
-        """Use lru_cache to avoid sending twice the same requests."""
-        return await self.exchange.get_ticker(pair= pair, date= date)
+        """Memoized for the current step, to avoid sending twice the same requests."""
+        return await self.ticker_memo.get((pair, date), lambda: self.exchange.get_ticker(pair= pair, date= date))
+
+    async def get_tickers(self, pairs : List[Pair], dates : List[datetime]) -> TickersResponse:
+        """Bars of several pairs at several dates (e.g a whole window), in one exchange call."""
+        return await self.exchange.get_tickers(pairs= pairs, dates= dates)
+
+    async def get_bars(self, pairs : List[Pair], date : datetime) -> np.ndarray:
+        """(len(pairs), 5) array of open, high, low, close and volume, in one exchange call. Memoized for the current step (do not modify it)."""
+        pairs = tuple(pairs)
+        return await self.ticker_memo.get(("bars", pairs, date), lambda: self.exchange.get_bars(pairs= list(pairs), date= date))
 
 
     async def get_portfolio(self) -> Portfolio:
@@ -60,77 +130,243 @@ class ExchangeManager(AbstractExchange):
         return await self.exchange.get_portfolio()
 
     
+    def build_route_table(self) -> None:
+        """
+        Compile the graph of available pairs into a route for every couple of connected assets (Dijkstra from each asset,
+        on the pair costs, by default the number of hops). The route from B to A is the reverse of the route from A to B.
+        Pair instances are created once : route lookups are dict hits.
+        """
+        self.asset_paths : Dict[Tuple[Asset, Asset], List[Asset]] = {}
+        for from_asset in self.assets:
+            costs = {from_asset : 0}
+            previous = {}
+            queue = [(0, 0, from_asset)]
+            counter = 0 # Tie breaker, as Assets can not be compared
+            while queue:
+                cost, _, current = heapq.heappop(queue)
+                if cost > costs[current]: continue
+                for neighbor in self.graph[current]:
+                    neighbor_cost = cost + self.pair_costs.get(self.exchange_pairs[(current, neighbor)], 1)
+                    if neighbor_cost < costs.get(neighbor, float("inf")):
+                        costs[neighbor] = neighbor_cost
+                        previous[neighbor] = current
+                        counter += 1
+                        heapq.heappush(queue, (neighbor_cost, counter, neighbor))
+
+            for to_asset in costs:
+                if (from_asset, to_asset) in self.asset_paths: continue
+                path = [to_asset]
+                while path[-1] != from_asset:
+                    path.append(previous[path[-1]])
+                path.reverse()
+                self.asset_paths[(from_asset, to_asset)] = path
+                self.asset_paths[(to_asset, from_asset)] = path[::-1]
+
+        self.route_pairs : Dict[Tuple[Asset, Asset], List[Pair]] = {
+            key : [self.hop_pairs[(path[i], path[i+1])] for i in range(len(path) - 1)]
+            for key, path in self.asset_paths.items()
+        }
+
     def get_asset_path(self, from_asset, to_asset) -> List[Asset]:
         """
-        Find a path from the pair's asset to its quote asset using BFS
+        Find a path from the pair's asset to its quote asset, in the route table
         """
-        if from_asset not in self.graph or to_asset not in self.graph:
+        try:
+            return self.asset_paths[(from_asset, to_asset)]
+        except KeyError:
             raise PathNotFound(from_asset, to_asset)
-        
-        # Breadth-First Search (BFS) for path finding
-        visited = {from_asset}
-        queue = [(from_asset, [from_asset])]
-        
-        while queue:
-            current, path = queue.pop(0)
-            if current == to_asset:
-                return path
-            
-            for neighbor in self.graph[current]:
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append((neighbor, path + [neighbor]))
-        
-        # Return an empty list if no path is found
-        raise PathNotFound(from_asset, to_asset)
 
-        
-    async def market_order(self, quantity : Value, pair :Pair) -> List[OrderResponse]:
+    def get_route_pairs(self, from_asset, to_asset) -> List[Pair]:
+        """Pairs of each hop of the path from from_asset to to_asset"""
+        try:
+            return self.route_pairs[(from_asset, to_asset)]
+        except KeyError:
+            raise PathNotFound(from_asset, to_asset)
+
+    def get_exchange_pair(self, asset : Asset, quote_asset : Asset) -> Pair:
+        """Return the pair listed by the exchange to trade asset against quote_asset : Pair(asset, quote_asset) or its reverse."""
+        return self.exchange_pairs[(asset, quote_asset)]
+
+    def get_route(self, pair : Pair, quantity : Value) -> List[Pair]:
+        """Legs to go through to perform the order. The quantity of each leg is expressed in leg.asset."""
         if quantity.asset not in [pair.asset, pair.quote_asset]:
             raise ValueError("quantity.quote_asset must match either pair.asset or pair.quote_asset")
+        if quantity.asset == pair.quote_asset:
+            return self.get_route_pairs(from_asset= pair.quote_asset, to_asset= pair.asset)
+        return self.get_route_pairs(from_asset= pair.asset, to_asset= pair.quote_asset)
+
+    async def plan_orders(self, orders : List[Tuple[Pair, Value]]) -> List[Tuple[Pair, Value]]:
+        """Turn orders, given as (pair, quantity) couples, into independent orders on the pairs listed by the exchange.
+            - The quantity of every leg is estimated from quotations (fetched concurrently, and only for the legs which need them)
+            instead of waiting for the fills of the previous leg. Each leg is grossed up by the fees (trading_fees_ratio) so that
+            it exactly matches what the previous leg receives or spends : no residual is left on the intermediate assets.
+            - The legs of all the orders going through the same exchange pair are netted into a single order, which only pays
+            the fees of its net amount. Netted orders that cancel out (up to rounding) are dropped.
+        None of the planned orders depends on another one : they can all be sent at once.
+        """
+        date = await self.time_manager.get_current_datetime()
+        routes = [self.get_route(pair= pair, quantity= quantity) for pair, quantity in orders]
+
+        # The asset in which each leg is expressed is known before quoting : find the pairs whose price is needed
+        priced_pairs, leg_assets = {}, {}
+        for route in routes:
+            for i, leg in enumerate(route):
+                exchange_pair = self.get_exchange_pair(leg.asset, leg.quote_asset)
+                leg_assets.setdefault(exchange_pair, set()).add(leg.asset)
+                if i < len(route) - 1: priced_pairs[exchange_pair] = None # The next leg quantity is needed
+        for exchange_pair, assets in leg_assets.items():
+            if len(assets) > 1: priced_pairs[exchange_pair] = None # Legs in both directions must be converted to be netted
+
+        quotations = await self.gather(*[self.get_quotation(pair = exchange_pair, date = date) for exchange_pair in priced_pairs])
+        prices = {exchange_pair : quotation.amount for exchange_pair, quotation in zip(priced_pairs, quotations)}
+
+        # Fees are paid on the counterpart of each netted order : buying costs 1 / ratio more, selling brings ratio less.
+        # Legs crossed by opposite legs of the same pair pay no fees : the fees of a pair are shared by the legs in the
+        # direction of its net amount, in proportion. They depend on the net amounts, which depend on them : iterate to a fixed point.
+        fees_factors : Dict[Tuple[Pair, bool], float] = {}
+        for _ in range(10):
+            net_amounts, gross_amounts = self._net_legs(routes= routes, orders= orders, prices= prices, fees_factors= fees_factors)
+            previous_fees_factors, fees_factors = fees_factors, {}
+            for exchange_pair, net_amount in net_amounts.items():
+                full_fees_factor = 1 / self.trading_fees_ratio if net_amount > 0 else self.trading_fees_ratio
+                gross_amount = gross_amounts[(exchange_pair, net_amount > 0)]
+                if gross_amount > 0:
+                    fees_factors[(exchange_pair, net_amount > 0)] = 1 + (full_fees_factor - 1) * abs(net_amount) / gross_amount
+                fees_factors[(exchange_pair, not net_amount > 0)] = 1
+            if all(abs(fees_factors[key] - previous_fees_factors.get(key, 0)) < 1E-15 for key in fees_factors): break
+
+        net_amounts, gross_amounts = self._net_legs(routes= routes, orders= orders, prices= prices, fees_factors= fees_factors)
+        planned_orders = []
+        for exchange_pair, amount in net_amounts.items():
+            if abs(amount) <= 1E-9 * (gross_amounts[(exchange_pair, True)] + gross_amounts[(exchange_pair, False)]): continue # Legs cancelling out, up to rounding
+            if exchange_pair in prices or exchange_pair.asset in leg_assets[exchange_pair]:
+                planned_orders.append((exchange_pair, Value(amount, exchange_pair.asset)))
+            else:
+                planned_orders.append((exchange_pair, Value(amount, exchange_pair.quote_asset)))
+        return planned_orders
+
+    def _net_legs(self, routes : List[List[Pair]], orders : List[Tuple[Pair, Value]], prices : Dict[Pair, float],
+            fees_factors : Dict[Tuple[Pair, bool], float]) -> Tuple[Dict[Pair, float], Dict[Tuple[Pair, bool], float]]:
+        """
+        Size every leg from the previous one, with the fees factor of its pair and direction (full fees when unknown),
+        and net the legs of each exchange pair. Amounts are expressed in the single asset of the legs if there is one,
+        in exchange_pair.asset otherwise. Returns the net amounts, and the gross amounts of each (pair, buying) direction.
+        """
+        full_fees_factors = {True : 1 / self.trading_fees_ratio, False : self.trading_fees_ratio}
+        net_amounts : Dict[Pair, float] = {}
+        gross_amounts : Dict[Tuple[Pair, bool], float] = {}
+        for route, (pair, quantity) in zip(routes, orders):
+            amount = quantity.amount
+            for i, leg in enumerate(route):
+                exchange_pair = self.get_exchange_pair(leg.asset, leg.quote_asset)
+                is_last_leg = i == len(route) - 1
+                if exchange_pair == leg:
+                    net_amount = amount
+                    if not is_last_leg:
+                        fees_factor = fees_factors.get((exchange_pair, amount > 0), full_fees_factors[amount > 0])
+                        amount = amount * prices[exchange_pair] * fees_factor
+                elif exchange_pair in prices:
+                    # amount is expressed in exchange_pair.quote_asset. Expressed in exchange_pair.asset, the fees fall on leg.asset : gross up to keep it exact
+                    fees_factor = fees_factors.get((exchange_pair, amount < 0), full_fees_factors[amount < 0])
+                    amount = amount / (prices[exchange_pair] * fees_factor)
+                    net_amount = - amount
+                else:
+                    net_amount = amount # Last leg, only in this direction : expressed in exchange_pair.quote_asset
+                net_amounts[exchange_pair] = net_amounts.get(exchange_pair, 0) + net_amount
+                direction = (exchange_pair, net_amount > 0)
+                gross_amounts[direction] = gross_amounts.get(direction, 0) + abs(net_amount)
+        for exchange_pair in net_amounts:
+            for buying in [True, False]: gross_amounts.setdefault((exchange_pair, buying), 0)
+        return net_amounts, gross_amounts
+
+    async def market_order(self, quantity : Value, pair :Pair) -> List[OrderResponse]:
+        """Perform a market order on pair, routed through the intermediate assets if needed.
+        The legs are planned with plan_orders and sent concurrently."""
         self.nb_orders +=1
+        planned_orders = await self.plan_orders([(pair, quantity)])
+        return await self.gather(*[
+            self.exchange.market_order(quantity= planned_quantity, pair= planned_pair) for planned_pair, planned_quantity in planned_orders
+        ])
 
-        from_asset = pair.asset
-        to_asset = pair.quote_asset
-        graph_path = self.get_asset_path(from_asset= from_asset, to_asset= to_asset)
+    async def market_orders(self, orders : List[Tuple[Pair, Value]]) -> OrderFillsResponse:
+        """Perform several market orders, routed like market_order. The legs of all the orders are
+        planned and netted together (see plan_orders), then sent to the exchange as a single batch.
 
-        if quantity.asset == to_asset:
-            graph_path = graph_path[::-1] 
-        
-        list_order_responses = []
-        for i in range(0, len(graph_path)-1):
-            intermediate_pair = Pair(graph_path[i], graph_path[i+1])
-            order_response = await self.exchange.market_order(quantity=quantity, pair = intermediate_pair)
-            quantity = order_response.counterpart_quantity
-            list_order_responses.append(order_response)
-        return list_order_responses
+        Returns:
+            OrderFillsResponse: Columnar record of the fills of the planned orders.
+        """
+        self.nb_orders += 1
+        planned_orders = await self.plan_orders(orders)
+        return await self.exchange.market_orders(planned_orders)
     
     async def get_quotation(self, pair : Pair, date : datetime):
-        return await self.__lru_get_quotation(pair = pair, date = date)
+        """Memoized for the current step : the same quotation is asked by the valuation, the exposition, the actions, the rewarder, ..."""
+        return await self.quotation_memo.get((pair, date), lambda: self.__get_quotation(pair = pair, date = date))
     
-    # @alru_cache(maxsize=1_000)
-    async def __lru_get_quotation(self, pair : Pair, date : datetime):
+    async def __get_quotation(self, pair : Pair, date : datetime):
         from_asset = pair.asset
         to_asset = pair.quote_asset
-        graph_path = self.get_asset_path(from_asset= from_asset, to_asset= to_asset)
+        route_pairs = self.get_route_pairs(from_asset= from_asset, to_asset= to_asset)
+        if len(route_pairs) == 1:
+            # Always ask the exchange for the listed pair, and reverse it here if needed
+            exchange_pair = self.get_exchange_pair(from_asset, to_asset)
+            if exchange_pair == pair:
+                return await self.exchange.get_quotation(pair = pair, date= date)
+            return (await self.get_quotation(pair = exchange_pair, date= date)).reverse()
 
+        # Each hop is memoized too, as it is shared by the other routes going through it
         quotation_tasks = []
-        for i in range(0, len(graph_path)-1):
-            intermediate_pair = Pair(graph_path[i], graph_path[i+1])
+        for intermediate_pair in route_pairs:
             quotation_tasks.append(
-                self.exchange.get_quotation(pair = intermediate_pair, date= date)
+                self.get_quotation(pair = intermediate_pair, date= date)
             )
             
         quotations = await self.gather(*quotation_tasks)
 
-        cumulative_quotation = 1
+        amount = 1
         for quotation in quotations:
-            cumulative_quotation = cumulative_quotation * quotation
-            
-        return cumulative_quotation
+            amount *= quotation.amount
+        return Quotation(amount, pair)
+        
+
+    async def get_prices(self, quote_asset : Asset, date : datetime, assets : List[Asset] = None) -> np.ndarray:
+        """
+        Price in quote_asset of every asset (indexed by self.asset_indexes) at date, derived from the route table
+        and the quotations of the listed pairs only : the reversed hops are inverted here.
+        The vector is built once per step, date and quote asset, and filled lazily : only the prices of assets (all of them by default)
+        are guaranteed to be computed, the others may be NaN. The returned array is shared : do not modify it.
+        """
+        key = (quote_asset, date)
+        prices = self.price_vectors.get(key, None)
+        if prices is None:
+            if quote_asset not in self.asset_indexes: raise PathNotFound(quote_asset, quote_asset)
+            prices = np.full(len(self.asset_indexes), np.nan)
+            prices[self.asset_indexes[quote_asset]] = 1
+            self.price_vectors[key] = prices
+
+        missing_assets = []
+        for asset in (self.assets if assets is None else assets):
+            if asset not in self.asset_indexes: raise PathNotFound(asset, quote_asset)
+            if np.isnan(prices[self.asset_indexes[asset]]): missing_assets.append(asset)
+        if len(missing_assets) == 0: return prices
+
+        exchange_pairs = list(dict.fromkeys(
+            self.get_exchange_pair(hop.asset, hop.quote_asset)
+            for asset in missing_assets for hop in self.get_route_pairs(from_asset= asset, to_asset= quote_asset)
+        ))
+        quotations = await self.gather(*[self.get_quotation(pair = exchange_pair, date = date) for exchange_pair in exchange_pairs])
+        exchange_prices = {exchange_pair : quotation.amount for exchange_pair, quotation in zip(exchange_pairs, quotations)}
+
+        for asset in missing_assets:
+            price = 1
+            for hop in self.get_route_pairs(from_asset= asset, to_asset= quote_asset):
+                exchange_pair = self.get_exchange_pair(hop.asset, hop.quote_asset)
+                if exchange_pair.asset == hop.asset: price *= exchange_prices[exchange_pair]
+                else: price /= exchange_prices[exchange_pair] + 1E-9 # Same as Quotation.reverse
+            prices[self.asset_indexes[asset]] = price
+        return prices
         
 
 class PathNotFound(Exception):
     def __init__(self, from_asset, to_asset) -> None:
         super().__init__(f"Could not find a path to rally {from_asset} to {to_asset}")
-
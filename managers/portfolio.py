@@ -1,64 +1,87 @@
 from functools import lru_cache
 from decimal import Decimal
 import asyncio
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Dict, List
+import numpy as np
 
 from ..exchanges import AbstractExchange
 from ..element import AbstractEnvironmentElement
 from ..core import Portfolio, PortfolioExposition, Pair, Asset, Value
 from ..utils.speed_analyser import astep_timer
 from ..utils.async_lru import alru_cache
+from ..utils.step_memo import StepMemo
+
+
+@dataclass
+class ValuationReport:
+    total : Value
+    valuations : Dict[Asset, Value]
+    exposition : PortfolioExposition
 
     
 class PortfolioManager(AbstractEnvironmentElement):
+    def __init__(self) -> None:
+        super().__init__()
+        self.reports = StepMemo()
+
+    @property
+    def order_index(self):
+        # Right after the exchange manager : the other elements value portfolios in their reset
+        return -90
+
     async def reset(self, seed = None):
         self.exchange_manager = self.get_trading_env().exchange_manager
         # self.position_valuation.cache_clear()
-        # self.__valuations.cache_clear()
-        # self.valuation.cache_clear()
-        # self.exposition.cache_clear()
+        self.reports.clear()
+
+    async def forward(self, date : datetime, seed = None):
+        self.reports.set_scope(date)
 
 
     # @alru_cache(maxsize=128)
     async def position_valuation(self, position : Value, date : datetime, quote_asset : Asset) -> Value:
         if position.asset == quote_asset: return position
-        return position * await self.exchange_manager.get_quotation(
-            pair = Pair(asset= position.asset, quote_asset= quote_asset),
-            date= date
-        )
+        prices = await self.exchange_manager.get_prices(quote_asset= quote_asset, date= date, assets= [position.asset])
+        return Value(position.amount * prices[self.exchange_manager.asset_indexes[position.asset]], quote_asset)
 
     # @alru_cache(maxsize=128)
     async def __valuations(self, portfolio : Portfolio, date : datetime, quote_asset : Asset) -> Dict[Asset, Value]:
-        assets, valuation_tasks = [], []
-        for position in portfolio.get_positions():
-            assets.append(position.asset)
-            valuation_tasks.append(self.position_valuation(position = position, date= date, quote_asset= quote_asset))
-        valuations = await self.gather(*valuation_tasks)
-        return dict(zip(assets, valuations))
-    
-    # @alru_cache(maxsize=128)
-    async def valuation(self, portfolio : Portfolio, date : datetime, quote_asset : Asset, **kwargs) -> Value:
+        positions = portfolio.get_positions()
+        assets = [position.asset for position in positions]
+        # Vectorized : amounts * prices of the step price vector
+        prices = await self.exchange_manager.get_prices(quote_asset= quote_asset, date= date, assets= assets)
+        asset_indexes = self.exchange_manager.asset_indexes
+        valuations = np.array([position.amount for position in positions]) * prices[[asset_indexes[asset] for asset in assets]]
+        return {asset : Value(float(valuation), quote_asset) for asset, valuation in zip(assets, valuations)}
+
+    async def report(self, portfolio : Portfolio, date : datetime, quote_asset : Asset) -> ValuationReport:
+        """Value every position, the total and the exposition in a single pass. The report is memoized for the current step,
+        by portfolio content (so copies of the same portfolio share it), date, quote asset and version of the market data
+        (see ExchangeManager.invalidate_market_data). It is shared : do not modify it."""
+        key = (tuple((position.asset, position.amount) for position in portfolio.get_positions()), date, quote_asset, self.exchange_manager.market_data_version)
+        return await self.reports.get(key, lambda: self.__report(portfolio= portfolio, date= date, quote_asset= quote_asset))
+
+    async def __report(self, portfolio : Portfolio, date : datetime, quote_asset : Asset) -> ValuationReport:
         valuations = await self.__valuations(portfolio = portfolio, date= date, quote_asset= quote_asset)
-        _sum = Value(Decimal('0'), quote_asset)
-        for value in valuations.values():
-            _sum += value
-        return _sum
-    
-    
-    # @alru_cache(maxsize=128)
-    async def exposition(self, portfolio : Portfolio, date : datetime, quote_asset : Asset) -> PortfolioExposition:
-        valuations = await self.__valuations(portfolio= portfolio, date=date, quote_asset= quote_asset)
         total_valuation = Value(Decimal('0'), quote_asset)
         for value in valuations.values():
             total_valuation += value
 
-        return PortfolioExposition(
-            expositions = {
-                asset : valuation / total_valuation
-                for asset, valuation in valuations.items() 
-            }
+        return ValuationReport(
+            total = total_valuation,
+            valuations = valuations,
+            exposition = PortfolioExposition(
+                expositions = {
+                    asset : valuation / total_valuation
+                    for asset, valuation in valuations.items() 
+                }
+            )
         )
-
-
-        
\ No newline at end of file
+    
+    async def valuation(self, portfolio : Portfolio, date : datetime, quote_asset : Asset, **kwargs) -> Value:
+        return (await self.report(portfolio = portfolio, date= date, quote_asset= quote_asset)).total
+    
+    async def exposition(self, portfolio : Portfolio, date : datetime, quote_asset : Asset) -> PortfolioExposition:
+        return (await self.report(portfolio= portfolio, date=date, quote_asset= quote_asset)).exposition
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from ..core import Asset, Pair, Portfolio, PortfolioExposition, Value
+from ..exchanges.responses import TickerResponse
+from ..utils.step_memo import StepMemo
+
+
+class StepContext:
+    """
+    Facts of the current step, computed at most once and only when first asked for : date, portfolio,
+    valuation reports and tickers. The trading env creates a new one every time the time manager moves,
+    elements reach it with self.get_step_context().
+    The portfolio is fetched again if orders were sent since it was taken.
+    """
+    def __init__(self, trading_env) -> None:
+        self.time_manager = trading_env.time_manager
+        self.exchange_manager = trading_env.exchange_manager
+        self.portfolio_manager = trading_env.portfolio_manager
+        self.memo = StepMemo()
+
+    async def get_date(self) -> datetime:
+        return await self.memo.get("date", self.time_manager.get_current_datetime)
+
+    async def get_portfolio(self) -> Portfolio:
+        return await self.memo.get(("portfolio", getattr(self.exchange_manager, "nb_orders", 0)), self.exchange_manager.get_portfolio)
+
+    async def get_report(self, quote_asset : Asset, date : datetime = None):
+        """ValuationReport of the current portfolio at date (by default, the current date)."""
+        portfolio = await self.get_portfolio()
+        if date is None: date = await self.get_date()
+        return await self.portfolio_manager.report(portfolio= portfolio, date= date, quote_asset= quote_asset)
+
+    async def get_valuation(self, quote_asset : Asset, date : datetime = None) -> Value:
+        return (await self.get_report(quote_asset= quote_asset, date= date)).total
+
+    async def get_exposition(self, quote_asset : Asset, date : datetime = None) -> PortfolioExposition:
+        return (await self.get_report(quote_asset= quote_asset, date= date)).exposition
+
+    async def get_ticker(self, pair : Pair, date : datetime = None) -> TickerResponse:
+        if date is None: date = await self.get_date()
+        key = ("ticker", pair, date, getattr(self.exchange_manager, "market_data_version", 0))
+        return await self.memo.get(key, lambda: self.exchange_manager.get_ticker(pair= pair, date= date))
@@ -1,5 +1,9 @@
 from .observer import AbstractObserver
 from .recurrent import RecurrentObserver
 from .concatenate import ArrayConcatenateObserver
-from .ticker import TickerObserver
+from .ticker import TickerObserver, MultiTickerObserver
 from .exposition import ExpositionObserver
+from .layout import ObservationLayout, CompiledObserver
+from .indicators import IndicatorObserver, AbstractIndicator, EMA, RSI, ATR, Volatility, VWAP, VolumeZScore
+from .feature import FeatureObserver
+from .normalizing import NormalizingObserver, RunningStatistics
\ No newline at end of file
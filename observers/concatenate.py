@@ -64,4 +64,10 @@ class ArrayConcatenateObserver(AbstractObserver):
         for i in range(len(results)):
             result.update(results[i])
         return result
+
+    async def write_obs(self, out : np.ndarray, layout, date : datetime = None) -> None:
+        # The keys of the sub observers are all in the layout : each one writes its own slots
+        await self.gather(*[
+            sub_observer.__write_obs__(out= out, layout= layout, date= date) for sub_observer in self.sub_observers
+        ])
     
@@ -28,11 +28,9 @@ class ExpositionObserver(AbstractObserver):
         })
     
     async def get_obs(self, date : datetime = None):
-        portfolio = await self.exchange_manager.get_portfolio()
-        exposition = await self.portfolio_manager.exposition(
-            portfolio= portfolio,
-            date= date,
-            quote_asset= self.quote_asset
+        exposition = await self.get_step_context().get_exposition(
+            quote_asset= self.quote_asset,
+            date= date
         )
         result = {}
         for i, pair in enumerate(self.pairs):
@@ -43,6 +41,15 @@ class ExpositionObserver(AbstractObserver):
             result[f"exposition_{i}"] = pair_exposition 
 
         return result.copy()
+
+    async def write_obs(self, out : np.ndarray, layout, date : datetime = None) -> None:
+        exposition = await self.get_step_context().get_exposition(
+            quote_asset= self.quote_asset,
+            date= date
+        )
+        for i, pair in enumerate(self.pairs):
+            pair_exposition = exposition.get_position(asset = pair.asset)
+            out[layout.indexes[f"exposition_{i}"]] = pair_exposition.amount if pair_exposition is not None else 0
     
     # async def transform(self, obs):
     #     return 
@@ -0,0 +1,35 @@
+from gymnasium.spaces import Space, Box, Dict
+import numpy as np
+from datetime import datetime
+
+from ..simulations import HistoricalSimulation
+
+from .observer import AbstractObserver
+
+
+class FeatureObserver(AbstractObserver):
+    """
+    Observe the features precomputed by the FeatureStore of a HistoricalSimulation (SIMULATION mode only) :
+    each observation is a row lookup at the step index, nothing is computed per step.
+    """
+    def __init__(self, simulation : HistoricalSimulation, **kwargs) -> None:
+        super().__init__(**kwargs)
+        if simulation.feature_store is None: raise ValueError("The simulation must have a feature_store.")
+        self.simulation = simulation
+        self.names = simulation.feature_store.names
+
+    def observation_space(self) -> Space:
+        return Dict(spaces = {
+            name : Box(low= -np.inf, high= np.inf, dtype= float) for name in self.names
+        })
+
+    async def get_obs(self, date : datetime = None):
+        if date is None: date = await self.get_step_context().get_date()
+        row = self.simulation.get_features(date)
+        return {name : float(row[i]) for i, name in enumerate(self.names)}
+
+    async def write_obs(self, out : np.ndarray, layout, date : datetime = None) -> None:
+        if date is None: date = await self.get_step_context().get_date()
+        row = self.simulation.get_features(date)
+        for i, name in enumerate(self.names):
+            out[layout.indexes[name]] = row[i]
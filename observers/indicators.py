@@ -0,0 +1,294 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from datetime import datetime
+from math import log, sqrt
+from typing import List
+import numpy as np
+from gymnasium.spaces import Space, Box, Dict
+
+from ..core import Pair
+from ..element import Mode
+from .observer import AbstractObserver
+
+
+class AbstractIndicator(ABC):
+    """
+    Technical indicator with a streaming state : update() consumes one new bar in O(1) and returns the new value.
+    warmup_steps is the number of bars needed before the value is meaningful.
+    """
+    def __init__(self, name : str) -> None:
+        self.name = name
+        self.reset()
+
+    @property
+    @abstractmethod
+    def warmup_steps(self) -> int:
+        ...
+
+    @abstractmethod
+    def reset(self) -> None:
+        ...
+
+    @abstractmethod
+    def update(self, open : float, high : float, low : float, close : float, volume : float) -> float:
+        ...
+
+
+class RollingWindow:
+    """Last `period` values with their running mean and sum of squared deviations (Welford's algorithm, with removal).
+    They are recomputed from the values every `period` updates, so that rounding errors do not accumulate."""
+    def __init__(self, period : int) -> None:
+        self.period = period
+        self.values = deque()
+        self.mean = 0.
+        self.m2 = 0.
+        self.nb_updates = 0
+
+    def push(self, value : float) -> None:
+        self.values.append(value)
+        n = len(self.values)
+        delta = value - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (value - self.mean)
+        if n > self.period:
+            removed = self.values.popleft()
+            n -= 1
+            delta = removed - self.mean
+            self.mean -= delta / n
+            self.m2 -= delta * (removed - self.mean)
+
+        self.nb_updates += 1
+        if self.nb_updates % self.period == 0:
+            values = np.fromiter(self.values, dtype= float)
+            self.mean = float(values.mean())
+            self.m2 = float(((values - self.mean) ** 2).sum())
+
+    @property
+    def sum(self) -> float:
+        return self.mean * len(self.values)
+
+    @property
+    def std(self) -> float:
+        n = len(self.values)
+        if n < 2: return 0.
+        # max : rounding can make m2 slightly negative
+        return sqrt(max(self.m2, 0.) / (n - 1))
+
+
+class EMA(AbstractIndicator):
+    """Exponential moving average of the close, with alpha = 2 / (period + 1)."""
+    def __init__(self, period : int, name : str = None) -> None:
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        super().__init__(name = name if name is not None else f"ema_{period}")
+
+    @property
+    def warmup_steps(self) -> int:
+        return 3 * self.period
+
+    def reset(self) -> None:
+        self.value = None
+
+    def update(self, open, high, low, close, volume) -> float:
+        self.value = close if self.value is None else self.alpha * close + (1 - self.alpha) * self.value
+        return self.value
+
+
+class RSI(AbstractIndicator):
+    """Relative Strength Index, with Wilder's smoothing of the gains and losses (alpha = 1 / period)."""
+    def __init__(self, period : int = 14, name : str = None) -> None:
+        self.period = period
+        super().__init__(name = name if name is not None else f"rsi_{period}")
+
+    @property
+    def warmup_steps(self) -> int:
+        return 3 * self.period
+
+    def reset(self) -> None:
+        self.last_close = None
+        self.average_gain, self.average_loss = 0., 0.
+        self.value = 50.
+
+    def update(self, open, high, low, close, volume) -> float:
+        if self.last_close is not None:
+            change = close - self.last_close
+            self.average_gain += (max(change, 0.) - self.average_gain) / self.period
+            self.average_loss += (max(-change, 0.) - self.average_loss) / self.period
+            if self.average_loss == 0: self.value = 100. if self.average_gain > 0 else 50.
+            else: self.value = 100. - 100. / (1. + self.average_gain / self.average_loss)
+        self.last_close = close
+        return self.value
+
+
+class ATR(AbstractIndicator):
+    """Average True Range, with Wilder's smoothing (alpha = 1 / period)."""
+    def __init__(self, period : int = 14, name : str = None) -> None:
+        self.period = period
+        super().__init__(name = name if name is not None else f"atr_{period}")
+
+    @property
+    def warmup_steps(self) -> int:
+        return 3 * self.period
+
+    def reset(self) -> None:
+        self.last_close = None
+        self.value = None
+
+    def update(self, open, high, low, close, volume) -> float:
+        true_range = high - low
+        if self.last_close is not None:
+            true_range = max(true_range, abs(high - self.last_close), abs(low - self.last_close))
+        self.value = true_range if self.value is None else self.value + (true_range - self.value) / self.period
+        self.last_close = close
+        return self.value
+
+
+class Volatility(AbstractIndicator):
+    """Standard deviation of the log returns of the close over the last period bars."""
+    def __init__(self, period : int = 20, name : str = None) -> None:
+        self.period = period
+        super().__init__(name = name if name is not None else f"volatility_{period}")
+
+    @property
+    def warmup_steps(self) -> int:
+        return self.period + 1
+
+    def reset(self) -> None:
+        self.last_close = None
+        self.returns = RollingWindow(self.period)
+
+    def update(self, open, high, low, close, volume) -> float:
+        if self.last_close is not None and self.last_close > 0 and close > 0:
+            self.returns.push(log(close / self.last_close))
+        self.last_close = close
+        return self.returns.std
+
+
+class VWAP(AbstractIndicator):
+    """Volume weighted average of the typical price (high + low + close) / 3 over the last period bars."""
+    def __init__(self, period : int = 20, name : str = None) -> None:
+        self.period = period
+        super().__init__(name = name if name is not None else f"vwap_{period}")
+
+    @property
+    def warmup_steps(self) -> int:
+        return self.period
+
+    def reset(self) -> None:
+        self.price_volumes = RollingWindow(self.period)
+        self.volumes = RollingWindow(self.period)
+
+    def update(self, open, high, low, close, volume) -> float:
+        self.price_volumes.push((high + low + close) / 3 * volume)
+        self.volumes.push(volume)
+        if self.volumes.sum <= 0: return close
+        return self.price_volumes.sum / self.volumes.sum
+
+
+class VolumeZScore(AbstractIndicator):
+    """Z-score of the volume against the mean and standard deviation of the last period volumes."""
+    def __init__(self, period : int = 20, name : str = None) -> None:
+        self.period = period
+        super().__init__(name = name if name is not None else f"volume_zscore_{period}")
+
+    @property
+    def warmup_steps(self) -> int:
+        return self.period
+
+    def reset(self) -> None:
+        self.volumes = RollingWindow(self.period)
+
+    def update(self, open, high, low, close, volume) -> float:
+        self.volumes.push(volume)
+        std = self.volumes.std
+        if std == 0: return 0.
+        return (volume - self.volumes.mean) / std
+
+
+class IndicatorObserver(AbstractObserver):
+    """
+    Observe technical indicators of a pair. The indicators are updated in O(1) with the bar of each new step
+    (in forward), instead of being computed over raw windows.
+    In SIMULATION, the env steps through simulation_warmup_steps (the longest warmup of the indicators) before the first observation.
+    In PRODUCTION, the indicators are warmed up at reset over the bars of the previous warmup steps.
+
+    Parameters
+    ----------
+    pair : Pair
+        Pair whose bars feed the indicators.
+    indicators : List[AbstractIndicator]
+        E.g [EMA(20), RSI(14), ATR(14), Volatility(20), VWAP(20), VolumeZScore(20)]
+    memory_size : int
+        Number of past steps whose values can still be observed (e.g by a RecurrentObserver).
+    """
+    def __init__(self, pair : Pair, indicators : List[AbstractIndicator], memory_size : int = 1_000, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.pair = pair
+        self.indicators = indicators
+        self.memory_size = memory_size
+        names = [indicator.name for indicator in self.indicators]
+        if len(set(names)) != len(names): raise ValueError(f"Indicator names must be unique (got {names}).")
+
+    @property
+    def order_index(self):
+        # forward reads the bar of the step : after the pair simulations (order_index 0) have computed it
+        return 10
+
+    @property
+    def simulation_warmup_steps(self) -> int:
+        return max([indicator.warmup_steps for indicator in self.indicators], default= 0)
+
+    @property
+    def history_pairs(self) -> list:
+        return [self.pair]
+
+    def observation_space(self) -> Space:
+        return Dict(spaces = {
+            indicator.name : Box(low= -np.inf, high= np.inf, dtype= float) for indicator in self.indicators
+        })
+
+    async def reset(self, seed = None) -> None:
+        self.time_manager = self.get_trading_env().time_manager
+        self.exchange_manager = self.get_trading_env().exchange_manager
+        for indicator in self.indicators:
+            indicator.reset()
+        self.memory : OrderedDict[datetime, dict] = OrderedDict()
+        self.last_date = None
+
+        if self.get_trading_env().mode == Mode.PRODUCTION and self.simulation_warmup_steps > 0:
+            date = await self.time_manager.get_current_datetime()
+            dates = [
+                await self.time_manager.get_historical_datetime(step_back= step_back, relative_date= date)
+                for step_back in range(self.simulation_warmup_steps, 0, -1)
+            ]
+            # The whole warmup window in a single call
+            tickers = await self.exchange_manager.get_tickers(pairs= [self.pair], dates= dates)
+            for warmup_date, bar in zip(dates, tickers.get_pair(self.pair)):
+                self.push(warmup_date, tuple(float(value) for value in bar))
+
+    async def forward(self, date : datetime, seed = None) -> None:
+        await self.update(date)
+
+    async def update(self, date : datetime) -> None:
+        if self.last_date is not None and date <= self.last_date: return
+        ticker = await self.exchange_manager.get_ticker(pair= self.pair, date= date)
+        self.push(date, (float(ticker.open.amount), float(ticker.high.amount), float(ticker.low.amount), float(ticker.close.amount), float(ticker.volume.amount)))
+
+    def push(self, date : datetime, bar : tuple) -> None:
+        self.memory[date] = {indicator.name : indicator.update(*bar) for indicator in self.indicators}
+        self.last_date = date
+        if len(self.memory) > self.memory_size:
+            self.memory.popitem(last= False)
+
+    async def get_obs(self, date : datetime = None):
+        if date is None: date = await self.get_step_context().get_date()
+        if date not in self.memory:
+            if self.last_date is None or date > self.last_date: await self.update(date)
+            else: raise ValueError(f"Indicators at {date} are not in memory anymore (memory_size = {self.memory_size}).")
+        return self.memory[date].copy()
+
+    async def write_obs(self, out : np.ndarray, layout, date : datetime = None) -> None:
+        if date is None: date = await self.get_step_context().get_date()
+        if date not in self.memory: await self.get_obs(date= date)
+        for name, value in self.memory[date].items():
+            out[layout.indexes[name]] = value
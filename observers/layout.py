@@ -0,0 +1,77 @@
+import numpy as np
+from datetime import datetime
+from typing import Dict, Optional
+from gymnasium.spaces import Space, Box, Dict as DictSpace
+
+from .observer import AbstractObserver
+
+
+class ObservationLayout:
+    """
+    Fixed position of every feature of an observation space (a Box, or a Dict of Boxes) in a flat float64 vector.
+    Keys are laid out in the order of the Dict space. Datetimes are stored as timestamps (exact in float64, rounded to ~2 minutes in float32).
+    """
+    def __init__(self, space : Space) -> None:
+        self.slices : Dict[Optional[str], slice] = {}
+        if isinstance(space, Box):
+            self.size = int(np.prod(space.shape))
+            self.slices[None] = slice(0, self.size)
+        elif isinstance(space, DictSpace):
+            start = 0
+            for key, sub_space in space.spaces.items():
+                if not isinstance(sub_space, Box): raise TypeError(f"Space {sub_space.__class__.__name__} of {key} can not be flattened. Please consider using Box spaces.")
+                size = int(np.prod(sub_space.shape))
+                self.slices[key] = slice(start, start + size)
+                start += size
+            self.size = start
+        else:
+            raise TypeError(f"Space {space.__class__.__name__} not handled. Please consider using Box or Dict spaces.")
+        # Start index of the features of size 1, which are written as scalars
+        self.indexes : Dict[Optional[str], int] = {key : s.start for key, s in self.slices.items() if s.stop - s.start == 1}
+
+    def observation_space(self) -> Box:
+        return Box(low= -np.inf, high= np.inf, shape= (self.size,), dtype= np.float64)
+
+    def flatten(self, obs, out : np.ndarray) -> np.ndarray:
+        """Write an observation (array, or dict) into out, following the layout."""
+        if None in self.slices:
+            out[:] = np.ravel(obs)
+            return out
+        for key, feature_slice in self.slices.items():
+            value = obs[key]
+            if isinstance(value, datetime): value = value.timestamp()
+            out[feature_slice] = np.ravel(value)
+        return out
+
+
+class CompiledObserver(AbstractObserver):
+    """
+    Expose the observations of an observer tree as a flat float64 vector with a Box space.
+    The layout is computed once, at construction, from the observation space of the tree. Then, at each step, the
+    observers write their features directly in the slots of a preallocated buffer (see AbstractObserver.write_obs),
+    without building any dict.
+
+    Parameters
+    ----------
+    sub_observer : AbstractObserver
+        Root of the observer tree. Its space must be a Box, or a Dict of Boxes.
+    copy : bool
+        Return a copy of the buffer (default). If False, the same buffer is returned (and overwritten) at every step.
+    """
+    def __init__(self, sub_observer : AbstractObserver, copy = True, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.sub_observer = sub_observer
+        self.copy = copy
+        self.layout = ObservationLayout(self.sub_observer.observation_space())
+        self.buffer = np.zeros(self.layout.size, dtype= np.float64)
+
+    @property
+    def simulation_warmup_steps(self):
+        return self.sub_observer.simulation_warmup_steps
+
+    def observation_space(self) -> Space:
+        return self.layout.observation_space()
+
+    async def get_obs(self, date : datetime = None) -> np.ndarray:
+        await self.sub_observer.__write_obs__(out= self.buffer, layout= self.layout, date= date)
+        return self.buffer.copy() if self.copy else self.buffer
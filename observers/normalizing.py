@@ -0,0 +1,152 @@
+import numpy as np
+from datetime import datetime
+from typing import Dict, List
+from gymnasium.spaces import Space, Box
+
+from .observer import AbstractObserver
+from .layout import ObservationLayout
+
+
+class RunningStatistics:
+    """
+    Per-feature running mean and variance, updated with vectorized Welford updates (Chan et al. formula for batches),
+    so that statistics computed separately (e.g by parallel envs) can be merged exactly.
+    """
+    def __init__(self, size : int) -> None:
+        self.count = 0
+        self.mean = np.zeros(size, dtype= np.float64)
+        self.m2 = np.zeros(size, dtype= np.float64)
+
+    @property
+    def variance(self) -> np.ndarray:
+        return self.m2 / self.count if self.count > 0 else np.ones_like(self.m2)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.variance)
+
+    def update(self, values : np.ndarray) -> None:
+        """Add a (size,) observation, or a (n, size) batch of observations."""
+        values = np.asarray(values, dtype= np.float64).reshape(-1, self.mean.shape[0])
+        self.combine(len(values), values.mean(axis= 0), values.var(axis= 0) * len(values))
+
+    def merge(self, other : "RunningStatistics") -> None:
+        """Add the observations counted by other."""
+        if other.mean.shape != self.mean.shape: raise ValueError(f"Can not merge statistics of size {other.mean.shape[0]} into statistics of size {self.mean.shape[0]}.")
+        self.combine(other.count, other.mean, other.m2)
+
+    def combine(self, count : int, mean : np.ndarray, m2 : np.ndarray) -> None:
+        if count == 0: return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (count / total)
+        self.m2 = self.m2 + m2 + delta ** 2 * (self.count * count / total)
+        self.count = total
+
+    def difference(self, base : "RunningStatistics") -> "RunningStatistics":
+        """Statistics of the observations added since self was equal to base."""
+        difference = RunningStatistics(size= self.mean.shape[0])
+        count = self.count - base.count
+        if count <= 0: return difference
+        mean = (self.mean * self.count - base.mean * base.count) / count
+        delta = mean - base.mean
+        difference.count = count
+        difference.mean = mean
+        difference.m2 = np.maximum(self.m2 - base.m2 - delta ** 2 * (base.count * count / self.count), 0.)
+        return difference
+
+    def copy(self) -> "RunningStatistics":
+        copy = RunningStatistics(size= self.mean.shape[0])
+        copy.set_state(self.get_state())
+        return copy
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        return {"count" : np.array(self.count), "mean" : self.mean.copy(), "m2" : self.m2.copy()}
+
+    def set_state(self, state : Dict[str, np.ndarray]) -> None:
+        if state["mean"].shape != self.mean.shape: raise ValueError(f"Can not load statistics of size {state['mean'].shape[0]} into statistics of size {self.mean.shape[0]}.")
+        self.count = int(state["count"])
+        self.mean = np.array(state["mean"], dtype= np.float64)
+        self.m2 = np.array(state["m2"], dtype= np.float64)
+
+    def save(self, path : str) -> None:
+        np.savez(path, **self.get_state())
+
+    def load(self, path : str) -> None:
+        with np.load(path) as state:
+            self.set_state(dict(state))
+
+
+class NormalizingObserver(AbstractObserver):
+    """
+    Normalize the observations of a sub_observer (Box, or Dict of Boxes) with running per-feature statistics :
+    returns (obs - mean) / std, clipped, as a flat float32 array (laid out as in observers.layout.ObservationLayout).
+    The statistics are updated once per new date (not when past dates are observed again, e.g by a RecurrentObserver)
+    and are kept across resets. Freeze them for evaluation.
+
+    Parameters
+    ----------
+    sub_observer : AbstractObserver
+        Observer to normalize.
+    clip : float
+        Normalized values are clipped to [-clip, clip].
+    frozen : bool
+        If True, the statistics are not updated.
+    epsilon : float
+        Added to the variance.
+    """
+    def __init__(self, sub_observer : AbstractObserver, clip : float = 10., frozen : bool = False, epsilon : float = 1E-8, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.sub_observer = sub_observer
+        self.clip = clip
+        self.frozen = frozen
+        self.epsilon = epsilon
+        self.sub_layout = ObservationLayout(self.sub_observer.observation_space())
+        self.statistics = RunningStatistics(size= self.sub_layout.size)
+        # Statistics at the last merge : only what was added since is merged the next time
+        self.merged_statistics = RunningStatistics(size= self.sub_layout.size)
+        self.buffer = np.zeros(self.sub_layout.size, dtype= np.float64)
+
+    @property
+    def simulation_warmup_steps(self):
+        return self.sub_observer.simulation_warmup_steps
+
+    def observation_space(self) -> Space:
+        return Box(low= -np.inf, high= np.inf, shape= (self.sub_layout.size,), dtype= np.float32) # Normalized values are small : float32 is enough
+
+    async def reset(self, seed = None) -> None:
+        self.last_update_date = None
+
+    def freeze(self) -> None:
+        self.frozen = True
+
+    def unfreeze(self) -> None:
+        self.frozen = False
+
+    def save(self, path : str) -> None:
+        self.statistics.save(path)
+
+    def load(self, path : str) -> None:
+        self.statistics.load(path)
+        self.merged_statistics = self.statistics.copy()
+
+    def merge(self, others : List["NormalizingObserver"]) -> None:
+        """
+        Share the statistics of self and others (e.g the observers of parallel envs) : each one gets the statistics of all of them.
+        Can be called repeatedly (e.g every n steps) : only the observations added since the last merge are merged.
+        """
+        merged = self.merged_statistics.copy()
+        for observer in [self] + others:
+            merged.merge(observer.statistics.difference(observer.merged_statistics))
+        for observer in [self] + others:
+            observer.statistics = merged.copy()
+            observer.merged_statistics = merged.copy()
+
+    async def get_obs(self, date : datetime = None) -> np.ndarray:
+        if date is None: date = await self.get_step_context().get_date()
+        await self.sub_observer.__write_obs__(out= self.buffer, layout= self.sub_layout, date= date)
+        if not self.frozen and (self.last_update_date is None or date > self.last_update_date):
+            self.statistics.update(self.buffer)
+            self.last_update_date = date
+        normalized = (self.buffer - self.statistics.mean) / np.sqrt(self.statistics.variance + self.epsilon)
+        return np.clip(normalized, -self.clip, self.clip).astype(np.float32)
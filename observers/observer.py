@@ -14,6 +14,18 @@ class AbstractObserver(AbstractEnvironmentElement, ABC):
     async def __get_obs__(self, date : datetime = None, **kwargs) -> np.ndarray:
         return self.transform(await self.get_obs(date= date))
 
+    async def __write_obs__(self, out : np.ndarray, layout : "ObservationLayout", date : datetime = None) -> None:
+        # A transformed observation can only be written once built
+        if self._transform_function is not None:
+            layout.flatten(await self.__get_obs__(date= date), out)
+        else:
+            await self.write_obs(out= out, layout= layout, date= date)
+
+    async def write_obs(self, out : np.ndarray, layout : "ObservationLayout", date : datetime = None) -> None:
+        """Write the observation in out, at the slots given by layout (see observers.layout.ObservationLayout).
+        By default, the observation is built with get_obs and then flattened : observers can override it to write their features directly."""
+        layout.flatten(await self.get_obs(date= date), out)
+
 
     @abstractmethod
     async def get_obs(self, date : datetime = None) -> np.ndarray:
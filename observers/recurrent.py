@@ -3,12 +3,13 @@ import pandas as pd
 import asyncio
 from datetime import datetime, timedelta
 from gymnasium.spaces import Space, Box, Sequence
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from copy import deepcopy
 
 from ..time_managers import AbstractTimeManager
 from ..utils.speed_analyser import astep_timer
 from .observer import AbstractObserver
+from .layout import ObservationLayout
 
 
 class RecurrentObserver(AbstractObserver):
@@ -18,7 +19,7 @@ class RecurrentObserver(AbstractObserver):
     it queries the sub_observer for the last 'window' timesteps.
     """
 
-    def __init__(self, sub_observer: AbstractObserver, window: int, not_trainable_window = None, **kwargs) -> None:
+    def __init__(self, sub_observer: AbstractObserver, window: int, not_trainable_window = None, as_array = False, **kwargs) -> None:
         """
         Parameters
         ----------
@@ -26,10 +27,16 @@ class RecurrentObserver(AbstractObserver):
             The observer that provides single-step observations.
         window : int
             How many timesteps to look back when forming an observation.
+        as_array : bool
+            If True, the observations of the sub_observer (Box, or Dict of Boxes) are flattened into the rows of
+            a float64 ring buffer and a (window, n_features) array is returned, with a Box space.
+            Only one sub observation is fetched per step (the whole window is fetched again after a gap or a reset).
+            Datetimes are converted to timestamps (float64 keeps them exact : float32 would round them to ~2 minutes).
         """
         super().__init__(**kwargs)
         self.sub_observer = sub_observer
         self.window = window
+        self.as_array = as_array
         self.not_trainable_window = not_trainable_window if not_trainable_window is not None else window 
 
         # Holds date -> observation. We only keep enough entries
@@ -44,6 +51,13 @@ class RecurrentObserver(AbstractObserver):
         self.time_manager = self.get_trading_env().time_manager
         self.infos_manager = self.get_trading_env().infos_manager
         self.memory.clear()
+        if self.as_array:
+            self.layout = ObservationLayout(self.sub_observer.observation_space())
+            # Each row is written twice (at i and i + window) so that the last window rows are always contiguous
+            self.buffer = np.zeros((2 * self.window, self.layout.size), dtype= np.float64)
+            self.nb_rows = 0
+            self.last_date = None
+            self.last_window_dates = deque(maxlen= self.window)
 
         if self.first:
             self.infos_manager.infos_func.append(self.reccurent_check)
@@ -63,6 +77,9 @@ class RecurrentObserver(AbstractObserver):
         observation_space is also a Box. Otherwise NotImplemented.
         """
         sub_space = self.sub_observer.observation_space()
+        if self.as_array:
+            layout = ObservationLayout(sub_space)
+            return Box(low= -np.inf, high= np.inf, shape= (self.window, layout.size), dtype= np.float64)
         return Sequence(space= sub_space)
         # if isinstance(sub_space, Box):
         #     shape = (self.window,) + sub_space.shape
@@ -85,6 +102,33 @@ class RecurrentObserver(AbstractObserver):
                 self.memory.popitem(last=False)
 
 
+    async def _append(self, dates : list[datetime]) -> None:
+        """Write the sub observations of dates in the next rows (the sub observer writes them directly in the buffer)."""
+        indexes = [(self.nb_rows + i) % self.window for i in range(len(dates))]
+        await self.gather(*[
+            self.sub_observer.__write_obs__(out= self.buffer[index], layout= self.layout, date= date) for index, date in zip(indexes, dates)
+        ])
+        for index in indexes:
+            self.buffer[index + self.window] = self.buffer[index]
+        self.nb_rows += len(dates)
+        self.last_date = dates[-1]
+        self.last_window_dates.extend(dates)
+
+    async def _get_array_obs(self, date : datetime) -> np.ndarray:
+        if date != self.last_date:
+            previous_date = await self.time_manager.get_historical_datetime(step_back=1, relative_date=date)
+            if self.last_date is not None and previous_date == self.last_date:
+                await self._append([date])
+            else:
+                # First call or gap : fetch the whole window
+                window_dates = []
+                for s in range(self.window - 1, -1, -1):
+                    window_dates.append(await self.time_manager.get_historical_datetime(step_back=s, relative_date=date))
+                await self._append(window_dates)
+
+        index = (self.nb_rows - 1) % self.window
+        return self.buffer[index + 1 : index + 1 + self.window].copy()
+
     async def get_obs(self, date: datetime) -> np.ndarray:
         """
         Return a stacked array of shape (window, sub_observer_obs_shape),
@@ -93,6 +137,8 @@ class RecurrentObserver(AbstractObserver):
         """
         if date is None:
             date = await self.time_manager.get_current_datetime()
+        if self.as_array:
+            return await self._get_array_obs(date)
 
         # For a "window" W, we want timesteps [W-1, W-2, ..., 0] steps back
         steps_back = range(self.window - 1, -1, -1)
@@ -138,7 +184,7 @@ class RecurrentObserver(AbstractObserver):
             "trainable" : False
         }
 
-        for window_date in self.last_window_dates[-self.not_trainable_window:]:
+        for window_date in list(self.last_window_dates)[-self.not_trainable_window:]:
             if window_date < date and window_date in self.infos_manager.historical_infos:
                 historical_infos = self.infos_manager.historical_infos[window_date]
                 if not historical_infos['_reccurent_trainable']:
@@ -3,6 +3,7 @@ import numpy as np
 from datetime import datetime
 
 from ..exchanges.responses import TickerResponse
+from ..exchanges.exceptions import PairNotFound
 from ..core import Pair
 from ..utils.async_lru import alru_cache
 
@@ -26,6 +27,10 @@ class TickerObserver(AbstractObserver):
     def simulation_warmup_steps(self):
         return 0
 
+    @property
+    def history_pairs(self) -> list:
+        return [self.pair]
+
     def observation_space(self) -> Space:
         return Dict(spaces = {
             "ticker_date" : Box(low= 0, high = np.inf, dtype = float),
@@ -37,8 +42,8 @@ class TickerObserver(AbstractObserver):
         })
 
     async def get_obs(self, date : datetime = None):
-        if date is None: date = await self.time_manager.get_current_datetime()
-        ticker = await self.exchange_manager.get_ticker(pair = self.pair, date = date)
+        ticker = await self.get_step_context().get_ticker(pair = self.pair, date = date)
+        if date is None: date = await self.get_step_context().get_date()
         return {
             "ticker_date" : date,
             "ticker_open" : float(ticker.open.amount),
@@ -48,7 +53,55 @@ class TickerObserver(AbstractObserver):
             "ticker_volume" : float(ticker.volume.amount)
         }
 
+    async def write_obs(self, out : np.ndarray, layout, date : datetime = None) -> None:
+        ticker = await self.get_step_context().get_ticker(pair = self.pair, date = date)
+        if date is None: date = await self.get_step_context().get_date()
+        indexes = layout.indexes
+        out[indexes["ticker_date"]] = date.timestamp()
+        out[indexes["ticker_open"]] = ticker.open.amount
+        out[indexes["ticker_high"]] = ticker.high.amount
+        out[indexes["ticker_low"]] = ticker.low.amount
+        out[indexes["ticker_close"]] = ticker.close.amount
+        out[indexes["ticker_volume"]] = ticker.volume.amount
+
+
+
+
+
+
+
+class MultiTickerObserver(AbstractObserver):
+    """
+    Observe the bars of several pairs as a (len(pairs), 5) float32 array (open, high, low, close, volume),
+    fetched with a single batched exchange call per step (see AbstractExchange.get_bars) instead of one ticker per pair.
+    The pairs must be listed by the exchange in this direction.
+    """
+    def __init__(self, pairs : list[Pair], **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.pairs = list(pairs)
+
+    async def reset(self, seed = None) -> None:
+        self.exchange_manager = self.get_trading_env().exchange_manager
+        for pair in self.pairs:
+            if pair not in self.exchange_manager.available_pairs: raise PairNotFound(pair= pair)
+
+    @property
+    def simulation_warmup_steps(self):
+        return 0
+
+    @property
+    def history_pairs(self) -> list:
+        return self.pairs
 
+    def observation_space(self) -> Space:
+        return Box(low= 0, high= np.inf, shape= (len(self.pairs), 5), dtype= np.float32)
 
+    async def get_bars(self, date : datetime = None) -> np.ndarray:
+        if date is None: date = await self.get_step_context().get_date()
+        return await self.exchange_manager.get_bars(pairs= self.pairs, date= date)
 
+    async def get_obs(self, date : datetime = None) -> np.ndarray:
+        return (await self.get_bars(date= date)).astype(np.float32)
 
+    async def write_obs(self, out : np.ndarray, layout, date : datetime = None) -> None:
+        out[layout.slices[None]] = (await self.get_bars(date= date)).ravel()
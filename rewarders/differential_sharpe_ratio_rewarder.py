@@ -43,15 +43,7 @@ class ComputedDifferentialSharpeRatioRewarder(AbstractRewarder, AbstractChecker)
     # Called after forward
     async def compute_reward(self):
         # Compute requirements
-        current_portfolio, current_datetime = await self.gather(
-            self.exchange_manager.get_portfolio(),
-            self.time_manager.get_current_datetime() 
-        )
-
-        current_valuation = await self.__compute_valuation(
-            portfolio= current_portfolio,
-            date= current_datetime
-        )
+        current_valuation = await self.get_step_context().get_valuation(quote_asset= self.quote_asset)
 
         R_current = current_valuation.amount / self.last_valuation.amount - Decimal("1")
 
@@ -98,8 +90,7 @@ class MoodyDifferentialSharpeRatioRewarder(AbstractRewarder, AbstractChecker):
         self.time_manager = self.get_trading_env().time_manager
         self.portfolio_manager = self.get_trading_env().portfolio_manager
 
-        portfolio = await self.exchange_manager.get_portfolio()
-        self.last_valuation = await self.__compute_valuation(portfolio= portfolio, date= await self.time_manager.get_current_datetime())
+        self.last_valuation = await self.get_step_context().get_valuation(quote_asset= self.quote_asset)
 
         self.A_last = Decimal("0")
         self.B_last = Decimal("0")
@@ -120,15 +111,8 @@ class MoodyDifferentialSharpeRatioRewarder(AbstractRewarder, AbstractChecker):
     # Called after forward
     async def compute_reward(self):
         # Compute requirements
-        current_portfolio, current_datetime = await self.gather(
-            self.exchange_manager.get_portfolio(),
-            self.time_manager.get_current_datetime() 
-        )
-
-        current_valuation = await self.__compute_valuation(
-            portfolio= current_portfolio,
-            date= current_datetime
-        )
+        current_portfolio = await self.get_step_context().get_portfolio()
+        current_valuation = await self.get_step_context().get_valuation(quote_asset= self.quote_asset)
 
         return_t = current_valuation.amount / self.last_valuation.amount - Decimal("1")
 
@@ -169,9 +153,4 @@ class MoodyDifferentialSharpeRatioRewarder(AbstractRewarder, AbstractChecker):
         self.B_last = B_current
         
         self.steps += 1
-        return float(reward)
-
-    async def __compute_valuation(self, portfolio : Portfolio, date : datetime = None):
-        return await self.portfolio_manager.valuation(
-            portfolio= portfolio, date= date, quote_asset= self.quote_asset
-        )  
\ No newline at end of file
+        return float(reward)
\ No newline at end of file
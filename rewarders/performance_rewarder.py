@@ -18,26 +18,12 @@ class PerformanceRewarder(AbstractRewarder):
         self.time_manager = self.get_trading_env().time_manager
         self.portfolio_manager = self.get_trading_env().portfolio_manager
         
-        portfolio = await self.exchange_manager.get_portfolio()
-        self.last_valuation = await self.__compute_valuation(portfolio= portfolio, date= await self.time_manager.get_current_datetime())
-
-    async def __compute_valuation(self, portfolio : Portfolio, date : datetime = None):
-        return await self.portfolio_manager.valuation(
-            portfolio= portfolio, date= date, quote_asset= self.quote_asset
-        )
+        self.last_valuation = await self.get_step_context().get_valuation(quote_asset= self.quote_asset)
 
     async def compute_reward(self):
         # Compute requirements
         
-        current_portfolio, current_datetime = await self.gather(
-            self.exchange_manager.get_portfolio(),
-            self.time_manager.get_current_datetime() 
-        )
-
-        current_valuation = await self.__compute_valuation(
-            portfolio= current_portfolio,
-            date= current_datetime
-        )
+        current_valuation = await self.get_step_context().get_valuation(quote_asset= self.quote_asset)
 
         # Compute rewards
         try:
@@ -1,3 +1,6 @@
 from .simulation import AbstractPairSimulation
 from .random_simulation import RandomPairSimulation
-from .historical_simulation import HistoricalSimulation
\ No newline at end of file
+from .historical_simulation import HistoricalSimulation
+from .feature_store import FeatureStore
+from ..utils.feature_cache import FeatureCache
+from .trade_replay_simulation import TradeReplaySimulation
\ No newline at end of file
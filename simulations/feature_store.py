@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Union
+from warnings import warn
+
+from ..utils.feature_cache import FeatureCache, fingerprint, function_fingerprint
+
+
+class FeatureStore:
+    """
+    Features computed once over the entire dataset of a HistoricalSimulation, instead of at every step.
+
+    Each feature function receives the bars aggregated at every step of an (interval, alignment) layout
+    (a DataFrame indexed by the step dates, with columns open, high, low, close and volume) and must return
+    one value per step, e.g : lambda bars : bars["close"].pct_change().rolling(20).std()
+    The results are stacked into a (n_steps, n_features) float32 tensor, attached to the layout.
+    Values must only depend on the current and past bars : nothing checks for lookahead.
+
+    Parameters
+    ----------
+    features : Dict[str, Callable[[pd.DataFrame], Union[pd.Series, np.ndarray]]]
+        Feature name -> vectorized feature function.
+    intervals : List[timedelta]
+        Step intervals whose layouts (for every alignment) are computed at set_df time.
+        The layouts of other intervals are computed at their first use.
+    cache : FeatureCache
+        If given, tensors are stored on disk, keyed by the fingerprints of the dataset, of the layout and of the feature functions
+        (code, defaults and closure values : give a new name to a feature whose result depends on anything else).
+        Features whose function can not be fingerprinted (e.g closing over an object that is not hashed by content) are
+        computed every time instead, with a warning.
+    """
+    def __init__(self, features : Dict[str, Callable[[pd.DataFrame], Union[pd.Series, np.ndarray]]], intervals : List[timedelta] = [], cache : FeatureCache = None) -> None:
+        self.features = features
+        self.names = list(features.keys())
+        self.intervals = intervals
+        self.cache = cache
+        self.fingerprints : Optional[Dict[str, Optional[str]]] = None # Computed at the first use of the cache
+
+    def get_fingerprints(self) -> Dict[str, Optional[str]]:
+        """Fingerprint of every feature function, or None for the ones which can not be fingerprinted (they are not cached)."""
+        if self.fingerprints is None:
+            self.fingerprints = {}
+            for name, function in self.features.items():
+                try:
+                    self.fingerprints[name] = function_fingerprint(function)
+                except TypeError as e:
+                    warn(f"Feature {name} is not cached : {e}")
+                    self.fingerprints[name] = None
+        return self.fingerprints
+
+    def get_tensor(self, source_key : tuple, get_bars : Callable[[], pd.DataFrame]) -> np.ndarray:
+        """Tensor of the bars returned by get_bars. The cached features are loaded from the cache (without building the bars)
+        when source_key was already computed."""
+        if self.cache is None: return self.compute(get_bars())
+        fingerprints = self.get_fingerprints()
+        cached_names = [name for name in self.names if fingerprints[name] is not None]
+        uncached_names = [name for name in self.names if fingerprints[name] is None]
+        if len(cached_names) == 0: return self.compute(get_bars())
+
+        bars = [] # Built once, and only if needed
+        def get_bars_once() -> pd.DataFrame:
+            if len(bars) == 0: bars.append(get_bars())
+            return bars[0]
+
+        cached_tensor = self.cache.get_or_compute(
+            key = fingerprint(source_key, [(name, fingerprints[name]) for name in cached_names]),
+            compute = lambda : self.compute(get_bars_once(), names= cached_names)
+        )
+        if len(uncached_names) == 0: return cached_tensor
+        tensor = np.empty((len(cached_tensor), len(self.names)), dtype= np.float32)
+        tensor[:, [self.names.index(name) for name in cached_names]] = cached_tensor
+        tensor[:, [self.names.index(name) for name in uncached_names]] = self.compute(get_bars_once(), names= uncached_names)
+        return tensor
+
+    def compute(self, bars : pd.DataFrame, names : List[str] = None) -> np.ndarray:
+        """(n_steps, len(names)) tensor of the features names (all of them by default)."""
+        names = self.names if names is None else names
+        tensor = np.empty((len(bars), len(names)), dtype= np.float32)
+        for i, name in enumerate(names):
+            values = np.asarray(self.features[name](bars), dtype= np.float32)
+            if values.shape != (len(bars),):
+                raise ValueError(f"Feature {name} must return one value per step (expected shape {(len(bars),)}, got {values.shape}).")
+            tensor[:, i] = values
+        return tensor
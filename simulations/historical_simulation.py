@@ -2,14 +2,30 @@
 import pandas as pd
 import numpy as np
 import pytz
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from functools import partial
 from warnings import warn
-from typing import Dict, Tuple, Union
+from typing import Dict, List, Tuple, Union, Optional
 
 from .simulation import AbstractPairSimulation
+from .feature_store import FeatureStore
 from ..checkers import AbstractChecker
 from ..core.pair import Pair
+from ..utils.feature_cache import fingerprint
+
+
+@dataclass
+class StepLayout:
+    """Per-step arrays precomputed for a given interval and alignment.
+    Step k closes at grid_start + k * interval."""
+    interval : timedelta
+    grid_start : datetime
+    indexes : np.ndarray        # Index of the last row closing at or before the step date
+    row_present : np.ndarray    # A row exists exactly at the step date
+    index_gaps : np.ndarray     # Number of rows aggregated since the previous step
+    trainable : np.ndarray      # Enough rows and no missing row
+    features : Optional[np.ndarray] = None # (n_steps, n_features) tensor of the FeatureStore
 
 
 class HistoricalSimulation(AbstractPairSimulation, AbstractChecker):
@@ -23,7 +39,8 @@ class HistoricalSimulation(AbstractPairSimulation, AbstractChecker):
             close_name = "close",
             volume_name = "volume",
             other_aggregation : Dict[str, object]= {},
-            on_missing_date = "error"
+            on_missing_date = "error",
+            feature_store : FeatureStore = None
             ) -> None:
         
         super().__init__()
@@ -49,6 +66,7 @@ class HistoricalSimulation(AbstractPairSimulation, AbstractChecker):
         if on_missing_date not in ["error", "warn", None]:
             raise ValueError("on_missing_date must be in ['error', 'warn', None].")
         self.on_missing_date = on_missing_date
+        self.feature_store = feature_store
 
 
     def set_df(self, 
@@ -73,6 +91,7 @@ class HistoricalSimulation(AbstractPairSimulation, AbstractChecker):
         self.dates = self.dataframe.index.to_numpy()
         self.data_array = self.dataframe.to_numpy()
         self.data_array_len = len(self.data_array)
+        self.ohlcv_array = self.dataframe[["open", "high", "low", "close", "volume"]].to_numpy(dtype= float)
 
         # Check if columns from other_aggregation exist
         for col in self.other_aggregation.keys():
@@ -86,13 +105,136 @@ class HistoricalSimulation(AbstractPairSimulation, AbstractChecker):
             if col in self.name_aggreation:
                 self.aggregation[col] = partial(func, i = i, col = col)
 
+        # Layouts depend on the data : computed again at the first use of each interval
+        self.layouts : Dict[Tuple[timedelta, np.timedelta64], StepLayout] = {}
+        self.fingerprint = None
+
+        # Precompute the features for every alignment of the intervals declared by the feature store
+        if self.feature_store is not None:
+            first_date = pd.Timestamp(self.dates[0]).tz_localize("UTC").to_pydatetime()
+            for interval in self.feature_store.intervals:
+                for offset in range(max(int(interval / self.main_interval), 1)):
+                    self.get_layout(interval= interval, date= first_date + interval + offset * self.main_interval)
+
+    def get_layout(self, interval : timedelta, date : datetime) -> StepLayout:
+        """Return the StepLayout of the steps spaced by interval and aligned on date.
+        It is computed once for each (interval, alignment)."""
+        np_date = np.datetime64(date.astimezone(pytz.UTC).replace(tzinfo = None), "ns")
+        np_interval = np.timedelta64(interval).astype("timedelta64[ns]")
+        key = (interval, (np_date - self.dates[0]) % np_interval)
+        if key in self.layouts: return self.layouts[key]
+
+        nb_steps_before = (np_date - self.dates[0]) // np_interval
+        nb_steps_after = (self.dates[-1] - np_date) // np_interval + 1
+        grid = np_date + np.arange(-nb_steps_before, nb_steps_after + 1) * np_interval
+
+        indexes = np.searchsorted(self.dates, grid, side="right") - 1
+        row_present = self.dates[indexes] == grid
+        index_gaps = np.diff(indexes, prepend= indexes[0])
+        theoritical_index_gap = interval / self.main_interval
+
+        layout = StepLayout(
+            interval = interval,
+            grid_start = date - interval * int(nb_steps_before),
+            indexes = indexes,
+            row_present = row_present,
+            index_gaps = index_gaps,
+            trainable = (index_gaps >= theoritical_index_gap * 0.8) & row_present
+        )
+        if self.feature_store is not None:
+            get_bars = lambda : self.get_step_bars(layout= layout, grid= grid)
+            if self.feature_store.cache is None:
+                layout.features = self.feature_store.compute(get_bars())
+            else: # Hashing the dataset is only needed to key the cache
+                layout.features = self.feature_store.get_tensor(source_key = (self.get_fingerprint(), key, str(grid[0])), get_bars = get_bars)
+        self.layouts[key] = layout
+        return layout
+
+    def get_fingerprint(self) -> str:
+        """Fingerprint of the dataset (dates and OHLCV), computed once."""
+        if self.fingerprint is None:
+            self.fingerprint = fingerprint(self.dates, *[self.dataframe[column].to_numpy(dtype= float) for column in ["open", "high", "low", "close", "volume"]])
+        return self.fingerprint
+
+    def get_step_bars(self, layout : StepLayout, grid : np.ndarray) -> pd.DataFrame:
+        """Bars aggregated at every step of layout, as forward does : the rows since the previous step,
+        or the last row if there is none."""
+        indexes = np.maximum(layout.indexes, 0)
+        non_empty = layout.index_gaps > 0
+        bars = {}
+        for column in ["open", "high", "low", "close", "volume"]:
+            values = self.dataframe[column].to_numpy(dtype= float)
+            # When the step is empty, the bar is the last row
+            bars[column] = values[indexes].copy()
+            if not non_empty.any(): continue
+            # The rows of the non empty steps are contiguous : one reduceat over the rows up to the last of them
+            starts = (indexes - layout.index_gaps + 1)[non_empty]
+            rows = values[:indexes[non_empty][-1] + 1]
+            if column == "open": bars[column][non_empty] = values[starts]
+            elif column == "high": bars[column][non_empty] = np.maximum.reduceat(rows, starts)
+            elif column == "low": bars[column][non_empty] = np.minimum.reduceat(rows, starts)
+            elif column == "volume": bars[column][non_empty] = np.add.reduceat(rows, starts)
+        return pd.DataFrame(bars, index= pd.DatetimeIndex(grid, tz= "UTC"))
+
+    def get_features(self, date : datetime) -> np.ndarray:
+        """Row of the FeatureStore tensor at the step of date. Reading a date out of the alignment of the current steps
+        does not change the layout used by forward."""
+        if self.layout.features is None: raise ValueError("No feature_store was given to this simulation.")
+        layout, step = self._find_step(date)
+        if step < 0 or step >= len(layout.features): raise ValueError(f"No features for date : {date}.")
+        return layout.features[step]
+
+    def get_data_array(self, dates : List[datetime]) -> np.ndarray:
+        """Bars of dates, aggregated as forward does, sliced from the data (the dates do not need to be in memory).
+        Falls back to the memory (which raises for missing dates) for dates out of the current layout, or after the current date (no lookahead)."""
+        layout = self.layout
+        if len(dates) == 0: return np.empty((0, 5), dtype= float)
+        if max(dates) > self.current_date: return super().get_data_array(dates = dates)
+        date_index = dates if isinstance(dates, pd.DatetimeIndex) else pd.DatetimeIndex(dates)
+        if date_index.unit != "ns": date_index = date_index.as_unit("ns")
+        elapsed = date_index.asi8 - pd.Timestamp(layout.grid_start).as_unit("ns").value
+        steps, remainders = np.divmod(elapsed, pd.Timedelta(layout.interval).value)
+        if remainders.any() or steps.min() < 0 or steps.max() >= len(layout.indexes): return super().get_data_array(dates = dates)
+        indexes = layout.indexes[steps]
+        if indexes.min() < 0: return super().get_data_array(dates = dates)
+
+        # Rows since the previous step, or the last row if there is none
+        lengths = np.maximum(layout.index_gaps[steps], 1)
+        starts = indexes - lengths + 1
+        offsets = np.arange(lengths.max())
+        rows = np.minimum(starts[:, None] + offsets, indexes[:, None]) # Padded with the last row (harmless for max and min)
+        array = np.empty((len(dates), 5), dtype= float)
+        array[:, 0] = self.ohlcv_array[starts, 0]
+        array[:, 1] = self.ohlcv_array[rows, 1].max(axis= 1)
+        array[:, 2] = self.ohlcv_array[rows, 2].min(axis= 1)
+        array[:, 3] = self.ohlcv_array[indexes, 3]
+        array[:, 4] = np.where(offsets < lengths[:, None], self.ohlcv_array[rows, 4], 0).sum(axis= 1)
+        return array
+
+    def _find_step(self, date : datetime) -> Tuple[StepLayout, int]:
+        """Layout aligned on date (the current one if date is aligned on it) and step of date in it."""
+        layout = self.layout
+        elapsed = date - layout.grid_start
+        if elapsed % layout.interval != timedelta(0):
+            layout = self.get_layout(interval= layout.interval, date= date)
+            elapsed = date - layout.grid_start
+        return layout, elapsed // layout.interval
+
+    def _get_step(self, date : datetime) -> int:
+        # The time manager may have changed its alignment : the steps follow it
+        self.layout, step = self._find_step(date)
+        return step
+
     async def reset(self, seed = None) -> None:
         self.time_manager = self.get_trading_env().time_manager
         date = await self.time_manager.get_current_datetime()
         np_date = np.datetime64(date.astimezone(pytz.UTC).replace(tzinfo = None))
         if np_date >= self.dates[-1] or np_date <= self.dates[0]: raise ValueError(f"This date {date} is not valid. Please select a date between {self.dates[0]} and {self.dates[-1]}")
 
-        self.past_index = np.searchsorted(self.dates, np_date, side="left")
+        interval = date - await self.time_manager.get_historical_datetime(step_back= 1, relative_date= date)
+        self.layout = self.get_layout(interval= interval, date= date)
+        self.past_step = self._get_step(date)
+        self.past_index = self.layout.indexes[self.past_step]
         self.past_date = date
         await super().reset(seed = seed)
         
@@ -101,17 +243,21 @@ class HistoricalSimulation(AbstractPairSimulation, AbstractChecker):
 
         
     async def forward(self, date : datetime) -> None:
-        np_date = np.datetime64(date.astimezone(pytz.UTC).replace(tzinfo = None))
         await super().forward(date= date)
 
-        index = np.searchsorted(self.dates, np_date, side="right")-1
+        if date == self.past_date + self.layout.interval: step = self.past_step + 1
+        else: step = self._get_step(date)
+
+        if step < len(self.layout.indexes):
+            index = self.layout.indexes[step]
+            self.trainable = bool(self.layout.row_present[step])
+        else: # After the last row
+            index, self.trainable = self.data_array_len - 1, False
 
-        self.trainable = True
-        if np_date != self.dates[index]: 
+        if not self.trainable:
             message = f'No row found for date : {date}.'
-            self.trainable = False
             if self.on_missing_date == "warn" : warn(message= message)
-            elif self.on_missing_date == "error" : ValueError(message)
+            elif self.on_missing_date == "error" : raise ValueError(message)
         
         real_index_gap = index - self.past_index
         if real_index_gap > 0:
@@ -125,17 +271,17 @@ class HistoricalSimulation(AbstractPairSimulation, AbstractChecker):
 
 
         data = self.__aggregrate(array=array)
-        theoritical_index_gap = (date - self.past_date)/self.main_interval
-        self.last_trainable = True
-        if real_index_gap < theoritical_index_gap * 0.8 :
-            self.last_trainable= False
-
-
+        if step == self.past_step + 1 and step < len(self.layout.trainable):
+            self.last_trainable = bool(self.layout.trainable[step])
+        else:
+            theoritical_index_gap = (date - self.past_date) / self.main_interval
+            self.last_trainable = self.trainable and real_index_gap >= theoritical_index_gap * 0.8
 
         self.update_memory(date=date, data=data)
 
         self.last_index_gap = real_index_gap
         self.past_index = index
+        self.past_step = step
         self.past_date = date
 
 
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
+from typing import List
+import numpy as np
 from ..element import AbstractEnvironmentElement
 
 class AbstractPairSimulation(AbstractEnvironmentElement, ABC):
@@ -32,6 +34,14 @@ class AbstractPairSimulation(AbstractEnvironmentElement, ABC):
         except KeyError as e:
             raise KeyError("Data not found.")
 
+    def get_data_array(self, dates : List[datetime]) -> np.ndarray:
+        """(len(dates), 5) array of open, high, low, close and volume. By default, read from the memory."""
+        array = np.empty((len(dates), 5), dtype= float)
+        for i, date in enumerate(dates):
+            data = self.get_data(date = date)
+            array[i] = (data["open"], data["high"], data["low"], data["close"], data["volume"])
+        return array
+
     def update_memory(self, date, data):
         if date in data: raise ValueError("Can not add to memory a data at an already existing date.")
         self._data_memory[date] = data
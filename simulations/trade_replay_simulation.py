@@ -0,0 +1,133 @@
+
+import numpy as np
+import pytz
+from datetime import datetime
+from typing import Dict, Tuple
+
+from .simulation import AbstractPairSimulation
+from ..checkers import AbstractChecker
+from ..core.pair import Pair
+
+
+class TradeReplaySimulation(AbstractPairSimulation, AbstractChecker):
+    """
+    A pair simulation that replays raw trade prints and aggregates them
+    into OHLCV bars on the fly. A bar closing at `date` contains exactly the
+    trades with past_date <= timestamp < date, so any interval chosen by the
+    time manager is supported without pre-building bars.
+    The arrays are never copied : they can be memory-mapped (np.load(..., mmap_mode = "r")).
+    """
+    def __init__(self,
+            pair : Pair,
+            timestamps : np.ndarray,
+            prices : np.ndarray,
+            sizes : np.ndarray,
+            timestamp_unit = "ns",
+            memory_size = 1000
+            ) -> None:
+        """
+        Parameters
+        ----------
+        pair : Pair
+            The traded pair. sizes are expressed in pair.asset.
+        timestamps : np.ndarray
+            Sorted trade timestamps, either datetime64 or integers since epoch (UTC).
+        prices : np.ndarray
+            Trade prices expressed in pair.quote_asset.
+        sizes : np.ndarray
+            Trade sizes expressed in pair.asset.
+        timestamp_unit : str
+            Unit of integer timestamps ("s", "ms", "us" or "ns").
+        """
+        super().__init__(memory_size= memory_size)
+        self.pair = pair
+
+        if np.issubdtype(timestamps.dtype, np.integer):
+            # Viewing the memory is only valid for int64 (no copy then) : other integer types are converted first
+            timestamps = timestamps.astype(np.int64, copy= False).view(f"datetime64[{timestamp_unit}]")
+        elif not np.issubdtype(timestamps.dtype, np.datetime64):
+            raise TypeError(f"timestamps must be datetime64 or integers (got {timestamps.dtype}).")
+        if not (len(timestamps) == len(prices) == len(sizes)):
+            raise ValueError("timestamps, prices and sizes must have the same length.")
+        if len(timestamps) == 0:
+            raise ValueError("At least one trade is required.")
+
+        self.timestamps = timestamps
+        self.prices = prices
+        self.sizes = sizes
+        self.nb_trades = len(timestamps)
+
+    def _to_np_date(self, date : datetime) -> np.datetime64:
+        return np.datetime64(date.astimezone(pytz.UTC).replace(tzinfo = None)).astype(self.timestamps.dtype)
+
+    async def reset(self, seed = None) -> None:
+        self.time_manager = self.get_trading_env().time_manager
+        date = await self.time_manager.get_current_datetime()
+        np_date = self._to_np_date(date)
+        if np_date > self.timestamps[-1] or np_date <= self.timestamps[0]: raise ValueError(f"This date {date} is not valid. Please select a date between {self.timestamps[0]} and {self.timestamps[-1]}")
+
+        self.past_index = int(np.searchsorted(self.timestamps, np_date, side="left"))
+        self.past_date = date
+        self.last_trainable = False
+
+    def aggregate(self, bounds : np.ndarray, last_close : float = None) -> Dict[str, np.ndarray]:
+        """
+        Aggregate the trades in len(bounds) - 1 consecutive bars, where bar i
+        holds the trades of indexes bounds[i] <= index < bounds[i+1].
+        Bars without any trade are forward filled with the previous close and a null volume.
+
+        Returns:
+            Dict[str, np.ndarray]: open, high, low, close, volume and nb_trades arrays.
+        """
+        bounds = np.asarray(bounds, dtype = np.int64)
+        starts, ends = bounds[:-1], bounds[1:]
+        counts = ends - starts
+        nb_bars = len(starts)
+
+        result = {
+            "open" : np.empty(nb_bars), "high" : np.empty(nb_bars), "low" : np.empty(nb_bars),
+            "close" : np.empty(nb_bars), "volume" : np.zeros(nb_bars), "nb_trades" : counts
+        }
+        filled = counts > 0
+        if filled.any():
+            # reduceat only needs the slice covering the requested bars
+            first, last = bounds[0], bounds[-1]
+            prices = np.asarray(self.prices[first:last], dtype = float)
+            sizes = np.asarray(self.sizes[first:last], dtype = float)
+            indices = starts[filled] - first
+
+            result["high"][filled] = np.maximum.reduceat(prices, indices)
+            result["low"][filled] = np.minimum.reduceat(prices, indices)
+            result["volume"][filled] = np.add.reduceat(sizes, indices)
+            result["open"][filled] = prices[indices]
+            result["close"][filled] = prices[ends[filled] - 1 - first]
+
+        if not filled.all():
+            # Forward fill the close price into empty bars
+            if last_close is None:
+                last_close = float(self.prices[bounds[0] - 1]) if bounds[0] > 0 else float(self.prices[0])
+            positions = np.where(filled, np.arange(nb_bars), -1)
+            np.maximum.accumulate(positions, out = positions)
+            previous_close = np.where(positions >= 0, result["close"][np.maximum(positions, 0)], last_close)
+            for key in ["open", "high", "low", "close"]:
+                result[key][~filled] = previous_close[~filled]
+        return result
+
+    async def forward(self, date : datetime) -> None:
+        index = int(np.searchsorted(self.timestamps, self._to_np_date(date), side="left"))
+
+        bar = self.aggregate(bounds = [self.past_index, index])
+        data = {col : bar[col][0] for col in ["open", "high", "low", "close", "volume"]}
+        self.last_trainable = bool(bar["nb_trades"][0] > 0)
+
+        self.update_memory(date=date, data=data)
+
+        self.past_index = index
+        self.past_date = date
+
+    async def check(self) -> Tuple[bool, bool, bool]:
+        return (
+            False,
+            self.past_index >= self.nb_trades,
+            self.last_trainable
+        )
@@ -0,0 +1,108 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+import pytz
+from datetime import datetime, timedelta
+
+from gym_trading_env2.environments import RLTradingEnv
+from gym_trading_env2.core import Asset, Pair, Value, Portfolio
+from gym_trading_env2.simulations import HistoricalSimulation
+from gym_trading_env2.exchanges import SimulationExchange
+from gym_trading_env2.managers import ExchangeManager
+from gym_trading_env2.time_managers import IntervalTimeManager
+from gym_trading_env2.actions import ContinuousExpositionActionManager
+from gym_trading_env2.observers import ExpositionObserver, RecurrentObserver
+from gym_trading_env2.rewarders import PerformanceRewarder
+from gym_trading_env2.infos_manager import InfosManager
+from gym_trading_env2.element import Mode
+
+USDT, BTC, ETH = Asset("USDT"), Asset("BTC"), Asset("ETH")
+
+
+def make_df(seed : int, price : float, n : int = 2000) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = price * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    dates = pd.date_range(datetime(2021, 1, 1), periods= n, freq= "5min")
+    return pd.DataFrame({
+        "date_open" : dates, "date_close" : dates + pd.Timedelta("5min"),
+        "open" : np.r_[close[0], close[:-1]], "high" : close * 1.001, "low" : close * 0.999, "close" : close, "volume" : rng.uniform(1, 10, n)
+    }).set_index("date_open")
+
+
+async def make_env(action_manager : ContinuousExpositionActionManager) -> RLTradingEnv:
+    simulations = {}
+    for seed, (pair, price) in enumerate([(Pair(BTC, USDT), 30000), (Pair(ETH, USDT), 1500)]):
+        simulations[pair] = HistoricalSimulation(pair= pair)
+        simulations[pair].set_df(make_df(seed, price))
+    env = RLTradingEnv(name= "test", mode= Mode.SIMULATION,
+        time_manager= IntervalTimeManager(interval= timedelta(minutes= 30), simulation_start_date= datetime(2021, 1, 2, tzinfo= pytz.UTC), simulation_end_date= datetime(2021, 1, 5, tzinfo= pytz.UTC)),
+        exchange_manager= ExchangeManager(SimulationExchange(initial_portfolio= Portfolio([Value(10000, USDT)]), pair_simulations= simulations, trading_fees_pct= 0)),
+        action_manager= action_manager,
+        observer= RecurrentObserver(ExpositionObserver([Pair(BTC, USDT)], USDT), window= 2), rewarder= PerformanceRewarder(USDT),
+        infos_manager= InfosManager([Pair(BTC, USDT)], USDT))
+    await env.reset()
+    return env
+
+
+def test_simplex_weights():
+    action_manager = ContinuousExpositionActionManager([BTC, ETH], USDT, mode= "simplex")
+    assert action_manager.action_space().shape == (2,)
+    assert (action_manager.action_space().low == 0).all() and (action_manager.action_space().high == 1).all()
+    np.testing.assert_allclose(action_manager.get_weights([0.2, 0.3]), [0.2, 0.3])
+    np.testing.assert_allclose(action_manager.get_weights([0.8, 0.6]), [0.8 / 1.4, 0.6 / 1.4]) # Scaled down to sum to 1
+    np.testing.assert_allclose(action_manager.get_weights([-0.5, 1.5]), [0, 1])                 # Clipped to [0, 1]
+    np.testing.assert_allclose(action_manager.get_weights([np.nan, 0.4]), [0, 0.4])
+
+
+def test_leverage_weights():
+    action_manager = ContinuousExpositionActionManager([BTC, ETH], USDT, mode= "leverage", max_leverage= 2)
+    assert (action_manager.action_space().low == -2).all() and (action_manager.action_space().high == 2).all()
+    np.testing.assert_allclose(action_manager.get_weights([0.5, -0.5]), [0.5, -0.5])
+    np.testing.assert_allclose(action_manager.get_weights([1.5, -1.5]), [1, -1])         # Gross exposition scaled down to 2
+    np.testing.assert_allclose(action_manager.get_weights([3, -1]), [4 / 3, -2 / 3])     # Clipped to [-2, 2], then scaled down
+
+
+def test_invalid_parameters_raise():
+    for kwargs in [dict(mode= "unknown"), dict(mode= "leverage", max_leverage= 0)]:
+        with pytest.raises(ValueError):
+            ContinuousExpositionActionManager([BTC, ETH], USDT, **kwargs)
+    with pytest.raises(ValueError):
+        ContinuousExpositionActionManager([BTC, USDT], USDT)
+
+
+@pytest.mark.parametrize("mode, max_leverage, action, expected", [
+    ("simplex", 1, [0.25, 0.5], {BTC : 0.25, ETH : 0.5, USDT : 0.25}),
+    ("simplex", 1, [0.9, 0.6], {BTC : 0.6, ETH : 0.4, USDT : 0.}),
+    ("leverage", 2, [3, -1], {BTC : 4 / 3, ETH : -2 / 3, USDT : 1 / 3}),
+])
+def test_actions_are_rebalanced_to_the_target_exposition(mode, max_leverage, action, expected):
+    async def run():
+        action_manager = ContinuousExpositionActionManager([BTC, ETH], USDT, mode= mode, max_leverage= max_leverage)
+        env = await make_env(action_manager)
+        exchange_manager = env.exchange_manager
+        sent_orders, market_orders = [], exchange_manager.market_orders
+        async def spy(orders):
+            sent_orders.append(orders)
+            return await market_orders(orders)
+        exchange_manager.market_orders = spy
+
+        await action_manager.execute(action)
+        date = await env.time_manager.get_current_datetime()
+        report = await env.portfolio_manager.report(portfolio= await exchange_manager.get_portfolio(), date= date, quote_asset= USDT)
+        target = {asset : action_manager.target_vector[exchange_manager.asset_indexes[asset]] for asset in [BTC, ETH, USDT]}
+        exposition = {position.asset : float(position.amount) for position in report.exposition.get_positions()}
+        return sent_orders, target, exposition
+
+    sent_orders, target, exposition = asyncio.run(run())
+    for asset, weight in expected.items():
+        assert target[asset] == pytest.approx(weight, abs= 1E-12)
+        assert exposition.get(asset, 0) == pytest.approx(weight, abs= 1E-9)
+    # A single batch, each order selling an asset whose exposition decreases for one whose exposition increases
+    initial = {USDT : 1., BTC : 0., ETH : 0.}
+    increases = {asset for asset, weight in expected.items() if weight > initial[asset] + 1E-12}
+    decreases = {asset for asset, weight in expected.items() if weight < initial[asset] - 1E-12}
+    assert len(sent_orders) == 1 and len(sent_orders[0]) <= len(increases) + len(decreases) - 1
+    for pair, quantity in sent_orders[0]:
+        assert quantity.asset == pair.quote_asset and quantity.amount < 0
+        assert pair.asset in increases and pair.quote_asset in decreases
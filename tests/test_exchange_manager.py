@@ -0,0 +1,124 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytz
+from datetime import datetime, timedelta
+
+from gym_trading_env2.environments import RLTradingEnv
+from gym_trading_env2.core import Asset, Pair, Value, Portfolio
+from gym_trading_env2.simulations import HistoricalSimulation
+from gym_trading_env2.exchanges import SimulationExchange
+from gym_trading_env2.managers import ExchangeManager
+from gym_trading_env2.time_managers import IntervalTimeManager
+from gym_trading_env2.actions import DiscreteActionManager, DiscreteExpositionAction
+from gym_trading_env2.observers import ExpositionObserver, RecurrentObserver
+from gym_trading_env2.rewarders import PerformanceRewarder
+from gym_trading_env2.infos_manager import InfosManager
+from gym_trading_env2.element import Mode
+
+USDT, BTC, ETH = Asset("USDT"), Asset("BTC"), Asset("ETH")
+
+
+def make_df(seed : int, price : float, n : int = 2000) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = price * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    dates = pd.date_range(datetime(2021, 1, 1), periods= n, freq= "5min")
+    return pd.DataFrame({
+        "date_open" : dates, "date_close" : dates + pd.Timedelta("5min"),
+        "open" : np.r_[close[0], close[:-1]], "high" : close * 1.001, "low" : close * 0.999, "close" : close, "volume" : rng.uniform(1, 10, n)
+    }).set_index("date_open")
+
+
+async def make_exchange_manager(trading_fees_pct : float = 0.001) -> ExchangeManager:
+    # ETH is only listed against BTC : ETH/USDT orders go through BTC
+    simulations = {}
+    for seed, (pair, price) in enumerate([(Pair(BTC, USDT), 30000), (Pair(ETH, BTC), 0.05)]):
+        simulations[pair] = HistoricalSimulation(pair= pair)
+        simulations[pair].set_df(make_df(seed, price))
+    exchange_manager = ExchangeManager(SimulationExchange(
+        initial_portfolio= Portfolio([Value(10000, USDT)]), pair_simulations= simulations, trading_fees_pct= trading_fees_pct
+    ))
+    env = RLTradingEnv(name= "test", mode= Mode.SIMULATION,
+        time_manager= IntervalTimeManager(interval= timedelta(minutes= 30), simulation_start_date= datetime(2021, 1, 2, tzinfo= pytz.UTC), simulation_end_date= datetime(2021, 1, 5, tzinfo= pytz.UTC)),
+        exchange_manager= exchange_manager, action_manager= DiscreteActionManager([DiscreteExpositionAction({USDT : 1.}, USDT)]),
+        observer= RecurrentObserver(ExpositionObserver([Pair(BTC, USDT)], USDT), window= 2), rewarder= PerformanceRewarder(USDT),
+        infos_manager= InfosManager([Pair(BTC, USDT)], USDT))
+    await env.reset()
+    return exchange_manager
+
+
+def test_routed_orders_leave_no_residual_on_the_intermediate_asset():
+    async def run():
+        exchange_manager = await make_exchange_manager()
+        await exchange_manager.market_order(quantity= Value(0.5, ETH), pair= Pair(ETH, USDT))    # Buy ETH with USDT
+        await exchange_manager.market_order(quantity= Value(-200, USDT), pair= Pair(ETH, USDT))  # Spend USDT to buy ETH
+        await exchange_manager.market_orders([
+            (Pair(ETH, USDT), Value(-0.3, ETH)),     # Sell ETH for USDT
+            (Pair(USDT, ETH), Value(100, USDT)),     # Buy USDT with ETH
+        ])
+        return await exchange_manager.get_portfolio()
+
+    portfolio = asyncio.run(run())
+    positions = {position.asset : position.amount for position in portfolio.get_positions()}
+    assert abs(positions.get(BTC, 0)) < 1E-12
+    assert positions[ETH] > 0 and positions[USDT] > 0
+
+
+def test_opposite_legs_cancelling_out_are_dropped():
+    async def run():
+        exchange_manager = await make_exchange_manager(trading_fees_pct= 0)
+        price = (await exchange_manager.get_quotation(pair= Pair(ETH, BTC), date= await exchange_manager.time_manager.get_current_datetime())).amount
+        return await exchange_manager.plan_orders([
+            (Pair(ETH, BTC), Value(0.3, ETH)),
+            (Pair(BTC, ETH), Value(0.3 * price, BTC)), # Sells back the same 0.3 ETH
+        ])
+
+    assert asyncio.run(run()) == []
+
+
+def test_invalidated_market_data_drops_the_valuation_reports():
+    async def run():
+        exchange_manager = await make_exchange_manager()
+        env = exchange_manager.get_trading_env()
+        portfolio, date = await exchange_manager.get_portfolio(), await env.time_manager.get_current_datetime()
+        report = await env.portfolio_manager.report(portfolio= portfolio, date= date, quote_asset= USDT)
+        assert await env.portfolio_manager.report(portfolio= portfolio, date= date, quote_asset= USDT) is report
+        exchange_manager.invalidate_market_data()
+        return report, await env.portfolio_manager.report(portfolio= portfolio, date= date, quote_asset= USDT)
+
+    report, fresh_report = asyncio.run(run())
+    assert fresh_report is not report
+
+
+def test_routed_legs_are_grossed_up_by_the_fees():
+    async def run():
+        exchange_manager = await make_exchange_manager(trading_fees_pct= 0.001)
+        date = await exchange_manager.time_manager.get_current_datetime()
+        prices = [(await exchange_manager.get_quotation(pair= pair, date= date)).amount for pair in [Pair(ETH, BTC), Pair(BTC, USDT)]]
+        await exchange_manager.market_order(quantity= Value(0.5, ETH), pair= Pair(ETH, USDT))
+        return prices, await exchange_manager.get_portfolio()
+
+    (eth_btc, btc_usdt), portfolio = asyncio.run(run())
+    positions = {position.asset : position.amount for position in portfolio.get_positions()}
+    ratio = 1 - 0.001
+    assert abs(positions[ETH] - 0.5) < 1E-12
+    assert abs(positions.get(BTC, 0)) < 1E-12
+    # Both legs pay the fees on their counterpart
+    assert abs((10000 - positions[USDT]) - 0.5 * eth_btc / ratio * btc_usdt / ratio) < 1E-6
+
+
+def test_opposite_legs_are_netted_and_only_pay_the_fees_of_the_net():
+    async def run():
+        exchange_manager = await make_exchange_manager(trading_fees_pct= 0.001)
+        orders = [(Pair(ETH, USDT), Value(0.5, ETH)), (Pair(ETH, USDT), Value(-0.2, ETH))]
+        planned_orders = await exchange_manager.plan_orders(orders)
+        await exchange_manager.market_orders(orders)
+        return planned_orders, await exchange_manager.get_portfolio()
+
+    planned_orders, portfolio = asyncio.run(run())
+    planned = {pair : value for pair, value in planned_orders}
+    assert set(planned) == {Pair(ETH, BTC), Pair(BTC, USDT)}
+    assert planned[Pair(ETH, BTC)].asset == ETH and abs(planned[Pair(ETH, BTC)].amount - 0.3) < 1E-12
+    positions = {position.asset : position.amount for position in portfolio.get_positions()}
+    assert abs(positions[ETH] - 0.3) < 1E-12
+    assert abs(positions.get(BTC, 0)) < 1E-12
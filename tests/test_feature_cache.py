@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from functools import partial
+
+from gym_trading_env2.utils.feature_cache import FeatureCache, fingerprint, function_fingerprint
+
+
+def make_feature(weights):
+    return lambda bars : bars["close"] * weights.sum()
+
+
+def test_large_arrays_are_fingerprinted_by_content():
+    # numpy truncates the repr of arrays over 1000 elements : only one element in the middle differs
+    weights = np.zeros(5000)
+    other_weights = weights.copy()
+    other_weights[2500] = 1
+    assert function_fingerprint(make_feature(weights)) == function_fingerprint(make_feature(weights.copy()))
+    assert function_fingerprint(make_feature(weights)) != function_fingerprint(make_feature(other_weights))
+    assert fingerprint([weights]) != fingerprint([other_weights])
+
+
+def test_defaults_and_partials_are_fingerprinted_by_content():
+    def feature(bars, weights = np.zeros(2000)): return bars
+    def other_feature(bars, weights = np.ones(2000)): return bars
+    assert function_fingerprint(feature) != function_fingerprint(other_feature)
+    assert function_fingerprint(partial(feature, weights= np.zeros(2000))) != function_fingerprint(partial(feature, weights= np.ones(2000)))
+
+
+def test_objects_without_content_fingerprint_are_rejected():
+    class Parameters: pass
+    with pytest.raises(TypeError):
+        function_fingerprint(make_feature(Parameters()))
+    with pytest.raises(TypeError):
+        fingerprint(np.array([Parameters()], dtype= object))
+
+
+def test_get_or_compute_returns_arrays_larger_than_the_cache(tmp_path):
+    cache = FeatureCache(path= str(tmp_path), max_size= 100)
+    small = cache.get_or_compute("small", lambda : np.zeros(4))
+    large = cache.get_or_compute("large", lambda : np.arange(1000.))
+    np.testing.assert_array_equal(small, np.zeros(4))
+    np.testing.assert_array_equal(large, np.arange(1000.))
+    # The array just saved is kept, the older one is evicted
+    assert cache.load("large") is not None
+    assert cache.load("small") is None
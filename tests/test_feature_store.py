@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+
+from gym_trading_env2.core import Asset, Pair
+from gym_trading_env2.simulations import HistoricalSimulation, FeatureStore, FeatureCache
+
+USDT, BTC = Asset("USDT"), Asset("BTC")
+
+
+class Config:
+    period = 3
+
+
+def make_df() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, 500)))
+    dates = pd.date_range(datetime(2021, 1, 1), periods= len(close), freq= "5min")
+    return pd.DataFrame({
+        "date_open" : dates, "date_close" : dates + pd.Timedelta("5min"),
+        "open" : np.r_[close[0], close[:-1]], "high" : close * 1.001, "low" : close * 0.999, "close" : close, "volume" : rng.uniform(1, 10, len(close))
+    }).set_index("date_open")
+
+
+def make_features() -> dict:
+    config, weights = Config(), pd.Series([1., 2.])
+    return {
+        "cached" : lambda bars : bars["close"].pct_change(),
+        "config" : lambda bars : bars["close"].rolling(config.period, min_periods= 1).mean(),
+        "series" : lambda bars : bars["volume"] * weights.sum(),
+    }
+
+
+def make_simulation(feature_store : FeatureStore) -> HistoricalSimulation:
+    simulation = HistoricalSimulation(pair= Pair(BTC, USDT), feature_store= feature_store)
+    simulation.set_df(make_df())
+    return simulation
+
+
+def test_features_without_cache_are_not_fingerprinted():
+    simulation = make_simulation(FeatureStore(features= make_features(), intervals= [timedelta(minutes= 15)]))
+    assert simulation.feature_store.fingerprints is None
+    assert simulation.fingerprint is None # The dataset is not hashed either
+    layout = next(iter(simulation.layouts.values()))
+    assert layout.features.shape == (len(layout.indexes), 3)
+
+
+def test_features_which_can_not_be_fingerprinted_are_computed_without_cache(tmp_path):
+    reference = make_simulation(FeatureStore(features= make_features(), intervals= [timedelta(minutes= 15)]))
+    with pytest.warns(UserWarning, match= "is not cached"):
+        simulation = make_simulation(FeatureStore(features= make_features(), intervals= [timedelta(minutes= 15)], cache= FeatureCache(str(tmp_path))))
+    assert [name for name, value in simulation.feature_store.fingerprints.items() if value is None] == ["config", "series"]
+    for key, layout in simulation.layouts.items():
+        np.testing.assert_array_equal(layout.features, reference.layouts[key].features)
+    assert len(list(tmp_path.glob("*.npy"))) == len(simulation.layouts) # Only the cached feature is stored
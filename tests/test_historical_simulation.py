@@ -0,0 +1,141 @@
+import asyncio
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+import pytz
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from gym_trading_env2.core import Asset, Pair
+from gym_trading_env2.simulations import HistoricalSimulation, FeatureStore
+from gym_trading_env2.element import Mode
+
+USDT, BTC = Asset("USDT"), Asset("BTC")
+
+
+def make_simulation() -> HistoricalSimulation:
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, 2000)))
+    dates = pd.date_range(datetime(2021, 1, 1), periods= len(close), freq= "5min")
+    df = pd.DataFrame({
+        "date_open" : dates, "date_close" : dates + pd.Timedelta("5min"),
+        "open" : np.r_[close[0], close[:-1]], "high" : close * 1.001, "low" : close * 0.999, "close" : close, "volume" : rng.uniform(1, 10, len(close))
+    }).set_index("date_open")
+    simulation = HistoricalSimulation(pair= Pair(BTC, USDT), feature_store= FeatureStore(
+        features= {"close" : lambda bars : bars["close"]}, intervals= [timedelta(minutes= 30)]
+    ))
+    simulation.set_df(df)
+    return simulation
+
+
+def test_get_features_of_an_unaligned_date_keeps_the_layout():
+    simulation = make_simulation()
+    date = datetime(2021, 1, 2, tzinfo= pytz.UTC)
+    simulation.layout = simulation.get_layout(interval= timedelta(minutes= 30), date= date)
+    layout = simulation.layout
+
+    aligned = simulation.get_features(date)
+    unaligned = simulation.get_features(date + timedelta(minutes= 5)) # Another alignment of the 30 minutes steps
+    assert simulation.layout is layout
+    assert aligned.shape == unaligned.shape == (1,)
+    assert not np.array_equal(aligned, unaligned)
+
+
+class FakeTimeManager:
+    def __init__(self, date : datetime, interval : timedelta) -> None:
+        self.date, self.interval = date, interval
+
+    async def get_current_datetime(self) -> datetime:
+        return self.date
+
+    async def get_historical_datetime(self, step_back : int, relative_date : datetime = None) -> datetime:
+        return (relative_date or self.date) - step_back * self.interval
+
+
+def make_simulation_with_holes(on_missing_date = "error", missing_rows = (30, 31, 32, 33, 50, 70)):
+    rng = np.random.default_rng(1)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, 300)))
+    dates = pd.date_range(datetime(2021, 1, 1), periods= len(close), freq= "5min")
+    df = pd.DataFrame({
+        "date_open" : dates, "date_close" : dates + pd.Timedelta("5min"),
+        "open" : np.r_[close[0], close[:-1]], "high" : close * 1.001, "low" : close * 0.999, "close" : close, "volume" : rng.uniform(1, 10, len(close))
+    }).drop(index= list(missing_rows)).set_index("date_open")
+    simulation = HistoricalSimulation(pair= Pair(BTC, USDT), on_missing_date= on_missing_date)
+    simulation.set_df(df)
+    return simulation
+
+
+async def start(simulation : HistoricalSimulation, date : datetime, interval : timedelta) -> None:
+    simulation.set_trading_env(SimpleNamespace(time_manager= FakeTimeManager(date, interval), mode= Mode.SIMULATION))
+    await simulation.__reset__()
+
+
+def test_layout_matches_searchsorted_on_data_with_holes():
+    simulation = make_simulation_with_holes()
+    interval = timedelta(minutes= 15)
+    layout = simulation.get_layout(interval= interval, date= datetime(2021, 1, 1, 2, 5, tzinfo= pytz.UTC))
+    grid = np.datetime64(layout.grid_start.replace(tzinfo= None), "ns") + np.arange(len(layout.indexes)) * np.timedelta64(interval)
+
+    # Previous path : one searchsorted per step
+    indexes = np.searchsorted(simulation.dates, grid, side= "right") - 1
+    np.testing.assert_array_equal(layout.indexes, indexes)
+    np.testing.assert_array_equal(layout.row_present, simulation.dates[indexes] == grid)
+    np.testing.assert_array_equal(layout.index_gaps[1:], np.diff(indexes))
+    np.testing.assert_array_equal(layout.trainable, (layout.index_gaps >= 3 * 0.8) & layout.row_present)
+    assert not layout.row_present.all() and not layout.trainable[1:].all() # The holes are seen
+
+
+def test_forward_raises_on_a_missing_date():
+    simulation = make_simulation_with_holes(on_missing_date= "error")
+    missing_date = pd.Timestamp(datetime(2021, 1, 1)) + 31 * pd.Timedelta("5min") + pd.Timedelta("5min") # Close of the dropped row 31
+    missing_date = missing_date.tz_localize("UTC").to_pydatetime()
+    interval = timedelta(minutes= 5)
+
+    async def run():
+        await start(simulation, missing_date - 5 * interval, interval)
+        for step in range(1, 5): await simulation.__forward__(missing_date - (5 - step) * interval)
+        await simulation.__forward__(missing_date)
+    with pytest.raises(ValueError, match= "No row found"):
+        asyncio.run(run())
+
+
+def test_forward_skips_missing_dates_and_cuts_trainable():
+    interval = timedelta(minutes= 15)
+    start_date = datetime(2021, 1, 1, 1, 5, tzinfo= pytz.UTC)
+    for on_missing_date in [None, "warn"]:
+        simulation = make_simulation_with_holes(on_missing_date= on_missing_date)
+        dates = [start_date + step * interval for step in range(1, 100)]
+
+        async def run():
+            await start(simulation, start_date, interval)
+            results = []
+            for date in dates:
+                await simulation.__forward__(date)
+                results.append((simulation.trainable, await simulation.check()))
+            return results
+
+        with warnings.catch_warnings(record= True) as caught:
+            warnings.simplefilter("always")
+            results = asyncio.run(run())
+        assert (len(caught) > 0) == (on_missing_date == "warn")
+
+        # Previous path : searchsorted at every forward, trainable cut when less than 80% of the rows were aggregated
+        np_dates = np.array([np.datetime64(date.replace(tzinfo= None), "ns") for date in dates])
+        indexes = np.searchsorted(simulation.dates, np_dates, side= "right") - 1
+        past_indexes = np.r_[np.searchsorted(simulation.dates, np.datetime64(start_date.replace(tzinfo= None), "ns"), side= "right") - 1, indexes[:-1]]
+        row_present = simulation.dates[indexes] == np_dates
+        gaps = indexes - past_indexes
+        for i, (trainable, (_, truncated, last_trainable)) in enumerate(results):
+            assert trainable == row_present[i]
+            assert last_trainable == (row_present[i] and gaps[i] >= 3 * 0.8)
+            assert truncated == (indexes[i] + gaps[i] + 1 >= simulation.data_array_len)
+        assert results[-1][1][1] # The last steps are after the data : truncated
+        assert not all(last_trainable for _, (_, _, last_trainable) in results)
+
+
+def test_reset_starts_from_the_last_row_before_a_missing_date():
+    simulation = make_simulation_with_holes()
+    missing_date = (pd.Timestamp(datetime(2021, 1, 1)) + 32 * pd.Timedelta("5min")).tz_localize("UTC").to_pydatetime() # Close of the dropped row 31
+    asyncio.run(start(simulation, missing_date, timedelta(minutes= 5)))
+    assert simulation.dates[simulation.past_index] == np.datetime64(missing_date.replace(tzinfo= None) - timedelta(minutes= 10), "ns")
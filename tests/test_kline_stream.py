@@ -0,0 +1,90 @@
+import asyncio
+import json
+from decimal import Decimal
+
+import pytest
+import websockets
+
+from gym_trading_env2.exchanges.kline_stream import KlineStore, BinanceKlineStream
+
+
+def kline_message(open_time : int, close : str = "100", closed : bool = True) -> dict:
+    return {"stream" : "btcusdt@kline_1m", "data" : {"e" : "kline", "k" : {
+        "s" : "BTCUSDT", "t" : open_time, "o" : "99", "h" : "101", "l" : "98", "c" : close, "v" : "5", "x" : closed
+    }}}
+
+
+async def run_stream(connections, timeout = 3):
+    """
+    Serve one callable per connection from a local stand-in of the combined stream endpoint.
+    Returns the store and the subscription requests received by the stand-in.
+    """
+    subscriptions = []
+    remaining = list(connections)
+    all_served = asyncio.Event()
+
+    async def handler(websocket):
+        subscriptions.append(json.loads(await websocket.recv()))
+        send = remaining.pop(0)
+        if len(remaining) == 0: all_served.set()
+        await send(websocket)
+
+    async with websockets.serve(handler, "localhost", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        store = KlineStore(interval= "1m")
+        stream = BinanceKlineStream(store= store, url= f"ws://localhost:{port}/stream", reconnect_delay= 0.05)
+        await stream.subscribe("BTCUSDT")
+        await stream.start()
+        try:
+            await asyncio.wait_for(all_served.wait(), timeout= timeout)
+            assert await store.wait_for_bar("BTCUSDT", 120_000, timeout= timeout)
+        finally:
+            await stream.stop()
+    return store, subscriptions
+
+
+def test_closed_klines_are_stored():
+    async def send(websocket):
+        await websocket.send(json.dumps(kline_message(60_000, closed= False))) # Still open : ignored
+        await websocket.send(json.dumps(kline_message(60_000, close= "100.5")))
+        await websocket.send(json.dumps(kline_message(120_000)))
+        await websocket.wait_closed()
+
+    store, subscriptions = asyncio.run(run_stream([send]))
+    assert subscriptions[0]["method"] == "SUBSCRIBE" and subscriptions[0]["params"] == ["btcusdt@kline_1m"]
+    assert store.get_bars("BTCUSDT", 60_000, 180_000) == [
+        (Decimal("99"), Decimal("101"), Decimal("98"), Decimal("100.5"), Decimal("5")),
+        (Decimal("99"), Decimal("101"), Decimal("98"), Decimal("100"), Decimal("5")),
+    ]
+
+
+def test_stream_reconnects_after_a_malformed_message():
+    async def send_malformed(websocket):
+        await websocket.send(json.dumps(kline_message(60_000)))
+        await websocket.send("not json")
+        await websocket.wait_closed()
+
+    async def send_next(websocket):
+        await websocket.send(json.dumps(kline_message(120_000)))
+        await websocket.wait_closed()
+
+    with pytest.warns(UserWarning, match= "Kline stream interrupted"):
+        store, subscriptions = asyncio.run(run_stream([send_malformed, send_next]))
+    assert len(subscriptions) == 2 # Subscribed again after reconnecting
+    assert store.get_bars("BTCUSDT", 60_000, 180_000) is not None
+
+
+def test_stream_reconnects_after_a_rejected_handshake():
+    rejected = []
+
+    async def reject(websocket):
+        rejected.append(True)
+        await websocket.close(code= 1008, reason= "rejected")
+
+    async def send(websocket):
+        await websocket.send(json.dumps(kline_message(120_000)))
+        await websocket.wait_closed()
+
+    with pytest.warns(UserWarning, match= "Kline stream interrupted"):
+        store, subscriptions = asyncio.run(run_stream([reject, send]))
+    assert rejected and len(subscriptions) == 2
@@ -0,0 +1,116 @@
+import asyncio
+import numpy as np
+from datetime import datetime, timedelta
+from gymnasium.spaces import Box
+
+from gym_trading_env2.environments import RLTradingEnv
+from gym_trading_env2.observers import AbstractObserver, NormalizingObserver
+from gym_trading_env2.observers.normalizing import RunningStatistics
+
+SIZE = 3
+DATES = [datetime(2021, 1, 1) + timedelta(minutes= i) for i in range(40)]
+
+
+class TableObserver(AbstractObserver):
+    """Observation of each date read from a table"""
+    def __init__(self, table : np.ndarray) -> None:
+        super().__init__()
+        self.table = table
+
+    def observation_space(self):
+        return Box(low= -np.inf, high= np.inf, shape= (SIZE,))
+
+    async def get_obs(self, date : datetime = None) -> np.ndarray:
+        return self.table[DATES.index(date)]
+
+
+def make_observer(seed : int, **kwargs) -> NormalizingObserver:
+    rng = np.random.default_rng(seed)
+    observer = NormalizingObserver(TableObserver(rng.normal(seed, 1 + seed, size= (len(DATES), SIZE))), **kwargs)
+    asyncio.run(observer.reset())
+    return observer
+
+
+def observe(observer : NormalizingObserver, dates) -> None:
+    async def run():
+        for date in dates: await observer.get_obs(date= date)
+    asyncio.run(run())
+
+
+def assert_statistics(statistics : RunningStatistics, data : np.ndarray) -> None:
+    assert statistics.count == len(data)
+    assert np.allclose(statistics.mean, np.mean(data, axis= 0), rtol= 1E-12, atol= 1E-12)
+    assert np.allclose(statistics.variance, np.var(data, axis= 0), rtol= 1E-10, atol= 1E-12)
+
+
+def test_batched_updates_match_numpy():
+    rng = np.random.default_rng(0)
+    batches = [rng.normal(100, 5, size= (n, SIZE)) for n in [1, 7, 1, 30, 2]]
+    statistics = RunningStatistics(size= SIZE)
+    for batch in batches:
+        statistics.update(batch[0] if len(batch) == 1 else batch)
+    assert_statistics(statistics, np.concatenate(batches))
+
+    # Split in two and merged
+    first, second = RunningStatistics(size= SIZE), RunningStatistics(size= SIZE)
+    first.update(np.concatenate(batches[:2]))
+    second.update(np.concatenate(batches[2:]))
+    first.merge(second)
+    assert_statistics(first, np.concatenate(batches))
+
+
+def test_repeated_merges_count_each_observation_once():
+    first, second = make_observer(1), make_observer(2)
+    observe(first, DATES[:10])
+    observe(second, DATES[:15])
+    first.merge([second])
+    observe(first, DATES[10:25])
+    observe(second, DATES[15:20])
+    first.merge([second])
+
+    expected = np.concatenate([first.sub_observer.table[:25], second.sub_observer.table[:20]])
+    for observer in [first, second]:
+        assert_statistics(observer.statistics, expected)
+    # Merging again without new observations changes nothing
+    first.merge([second])
+    assert_statistics(second.statistics, expected)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    observer = make_observer(3)
+    observe(observer, DATES[:20])
+    path = str(tmp_path / "statistics.npz")
+    observer.save(path)
+
+    loaded = make_observer(4)
+    loaded.load(path)
+    assert loaded.statistics.count == observer.statistics.count
+    assert np.array_equal(loaded.statistics.mean, observer.statistics.mean)
+    assert np.array_equal(loaded.statistics.m2, observer.statistics.m2)
+    # Loaded statistics are not merged again
+    other = make_observer(5)
+    loaded.merge([other])
+    assert loaded.statistics.count == observer.statistics.count
+
+
+def test_frozen_statistics_are_not_updated():
+    observer = make_observer(6)
+    observe(observer, DATES[:10])
+    observer.freeze()
+    state = observer.statistics.get_state()
+    obs = asyncio.run(observer.get_obs(date= DATES[10]))
+    assert observer.statistics.count == 10
+    assert np.array_equal(observer.statistics.mean, state["mean"])
+    expected = (observer.sub_observer.table[10] - state["mean"]) / np.sqrt(state["m2"] / 10 + observer.epsilon)
+    assert np.allclose(obs, np.clip(expected, -observer.clip, observer.clip), rtol= 1E-6)
+    observer.unfreeze()
+    observe(observer, DATES[11:12])
+    assert observer.statistics.count == 11
+
+
+def test_a_date_observed_again_is_not_counted_twice():
+    observer = make_observer(7)
+    observe(observer, DATES[:10])
+    observe(observer, DATES[5:10]) # e.g a RecurrentObserver observing its window again
+    observe(observer, DATES[9:12])
+    assert_statistics(observer.statistics, observer.sub_observer.table[:12])
@@ -0,0 +1,108 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytz
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from gym_trading_env2.environments import RLTradingEnv
+from gym_trading_env2.core import Asset, Pair, Value, Portfolio
+from gym_trading_env2.simulations import HistoricalSimulation
+from gym_trading_env2.exchanges import SimulationExchange
+from gym_trading_env2.managers import ExchangeManager
+from gym_trading_env2.time_managers import IntervalTimeManager
+from gym_trading_env2.actions import DiscreteActionManager, DiscreteExpositionAction
+from gym_trading_env2.observers import ExpositionObserver, RecurrentObserver
+from gym_trading_env2.rewarders import PerformanceRewarder
+from gym_trading_env2.infos_manager import InfosManager
+from gym_trading_env2.element import Mode
+
+USDT, BTC, ETH, BNB = Asset("USDT"), Asset("BTC"), Asset("ETH"), Asset("BNB")
+# ETH is valued in USDT through BTC, BNB through ETH and BTC
+PORTFOLIO = Portfolio([Value(1000, USDT), Value(0.1, BTC), Value(2, ETH), Value(-3, BNB)])
+
+
+def make_df(seed : int, price : float, n : int = 2000) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = price * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    dates = pd.date_range(datetime(2021, 1, 1), periods= n, freq= "5min")
+    return pd.DataFrame({
+        "date_open" : dates, "date_close" : dates + pd.Timedelta("5min"),
+        "open" : np.r_[close[0], close[:-1]], "high" : close * 1.001, "low" : close * 0.999, "close" : close, "volume" : rng.uniform(1, 10, n)
+    }).set_index("date_open")
+
+
+async def make_env() -> RLTradingEnv:
+    simulations = {}
+    for seed, (pair, price) in enumerate([(Pair(BTC, USDT), 30000), (Pair(ETH, BTC), 0.05), (Pair(BNB, ETH), 0.2)]):
+        simulations[pair] = HistoricalSimulation(pair= pair)
+        simulations[pair].set_df(make_df(seed, price))
+    env = RLTradingEnv(name= "test", mode= Mode.SIMULATION,
+        time_manager= IntervalTimeManager(interval= timedelta(minutes= 30), simulation_start_date= datetime(2021, 1, 2, tzinfo= pytz.UTC), simulation_end_date= datetime(2021, 1, 5, tzinfo= pytz.UTC)),
+        exchange_manager= ExchangeManager(SimulationExchange(initial_portfolio= Portfolio([Value(10000, USDT)]), pair_simulations= simulations)),
+        action_manager= DiscreteActionManager([DiscreteExpositionAction({USDT : 1.}, USDT)]),
+        observer= RecurrentObserver(ExpositionObserver([Pair(BTC, USDT)], USDT), window= 2), rewarder= PerformanceRewarder(USDT),
+        infos_manager= InfosManager([Pair(BTC, USDT)], USDT))
+    await env.reset()
+    return env
+
+
+async def quotation_valuations(env : RLTradingEnv, portfolio : Portfolio, date : datetime, quote_asset : Asset):
+    """Valuations as PortfolioManager computed them before the price vectors : one routed quotation per position"""
+    valuations = {}
+    for position in portfolio.get_positions():
+        if position.asset == quote_asset: valuations[position.asset] = position
+        else: valuations[position.asset] = position * await env.exchange_manager.get_quotation(pair= Pair(position.asset, quote_asset), date= date)
+    return valuations
+
+
+def test_valuations_match_the_routed_quotations():
+    async def run():
+        env = await make_env()
+        results = []
+        for _ in range(3):
+            date = await env.time_manager.get_current_datetime()
+            for quote_asset in [USDT, ETH, BNB]:
+                expected = await quotation_valuations(env, PORTFOLIO, date, quote_asset)
+                report = await env.portfolio_manager.report(portfolio= PORTFOLIO, date= date, quote_asset= quote_asset)
+                positions = {position.asset : await env.portfolio_manager.position_valuation(position= position, date= date, quote_asset= quote_asset) for position in PORTFOLIO.get_positions()}
+                results.append((quote_asset, expected, report.valuations, positions))
+            await env.step(0)
+        return results
+
+    for quote_asset, expected, valuations, positions in asyncio.run(run()):
+        assert set(valuations) == set(expected)
+        for asset, value in expected.items():
+            assert valuations[asset].asset == quote_asset
+            assert np.isclose(float(valuations[asset].amount), float(value.amount), rtol= 1E-9)
+        for asset, value in positions.items():
+            assert np.isclose(float(value.amount), float(expected[asset].amount), rtol= 1E-9)
+
+
+def test_report_matches_the_former_valuation_and_exposition():
+    async def run():
+        env = await make_env()
+        date = await env.time_manager.get_current_datetime()
+        results = []
+        for quote_asset in [USDT, ETH]:
+            valuations = await quotation_valuations(env, PORTFOLIO, date, quote_asset)
+            total = Value(Decimal('0'), quote_asset)
+            for value in valuations.values(): total += value
+            report = await env.portfolio_manager.report(portfolio= PORTFOLIO, date= date, quote_asset= quote_asset)
+            results.append((
+                total, {asset : value / total for asset, value in valuations.items()}, report,
+                await env.portfolio_manager.valuation(portfolio= PORTFOLIO, date= date, quote_asset= quote_asset),
+                await env.portfolio_manager.exposition(portfolio= PORTFOLIO, date= date, quote_asset= quote_asset),
+                # A copy of the same portfolio shares the memoized report
+                await env.portfolio_manager.report(portfolio= Portfolio(PORTFOLIO.get_positions()), date= date, quote_asset= quote_asset),
+            ))
+        return results
+
+    for total, expositions, report, valuation, exposition, copy_report in asyncio.run(run()):
+        assert report.total.asset == total.asset
+        assert np.isclose(float(report.total.amount), float(total.amount), rtol= 1E-9)
+        assert valuation is report.total and exposition is report.exposition and copy_report is report
+        reported = {position.asset : float(position.amount) for position in report.exposition.get_positions()}
+        assert set(reported) == set(expositions)
+        for asset, expected in expositions.items():
+            assert np.isclose(reported[asset], float(expected), rtol= 1E-9)
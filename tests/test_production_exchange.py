@@ -0,0 +1,148 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+import pytz
+
+from gym_trading_env2.environments import RLTradingEnv
+from gym_trading_env2.core import Asset, Pair, Value
+from gym_trading_env2.exchanges import BinanceProductionExchange
+from gym_trading_env2.exchanges.exchange_info import ExchangeInfoCache
+from gym_trading_env2.exchanges.replay import ReplayClient
+from gym_trading_env2.managers import ExchangeManager
+from gym_trading_env2.element import Mode
+
+USDT, BTC = Asset("USDT"), Asset("BTC")
+DATE = datetime(2021, 1, 2, tzinfo= pytz.UTC)
+EXCHANGE_INFO = {"symbols" : [{"symbol" : "BTCUSDT", "baseAsset" : "BTC", "quoteAsset" : "USDT", "filters" : [
+    {"filterType" : "LOT_SIZE", "stepSize" : "0.00001000", "minQty" : "0.00001000"},
+    {"filterType" : "NOTIONAL", "minNotional" : "5.00000000"},
+]}]}
+
+
+class FakeTimeManager:
+    def __init__(self, date : datetime, interval : timedelta = timedelta(minutes= 1)) -> None:
+        self.date, self.interval = date, interval
+
+    async def get_current_datetime(self) -> datetime:
+        return self.date
+
+    async def get_historical_datetime(self, step_back = 0, relative_date : datetime = None) -> datetime:
+        return (self.date if relative_date is None else relative_date) - self.interval * step_back
+
+
+def kline(open_time : int, close : str = "30000") -> list:
+    return [open_time, "29990", "30010", "29980", close, "5", open_time + 59_999, "150000", 10, "2", "60000", "0"]
+
+
+def record(method : str, response, **kwargs) -> dict:
+    return {"method" : method, "args" : [], "kwargs" : kwargs, "response" : response, "elapsed" : 0}
+
+
+def write_records(path, records) -> str:
+    with open(path, "w") as file:
+        for _record in records: file.write(json.dumps(_record) + "\n")
+    return str(path)
+
+
+async def make_exchange(path : str, **kwargs) -> BinanceProductionExchange:
+    exchange = BinanceProductionExchange(api_key= "", api_secret= "", client= ReplayClient(path, latency= 0), **kwargs)
+    exchange.set_trading_env(SimpleNamespace(time_manager= FakeTimeManager(DATE), mode= Mode.PRODUCTION))
+    await exchange.reset()
+    return exchange
+
+
+def test_orders_below_the_exchange_minimums_are_skipped(tmp_path):
+    last_open_time = int(DATE.timestamp() * 1E3) - 60_000
+    fill = {"price" : "30000", "qty" : "0.001", "commission" : "0.000001", "commissionAsset" : "BTC"}
+    path = write_records(tmp_path / "records.jsonl", [
+        record("get_exchange_info", EXCHANGE_INFO),
+        record("get_historical_klines", [kline(last_open_time)]),
+        record("create_margin_order", {"cummulativeQuoteQty" : "30", "fills" : [fill]}),
+    ])
+
+    async def run():
+        exchange = await make_exchange(path)
+        try:
+            responses = []
+            with pytest.warns(UserWarning, match= "minimum notional"):
+                responses.append(await exchange.market_order(quantity= Value(0.0001, BTC), pair= Pair(BTC, USDT))) # 3 USDT
+            with pytest.warns(UserWarning, match= "minimum notional"):
+                responses.append(await exchange.market_order(quantity= Value(-4, USDT), pair= Pair(BTC, USDT)))
+            responses.append(await exchange.market_order(quantity= Value(0.001, BTC), pair= Pair(BTC, USDT))) # 30 USDT
+            return responses, [call["method"] for call in exchange.client.calls]
+        finally:
+            await exchange.exchange_info.stop()
+
+    (skipped_base, skipped_quote, sent), methods = asyncio.run(run())
+    assert skipped_base is None and skipped_quote is None
+    assert sent is not None and sent.pair == Pair(BTC, USDT)
+    assert methods.count("create_margin_order") == 1
+
+
+def test_failed_exchange_info_refresh_warns_and_keeps_the_document():
+    class FailingClient:
+        def __init__(self) -> None:
+            self.nb_calls = 0
+
+        async def get_exchange_info(self):
+            self.nb_calls += 1
+            if self.nb_calls > 1: raise RuntimeError("exchange unavailable")
+            return EXCHANGE_INFO
+
+    async def run():
+        client = FailingClient()
+        cache = ExchangeInfoCache(client= client, ttl= 0.02, refresh_ratio= 0.5)
+        await cache.start()
+        with pytest.warns(UserWarning, match= "Exchange info refresh failed"):
+            while client.nb_calls < 2: await asyncio.sleep(0.005)
+            await asyncio.sleep(0)
+        await cache.stop()
+        return cache
+
+    cache = asyncio.run(run())
+    assert cache.info is EXCHANGE_INFO
+    assert cache.symbol_filters["BTCUSDT"].min_notional == 5
+
+
+def test_backfill_fetches_the_warmup_window_once_and_serves_tickers_from_the_store(tmp_path):
+    interval, warmup_steps = timedelta(minutes= 5), 3
+    end = int(DATE.timestamp() * 1E3)
+    start = end - (warmup_steps + 1) * 5 * 60_000
+    path = write_records(tmp_path / "records.jsonl", [
+        record("get_exchange_info", EXCHANGE_INFO),
+        record("get_historical_klines", [kline(open_time) for open_time in range(start, end, 60_000)]),
+    ])
+    requests_path = tmp_path / "requests.jsonl"
+
+    async def run():
+        exchange = BinanceProductionExchange(api_key= "", api_secret= "", client= ReplayClient(path, latency= 0),
+            record_path= str(requests_path), kline_store_size= 10)
+        exchange_manager = ExchangeManager(exchange)
+        env = SimpleNamespace(time_manager= FakeTimeManager(DATE, interval= interval), mode= Mode.PRODUCTION,
+            env_elements= [SimpleNamespace(history_pairs= [Pair(BTC, USDT)])], warmup_steps= warmup_steps)
+        for element in [exchange, exchange_manager]: element.set_trading_env(env)
+        try:
+            await exchange.reset()
+            await exchange_manager.reset() # Backfills the history of the warmup
+            max_bars = exchange.kline_store.max_bars
+            await exchange_manager.backfill(pairs= [Pair(BTC, USDT)], start= DATE - interval * (warmup_steps + 1), end= DATE) # Nothing missing
+            tickers = [await exchange.get_ticker(pair= Pair(BTC, USDT), date= DATE - interval * step_back) for step_back in range(warmup_steps + 1)]
+            await exchange.reset()
+            return max_bars, exchange.kline_store.max_bars, tickers
+        finally:
+            await exchange.exchange_info.stop()
+
+    max_bars, reset_max_bars, tickers = asyncio.run(run())
+    with open(requests_path) as file:
+        requests = [json.loads(line) for line in file]
+    klines_requests = [request for request in requests if request["method"] == "get_historical_klines"]
+    # The missing range is fetched once, and the tickers of the warmup are served from the store
+    assert len(klines_requests) == 1
+    assert klines_requests[0]["kwargs"]["start_str"] == start and klines_requests[0]["kwargs"]["end_str"] == end - 1
+    assert [request["method"] for request in requests] == ["get_exchange_info", "get_historical_klines"]
+    assert all(float(ticker.close.amount) == 30000 and float(ticker.volume.amount) == 25 for ticker in tickers)
+    # Enlarged for the warmup window, back to the configured size at the next reset
+    assert max_bars == (end - start) // 60_000 + 1 and reset_max_bars == 10
@@ -0,0 +1,60 @@
+import asyncio
+
+from gym_trading_env2.environments import RLTradingEnv
+from gym_trading_env2.exchanges import rate_limited_client
+from gym_trading_env2.exchanges.rate_limited_client import RateLimitedClient, get_shared_client
+from gym_trading_env2.utils.rate_limiter import RateLimiter, RateLimit
+
+MINUTE = 60_000
+START = 1_609_545_600_000 # 2021-01-02
+
+
+class FakeKlinesClient:
+    """Serve one kline per minute from START, get_klines pages like the exchange does."""
+    def __init__(self, nb_bars : int) -> None:
+        self.nb_bars = nb_bars
+        self.pages = []
+
+    async def get_klines(self, symbol, interval, startTime, limit, endTime = None):
+        self.pages.append((startTime, endTime))
+        end = START + self.nb_bars * MINUTE - 1 if endTime is None else min(endTime, START + self.nb_bars * MINUTE - 1)
+        open_times = range(max(startTime, START), end + 1, MINUTE)
+        return [[open_time, "1", "1", "1", "1", "1"] for open_time in open_times][:limit]
+
+
+class CountingRateLimiter(RateLimiter):
+    def __init__(self) -> None:
+        super().__init__(limits= [RateLimit(limit= 6_000, interval= 60)])
+        self.weights = []
+
+    async def acquire(self, weight : int = 1) -> None:
+        self.weights.append(weight)
+        await super().acquire(weight= weight)
+
+
+def test_historical_klines_acquire_the_weight_of_every_page():
+    client, rate_limiter = FakeKlinesClient(nb_bars= 2500), CountingRateLimiter()
+    rate_limited = RateLimitedClient(client= client, rate_limiter= rate_limiter)
+    klines = asyncio.run(rate_limited.get_historical_klines(symbol= "BTCUSDT", interval= "1m", start_str= START, end_str= START + 2400 * MINUTE - 1))
+
+    assert [kline[0] for kline in klines] == list(range(START, START + 2400 * MINUTE, MINUTE))
+    assert len(client.pages) == 3
+    assert rate_limiter.weights == [2, 2, 2]
+
+
+def test_shared_clients_are_created_per_event_loop(monkeypatch):
+    created = []
+    async def create(api_key, api_secret, testnet = False):
+        created.append(asyncio.get_running_loop())
+        return FakeKlinesClient(nb_bars= 0)
+    monkeypatch.setattr(rate_limited_client.AsyncClient, "create", create)
+
+    async def get_twice():
+        clients = await asyncio.gather(get_shared_client("key", "secret"), get_shared_client("key", "secret"))
+        await clients[0].get_klines(symbol= "BTCUSDT", interval= "1m", startTime= START, limit= 1)
+        return clients
+
+    first_clients, second_clients = asyncio.run(get_twice()), asyncio.run(get_twice())
+    assert first_clients[0] is first_clients[1] and second_clients[0] is second_clients[1]
+    assert first_clients[0] is not second_clients[0]
+    assert len(created) == 2 and created[0] is not created[1]
@@ -0,0 +1,82 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from typing import Dict, List, Set
+
+from gym_trading_env2.environments import RLTradingEnv
+from gym_trading_env2.core import Asset, Pair, Value
+from gym_trading_env2.managers import ExchangeManager
+from gym_trading_env2.managers.exchange import PathNotFound
+from gym_trading_env2.element import Mode
+
+A, B, C, D, E, F, G, H, X, Y = [Asset(name) for name in "ABCDEFGHXY"]
+# An odd cycle A - B - C - D - E - H - F with a branch G, so that every shortest path is unique, and a disconnected component X - Y
+PAIRS = [Pair(B, A), Pair(C, B), Pair(D, C), Pair(E, D), Pair(E, H), Pair(H, F), Pair(A, F), Pair(G, C), Pair(X, Y)]
+
+
+class FakeExchange:
+    async def get_available_pairs(self) -> List[Pair]:
+        return PAIRS
+
+
+def bfs_asset_path(graph : Dict[Asset, Set[Asset]], from_asset : Asset, to_asset : Asset) -> List[Asset]:
+    """The path search ExchangeManager ran on every order before the route table"""
+    if from_asset not in graph or to_asset not in graph: raise PathNotFound(from_asset, to_asset)
+    visited = {from_asset}
+    queue = [(from_asset, [from_asset])]
+    while queue:
+        current, path = queue.pop(0)
+        if current == to_asset: return path
+        for neighbor in graph[current]:
+            if neighbor not in visited:
+                visited.add(neighbor)
+                queue.append((neighbor, path + [neighbor]))
+    raise PathNotFound(from_asset, to_asset)
+
+
+def bfs_route(graph : Dict[Asset, Set[Asset]], pair : Pair, quantity : Value) -> List[Pair]:
+    path = bfs_asset_path(graph, from_asset= pair.asset, to_asset= pair.quote_asset)
+    if quantity.asset == pair.quote_asset: path = path[::-1]
+    return [Pair(path[i], path[i+1]) for i in range(len(path) - 1)]
+
+
+def make_exchange_manager() -> ExchangeManager:
+    exchange_manager = ExchangeManager(FakeExchange())
+    exchange_manager.set_trading_env(SimpleNamespace(time_manager= None, mode= Mode.SIMULATION))
+    asyncio.run(exchange_manager.reset())
+    return exchange_manager
+
+
+def test_route_table_matches_the_path_search():
+    exchange_manager = make_exchange_manager()
+    graph = exchange_manager.graph
+    assets = [A, B, C, D, E, F, G, H]
+    for from_asset in assets:
+        for to_asset in assets:
+            if from_asset == to_asset: continue
+            assert exchange_manager.get_asset_path(from_asset, to_asset) == bfs_asset_path(graph, from_asset, to_asset)
+            pair = Pair(from_asset, to_asset)
+            for quantity in [Value(1, from_asset), Value(-1, to_asset)]:
+                assert exchange_manager.get_route(pair= pair, quantity= quantity) == bfs_route(graph, pair, quantity)
+    # Several hops, through the shorter side of the cycle
+    assert exchange_manager.get_asset_path(G, E) == [G, C, D, E]
+    assert exchange_manager.get_asset_path(B, H) == [B, A, F, H]
+
+
+def test_route_legs_are_hops_on_listed_pairs():
+    exchange_manager = make_exchange_manager()
+    route = exchange_manager.get_route(pair= Pair(G, F), quantity= Value(1, G))
+    assert route == [Pair(G, C), Pair(C, B), Pair(B, A), Pair(A, F)]
+    assert [exchange_manager.get_exchange_pair(leg.asset, leg.quote_asset) for leg in route] == [Pair(G, C), Pair(C, B), Pair(B, A), Pair(A, F)]
+    assert exchange_manager.get_exchange_pair(F, A) == Pair(A, F)
+
+
+def test_disconnected_assets_raise_path_not_found():
+    exchange_manager = make_exchange_manager()
+    for from_asset, to_asset in [(A, X), (Y, G), (A, Asset("UNLISTED"))]:
+        with pytest.raises(PathNotFound):
+            bfs_asset_path(exchange_manager.graph, from_asset, to_asset)
+        with pytest.raises(PathNotFound):
+            exchange_manager.get_asset_path(from_asset, to_asset)
+        with pytest.raises(PathNotFound):
+            exchange_manager.get_route(pair= Pair(from_asset, to_asset), quantity= Value(1, from_asset))
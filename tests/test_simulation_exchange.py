@@ -0,0 +1,162 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+import pytz
+from datetime import datetime, timedelta
+
+from gym_trading_env2.environments import RLTradingEnv
+from gym_trading_env2.core import Asset, Pair, Value, Portfolio
+from gym_trading_env2.simulations import HistoricalSimulation
+from gym_trading_env2.exchanges import AbstractExchange, SimulationExchange, PairNotFound
+from gym_trading_env2.managers import ExchangeManager
+from gym_trading_env2.time_managers import IntervalTimeManager
+from gym_trading_env2.actions import DiscreteActionManager, DiscreteExpositionAction
+from gym_trading_env2.observers import ExpositionObserver, RecurrentObserver, MultiTickerObserver
+from gym_trading_env2.rewarders import PerformanceRewarder
+from gym_trading_env2.infos_manager import InfosManager
+from gym_trading_env2.element import Mode
+
+USDT, BTC, ETH = Asset("USDT"), Asset("BTC"), Asset("ETH")
+ORDERS = [
+    (Pair(BTC, USDT), Value(0.1, BTC)),     # Buy BTC
+    (Pair(ETH, USDT), Value(-500, USDT)),   # Spend USDT on ETH
+    (Pair(BTC, USDT), Value(-0.04, BTC)),   # Sell part of the BTC
+    (Pair(USDT, ETH), Value(100, USDT)),    # Buy USDT back with ETH
+]
+
+
+def make_df(seed : int, price : float, n : int = 2000) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = price * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    dates = pd.date_range(datetime(2021, 1, 1), periods= n, freq= "5min")
+    return pd.DataFrame({
+        "date_open" : dates, "date_close" : dates + pd.Timedelta("5min"),
+        "open" : np.r_[close[0], close[:-1]], "high" : close * 1.001, "low" : close * 0.999, "close" : close, "volume" : rng.uniform(1, 10, n)
+    }).set_index("date_open")
+
+
+class DefaultBarsExchange(SimulationExchange):
+    """SimulationExchange serving bars with the default implementations, built on get_ticker"""
+    get_bars = AbstractExchange.get_bars
+    get_tickers = AbstractExchange.get_tickers
+
+
+async def make_exchange(exchange_class = SimulationExchange) -> SimulationExchange:
+    simulations = {}
+    for seed, (pair, price) in enumerate([(Pair(BTC, USDT), 30000), (Pair(ETH, USDT), 1500)]):
+        simulations[pair] = HistoricalSimulation(pair= pair)
+        simulations[pair].set_df(make_df(seed, price))
+    exchange = exchange_class(initial_portfolio= Portfolio([Value(10000, USDT)]), pair_simulations= simulations)
+    env = RLTradingEnv(name= "test", mode= Mode.SIMULATION,
+        time_manager= IntervalTimeManager(interval= timedelta(minutes= 30), simulation_start_date= datetime(2021, 1, 2, tzinfo= pytz.UTC), simulation_end_date= datetime(2021, 1, 5, tzinfo= pytz.UTC)),
+        exchange_manager= ExchangeManager(exchange), action_manager= DiscreteActionManager([DiscreteExpositionAction({USDT : 1.}, USDT)]),
+        observer= RecurrentObserver(ExpositionObserver([Pair(BTC, USDT)], USDT), window= 2), rewarder= PerformanceRewarder(USDT),
+        infos_manager= InfosManager([Pair(BTC, USDT)], USDT))
+    await env.reset()
+    return exchange
+
+
+def positions(portfolio : Portfolio) -> dict:
+    return {position.asset : position.amount for position in portfolio.get_positions()}
+
+
+def test_market_orders_match_sequential_market_order():
+    async def run():
+        sequential_exchange, batch_exchange = await make_exchange(), await make_exchange()
+        responses = [await sequential_exchange.market_order(pair= pair, quantity= quantity) for pair, quantity in ORDERS]
+        fills = await batch_exchange.market_orders(ORDERS)
+        return responses, fills, positions(await sequential_exchange.get_portfolio()), positions(await batch_exchange.get_portfolio())
+
+    responses, fills, sequential_positions, batch_positions = asyncio.run(run())
+    assert len(fills) == len(ORDERS)
+    assert fills.pairs == [response.pair for response in responses]
+    np.testing.assert_allclose(fills.quantities, [float(response.original_quantity.amount) for response in responses])
+    np.testing.assert_allclose(fills.counterpart_quantities, [float(response.counterpart_quantity.amount) for response in responses])
+    np.testing.assert_allclose(fills.prices, [float(response.price.amount) for response in responses])
+    np.testing.assert_allclose(fills.fees, [float(response.fees.amount) for response in responses])
+    assert sequential_positions.keys() == batch_positions.keys()
+    for asset, amount in sequential_positions.items():
+        np.testing.assert_allclose(batch_positions[asset], amount, rtol= 1E-12, atol= 1E-12)
+
+
+def test_fills_round_trip_through_order_responses():
+    async def run():
+        exchange = await make_exchange()
+        return await exchange.market_orders(ORDERS)
+
+    fills = asyncio.run(run())
+    rebuilt = type(fills).from_order_responses(date= fills.date, pairs= fills.pairs, order_responses= fills.to_order_responses())
+    for column in ["quantities", "counterpart_quantities", "prices", "fees"]:
+        np.testing.assert_allclose(getattr(rebuilt, column), getattr(fills, column))
+    assert rebuilt.pairs == fills.pairs
+
+
+def ticker_bar(ticker) -> list:
+    return [float(ticker.open.amount), float(ticker.high.amount), float(ticker.low.amount), float(ticker.close.amount), float(ticker.volume.amount)]
+
+
+def test_bars_match_the_tickers_of_each_pair():
+    pairs = [Pair(ETH, USDT), Pair(BTC, USDT)]
+    async def run():
+        results = []
+        for exchange_class in [SimulationExchange, DefaultBarsExchange]:
+            exchange = await make_exchange(exchange_class)
+            env = exchange.get_trading_env()
+            observer = MultiTickerObserver(pairs)
+            observer.set_trading_env(env)
+            await observer.reset()
+            date = await env.time_manager.get_current_datetime()
+            results.append((
+                await exchange.get_bars(pairs= pairs, date= date),
+                await env.exchange_manager.get_bars(pairs= pairs, date= date),
+                await observer.get_obs(date= date),
+                [ticker_bar(await exchange.get_ticker(pair= pair, date= date)) for pair in pairs],
+            ))
+        return results
+
+    for bars, manager_bars, obs, expected in asyncio.run(run()):
+        assert bars.shape == (2, 5)
+        np.testing.assert_allclose(bars, expected, rtol= 1E-12)
+        np.testing.assert_allclose(manager_bars, expected, rtol= 1E-12)
+        np.testing.assert_allclose(obs, np.array(expected, dtype= np.float32))
+
+
+def test_bars_of_pairs_not_listed_in_this_direction_raise_pair_not_found():
+    async def run():
+        exchange = await make_exchange(DefaultBarsExchange)
+        date = await exchange.time_manager.get_current_datetime()
+        with pytest.raises(PairNotFound):
+            await exchange.get_bars(pairs= [Pair(BTC, USDT), Pair(USDT, BTC)], date= date)
+        with pytest.raises(PairNotFound):
+            await SimulationExchange.get_bars(exchange, pairs= [Pair(USDT, BTC)], date= date)
+        observer = MultiTickerObserver([Pair(USDT, BTC)])
+        observer.set_trading_env(exchange.get_trading_env())
+        with pytest.raises(PairNotFound):
+            await observer.reset()
+
+    asyncio.run(run())
+
+
+def test_tickers_match_the_tickers_of_each_pair_and_date():
+    pairs = [Pair(ETH, USDT), Pair(BTC, USDT)]
+    async def run():
+        results = []
+        for exchange_class in [SimulationExchange, DefaultBarsExchange]:
+            exchange = await make_exchange(exchange_class)
+            env = exchange.get_trading_env()
+            for _ in range(3): await env.step(0)
+            dates = [await env.time_manager.get_historical_datetime(step_back= step_back) for step_back in [4, 2, 1, 0]]
+            results.append((
+                dates,
+                await exchange.get_tickers(pairs= pairs, dates= dates),
+                await env.exchange_manager.get_tickers(pairs= pairs, dates= dates),
+                [[ticker_bar(await exchange.get_ticker(pair= pair, date= date)) for pair in pairs] for date in dates],
+            ))
+        return results
+
+    for dates, tickers, manager_tickers, expected in asyncio.run(run()):
+        for response in [tickers, manager_tickers]:
+            assert response.dates == dates and response.pairs == pairs
+            assert response.bars.shape == (4, 2, 5)
+            np.testing.assert_allclose(response.bars, expected, rtol= 1E-12)
@@ -0,0 +1,120 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytz
+from datetime import datetime, timedelta
+
+from gym_trading_env2.environments import RLTradingEnv
+from gym_trading_env2.core import Asset, Pair, Value, Portfolio
+from gym_trading_env2.simulations import HistoricalSimulation
+from gym_trading_env2.exchanges import SimulationExchange
+from gym_trading_env2.managers import ExchangeManager, StepContext
+from gym_trading_env2.time_managers import IntervalTimeManager
+from gym_trading_env2.actions import DiscreteActionManager, DiscreteExpositionAction
+from gym_trading_env2.observers import ExpositionObserver, RecurrentObserver
+from gym_trading_env2.rewarders import PerformanceRewarder
+from gym_trading_env2.infos_manager import InfosManager
+from gym_trading_env2.element import Mode
+
+USDT, BTC = Asset("USDT"), Asset("BTC")
+
+
+def make_df(seed : int, price : float, n : int = 2000) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = price * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    dates = pd.date_range(datetime(2021, 1, 1), periods= n, freq= "5min")
+    return pd.DataFrame({
+        "date_open" : dates, "date_close" : dates + pd.Timedelta("5min"),
+        "open" : np.r_[close[0], close[:-1]], "high" : close * 1.001, "low" : close * 0.999, "close" : close, "volume" : rng.uniform(1, 10, n)
+    }).set_index("date_open")
+
+
+async def make_env() -> RLTradingEnv:
+    simulation = HistoricalSimulation(pair= Pair(BTC, USDT))
+    simulation.set_df(make_df(0, 30000))
+    env = RLTradingEnv(name= "test", mode= Mode.SIMULATION,
+        time_manager= IntervalTimeManager(interval= timedelta(minutes= 30), simulation_start_date= datetime(2021, 1, 2, tzinfo= pytz.UTC), simulation_end_date= datetime(2021, 1, 5, tzinfo= pytz.UTC)),
+        exchange_manager= ExchangeManager(SimulationExchange(initial_portfolio= Portfolio([Value(10000, USDT)]), pair_simulations= {Pair(BTC, USDT) : simulation})),
+        action_manager= DiscreteActionManager([DiscreteExpositionAction({USDT : 1.}, USDT)]),
+        observer= RecurrentObserver(ExpositionObserver([Pair(BTC, USDT)], USDT), window= 2), rewarder= PerformanceRewarder(USDT),
+        infos_manager= InfosManager([Pair(BTC, USDT)], USDT))
+    await env.reset()
+    return env
+
+
+def count_calls(obj, name : str) -> list:
+    """Count the calls to the async method obj.name"""
+    calls, method = [], getattr(obj, name)
+    async def counted(*args, **kwargs):
+        calls.append(1)
+        return await method(*args, **kwargs)
+    setattr(obj, name, counted)
+    return calls
+
+
+def positions(portfolio : Portfolio):
+    return {position.asset : position.amount for position in portfolio.get_positions()}
+
+
+def check_results(results, date, portfolio, valuation, ticker):
+    for context_date, context_portfolio, context_valuation, context_exposition, context_ticker in results:
+        assert context_date == date
+        assert positions(context_portfolio) == positions(portfolio)
+        assert float(context_valuation.amount) == float(valuation.amount)
+        assert abs(sum(float(position.amount) for position in context_exposition.get_positions()) - 1) < 1E-9
+        assert context_ticker.close == ticker.close
+    assert results[1][0] is results[0][0] and results[1][1] is results[0][1] and results[1][4] is results[0][4]
+
+
+def test_step_context_matches_direct_calls_and_computes_each_fact_once():
+    async def run():
+        env = await make_env()
+        await env.step(0)
+        exchange_manager = env.exchange_manager
+        portfolio_calls, ticker_calls = count_calls(exchange_manager, "get_portfolio"), count_calls(exchange_manager, "get_ticker")
+        date_calls = count_calls(env.time_manager, "get_current_datetime")
+
+        date = await env.time_manager.get_current_datetime()
+        portfolio = await exchange_manager.get_portfolio()
+        valuation = await env.portfolio_manager.valuation(portfolio= portfolio, date= date, quote_asset= USDT)
+        ticker = await exchange_manager.get_ticker(pair= Pair(BTC, USDT), date= date)
+        all_results, all_calls = [], []
+
+        # The context of the step was already populated by the elements : a fresh one is counted
+        for context in [env.step_context, StepContext(trading_env= env)]:
+            before = len(date_calls), len(portfolio_calls), len(ticker_calls)
+            results = []
+            for _ in range(3):
+                results.append((
+                    await context.get_date(), await context.get_portfolio(), await context.get_valuation(quote_asset= USDT),
+                    await context.get_exposition(quote_asset= USDT), await context.get_ticker(pair= Pair(BTC, USDT)),
+                ))
+            all_results.append(results)
+            all_calls.append((len(date_calls) - before[0], len(portfolio_calls) - before[1], len(ticker_calls) - before[2]))
+        return (date, portfolio, valuation, ticker), all_results, all_calls
+
+    (date, portfolio, valuation, ticker), all_results, (step_calls, fresh_calls) = asyncio.run(run())
+    assert step_calls == (0, 0, 0)
+    assert fresh_calls == (1, 1, 1) # Each fact is computed once, on first use
+    for results in all_results:
+        check_results(results, date, portfolio, valuation, ticker)
+
+
+def test_step_context_fetches_the_portfolio_again_after_orders():
+    async def run():
+        env = await make_env()
+        context = env.step_context
+        before = await context.get_portfolio()
+        valuation_before = await context.get_valuation(quote_asset= USDT)
+        await env.exchange_manager.market_order(quantity= Value(0.1, BTC), pair= Pair(BTC, USDT))
+        after = await context.get_portfolio()
+        date_before = await context.get_date()
+        await env.step(0)
+        return before, after, valuation_before, date_before, env.step_context is context, await env.step_context.get_date()
+
+    before, after, valuation_before, date_before, same_context, date_after = asyncio.run(run())
+    assert BTC not in positions(before)
+    assert abs(positions(after)[BTC] - 0.1) < 1E-12
+    assert float(valuation_before.amount) == 10000
+    # The env creates a new context when the time manager moves
+    assert not same_context and date_after > date_before
@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+
+from gym_trading_env2.utils.step_memo import StepMemo
+
+
+def test_concurrent_calls_share_a_single_computation():
+    memo, calls = StepMemo(), []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def run():
+        return await asyncio.gather(*[memo.get("key", compute) for _ in range(3)])
+
+    assert asyncio.run(run()) == [42, 42, 42]
+    assert len(calls) == 1 and memo.inflight == {}
+
+
+def test_errors_are_shared_and_not_memoized():
+    memo = StepMemo()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("failed")
+
+    async def run():
+        return await asyncio.gather(memo.get("key", fail), memo.get("key", fail), return_exceptions= True)
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(run()))
+    assert memo.inflight == {} and memo.values == {}
+
+
+def test_cancelled_owner_does_not_block_the_waiters():
+    memo, calls = StepMemo(), []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def run():
+        owner = asyncio.create_task(memo.get("key", compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(memo.get("key", compute))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError): await owner
+        # The waiter computes the value again instead of waiting forever, or being cancelled with the owner
+        return await asyncio.wait_for(waiter, timeout= 1)
+
+    assert asyncio.run(run()) == 42
+    assert len(calls) == 2
+    assert memo.inflight == {} and memo.values == {"key" : 42}
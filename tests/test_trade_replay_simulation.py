@@ -0,0 +1,78 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytz
+from datetime import datetime
+from types import SimpleNamespace
+
+from gym_trading_env2.core import Asset, Pair
+from gym_trading_env2.simulations import TradeReplaySimulation
+from gym_trading_env2.element import Mode
+
+USDT, BTC = Asset("USDT"), Asset("BTC")
+START = datetime(2021, 1, 1, tzinfo= pytz.UTC)
+
+
+class FakeTimeManager:
+    def __init__(self, date : datetime) -> None:
+        self.date = date
+
+    async def get_current_datetime(self) -> datetime:
+        return self.date
+
+
+def make_trades(nb_trades : int = 2000):
+    """Trades over 10 hours, with a 2 hours hole (empty bars)."""
+    rng = np.random.default_rng(0)
+    seconds = np.sort(rng.integers(0, 10 * 3600, nb_trades))
+    seconds = seconds[(seconds < 3 * 3600) | (seconds >= 5 * 3600)]
+    timestamps = int(START.timestamp()) + seconds
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, len(seconds))))
+    sizes = rng.uniform(0.1, 2, len(seconds))
+    return timestamps, prices, sizes
+
+
+def resample(timestamps : np.ndarray, prices : np.ndarray, sizes : np.ndarray, interval : str) -> pd.DataFrame:
+    """Bars [date - interval, date) built by pandas, the empty ones forward filled with the previous close."""
+    trades = pd.DataFrame({"price" : prices, "size" : sizes}, index= pd.to_datetime(timestamps, unit= "s", utc= True))
+    bars = trades["price"].resample(interval, closed= "left", label= "right").ohlc()
+    bars["volume"] = trades["size"].resample(interval, closed= "left", label= "right").sum()
+    bars["close"] = bars["close"].ffill()
+    for column in ["open", "high", "low"]: bars[column] = bars[column].fillna(bars["close"])
+    return bars
+
+
+def test_aggregate_matches_pandas_resample():
+    timestamps, prices, sizes = make_trades()
+    simulation = TradeReplaySimulation(pair= Pair(BTC, USDT), timestamps= timestamps, prices= prices, sizes= sizes, timestamp_unit= "s")
+    expected = resample(timestamps, prices, sizes, "15min")
+
+    bound_dates = expected.index.insert(0, expected.index[0] - pd.Timedelta("15min")).tz_localize(None).to_numpy().astype(simulation.timestamps.dtype)
+    bars = simulation.aggregate(bounds= np.searchsorted(simulation.timestamps, bound_dates, side= "left"))
+    for column in ["open", "high", "low", "close", "volume"]:
+        np.testing.assert_allclose(bars[column], expected[column].to_numpy(), err_msg= column)
+    assert (bars["nb_trades"] == 0).sum() >= 7 # The hole is forward filled
+
+
+def test_forward_matches_pandas_resample():
+    timestamps, prices, sizes = make_trades()
+    simulation = TradeReplaySimulation(pair= Pair(BTC, USDT), timestamps= timestamps, prices= prices, sizes= sizes, timestamp_unit= "s")
+    expected = resample(timestamps, prices, sizes, "30min")
+    start, expected = expected.index[0].to_pydatetime(), expected.iloc[1:]
+
+    async def run():
+        simulation.set_trading_env(SimpleNamespace(time_manager= FakeTimeManager(start), mode= Mode.SIMULATION))
+        await simulation.__reset__()
+        for date in expected.index: await simulation.__forward__(date.to_pydatetime())
+
+    asyncio.run(run())
+    array = simulation.get_data_array([date.to_pydatetime() for date in expected.index])
+    np.testing.assert_allclose(array, expected[["open", "high", "low", "close", "volume"]].to_numpy())
+
+
+def test_non_int64_timestamps_are_converted():
+    timestamps, prices, sizes = make_trades()
+    int64_simulation = TradeReplaySimulation(pair= Pair(BTC, USDT), timestamps= timestamps.astype(np.int64), prices= prices, sizes= sizes, timestamp_unit= "s")
+    int32_simulation = TradeReplaySimulation(pair= Pair(BTC, USDT), timestamps= timestamps.astype(np.int32), prices= prices, sizes= sizes, timestamp_unit= "s")
+    np.testing.assert_array_equal(int32_simulation.timestamps, int64_simulation.timestamps)
+    assert int32_simulation.timestamps[0] == np.datetime64(START.replace(tzinfo= None), "s") + np.timedelta64(int(timestamps[0]) - int(START.timestamp()), "s")
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import time
+from decimal import Decimal
+
+import pytest
+import websockets
+
+from gym_trading_env2.exchanges.user_data_stream import PortfolioMirror, BinanceUserDataStream
+
+
+def now_ms() -> int:
+    return int(time.time() * 1E3)
+
+
+def trade_event(event_time : int, side = "BUY", quantity = "0.01", quote_quantity = "500") -> dict:
+    return {"e" : "executionReport", "E" : event_time, "s" : "BTCUSDT", "x" : "TRADE", "S" : side,
+            "l" : quantity, "Y" : quote_quantity, "n" : "0.00001", "N" : "BTC"}
+
+
+def balance_event(event_time : int, asset = "USDT", delta = "10") -> dict:
+    return {"e" : "balanceUpdate", "E" : event_time, "a" : asset, "d" : delta}
+
+
+class FakeClient:
+    """Margin account served from `account`, optionally slowed down to let events arrive during the snapshot."""
+    def __init__(self, account : dict, delay : float = 0, listen_key_errors : int = 0) -> None:
+        self.account = account
+        self.delay = delay
+        self.listen_key_errors = listen_key_errors
+        self.nb_snapshots = 0
+
+    async def margin_stream_get_listen_key(self):
+        if self.listen_key_errors > 0:
+            self.listen_key_errors -= 1
+            raise RuntimeError("listen key rejected")
+        return {"listenKey" : "KEY"}
+
+    async def get_margin_account(self, **kwargs):
+        self.nb_snapshots += 1
+        account = {asset : str(amount) for asset, amount in self.account.items()}
+        await asyncio.sleep(self.delay)
+        return {"userAssets" : [
+            {"asset" : asset, "free" : amount, "borrowed" : "0", "interest" : "0"} for asset, amount in account.items()
+        ]}
+
+
+async def wait_for(condition, timeout = 3):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline: raise TimeoutError()
+        await asyncio.sleep(0.01)
+
+
+async def run_stream(client, send_events, **kwargs):
+    """Serve send_events(websocket) from a local stand-in, and return the mirror once the handler is done."""
+    done = asyncio.Event()
+    async def handler(websocket):
+        await send_events(websocket)
+        done.set()
+        await websocket.wait_closed()
+
+    async with websockets.serve(handler, "localhost", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        mirror = PortfolioMirror(symbols= {"BTCUSDT" : ("BTC", "USDT")})
+        stream = BinanceUserDataStream(client= client, mirror= mirror, url= f"ws://localhost:{port}/ws",
+            reconciliation_interval= 60, reconnect_delay= 0.05, reconciliation_retry_delay= 0.05, **kwargs)
+        await stream.start()
+        try:
+            await asyncio.wait_for(done.wait(), timeout= 3)
+            await wait_for(lambda : stream.is_live)
+        finally:
+            await stream.stop()
+    return mirror, stream
+
+
+def test_events_after_the_snapshot_are_applied():
+    client = FakeClient(account= {"USDT" : Decimal("1000"), "BTC" : Decimal("0")})
+
+    async def send_events(websocket):
+        await asyncio.sleep(0.1) # After the snapshot
+        await websocket.send(json.dumps(trade_event(now_ms() + 5000)))
+        await websocket.send(json.dumps(balance_event(now_ms() + 5000)))
+
+    mirror, stream = asyncio.run(run_stream(client, send_events))
+    assert mirror.positions["BTC"] == Decimal("0.01") - Decimal("0.00001")
+    assert mirror.positions["USDT"] == Decimal("1000") - Decimal("500") + Decimal("10")
+    assert client.nb_snapshots == 1
+
+
+def test_events_during_the_snapshot_are_not_counted_twice():
+    # The snapshot is taken once the trade is done : it already includes it
+    client = FakeClient(account= {"USDT" : Decimal("500"), "BTC" : Decimal("0.01")}, delay= 0.2)
+
+    async def send_events(websocket):
+        await asyncio.sleep(0.05) # While the first snapshot is requested
+        await websocket.send(json.dumps(trade_event(now_ms(), quantity= "0.01", quote_quantity= "500") | {"n" : "0", "N" : None}))
+
+    mirror, stream = asyncio.run(run_stream(client, send_events))
+    assert mirror.positions == {"USDT" : Decimal("500"), "BTC" : Decimal("0.01")}
+    assert client.nb_snapshots >= 2 # The ambiguous event made the mirror take a new snapshot
+
+
+def test_stream_reconnects_after_an_error():
+    client = FakeClient(account= {"USDT" : Decimal("1000")}, listen_key_errors= 1)
+
+    async def send_events(websocket):
+        pass
+
+    with pytest.warns(UserWarning, match= "listen key rejected"):
+        mirror, stream = asyncio.run(run_stream(client, send_events))
+    assert mirror.positions == {"USDT" : Decimal("1000")}
+
+
+def test_mirror_drops_buffered_events_included_in_the_snapshot():
+    mirror = PortfolioMirror(symbols= {"BTCUSDT" : ("BTC", "USDT")}, event_time_tolerance= 100)
+    mirror.begin_reconciliation(request_time= 10_000)
+    mirror.handle_message(balance_event(5_000, delta= "1"))   # Before the request : in the snapshot
+    mirror.handle_message(balance_event(20_000, delta= "2"))  # After the response : applied
+    assert mirror.positions == {} # Buffered until the snapshot
+
+    assert mirror.end_reconciliation({"USDT" : Decimal("100")}, response_time= 11_000)
+    assert mirror.positions == {"USDT" : Decimal("102")}
+    assert mirror.is_reconciled
+
+
+def test_mirror_is_not_reconciled_with_ambiguous_events():
+    mirror = PortfolioMirror(symbols= {"BTCUSDT" : ("BTC", "USDT")}, event_time_tolerance= 100)
+    mirror.begin_reconciliation(request_time= 10_000)
+    mirror.handle_message(balance_event(10_500, delta= "1")) # Between the request and the response
+
+    assert not mirror.end_reconciliation({"USDT" : Decimal("100")}, response_time= 11_000)
+    assert not mirror.is_reconciled
+
+
+def test_failed_keepalive_warns_and_is_retried():
+    class FailingKeepaliveClient(FakeClient):
+        def __init__(self) -> None:
+            super().__init__(account= {})
+            self.nb_keepalives = 0
+
+        async def margin_stream_keepalive(self, listenKey):
+            self.nb_keepalives += 1
+            raise RuntimeError("listen key expired")
+
+    async def run():
+        client = FailingKeepaliveClient()
+        stream = BinanceUserDataStream(client= client, mirror= PortfolioMirror(), reconciliation_interval= 0.01, keepalive_interval= 0.01)
+        stream.listen_key = "KEY"
+        task = asyncio.create_task(stream._maintain())
+        with pytest.warns(UserWarning, match= "maintenance failed"):
+            await wait_for(lambda: client.nb_keepalives >= 2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError): await task
+
+    asyncio.run(run())
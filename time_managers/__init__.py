@@ -1,2 +1,3 @@
 from .time_manager import AbstractTimeManager
-from .interval_time_manager import IntervalTimeManager
\ No newline at end of file
+from .interval_time_manager import IntervalTimeManager
+from .clock import WallClock, AcceleratedClock
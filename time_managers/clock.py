@@ -0,0 +1,32 @@
+import asyncio
+import time
+import pytz
+from datetime import datetime, timedelta
+
+
+class WallClock:
+    """Real time clock used in PRODUCTION mode."""
+    def now(self) -> datetime:
+        return datetime.now(pytz.UTC)
+
+    async def sleep(self, delay : float) -> None:
+        await asyncio.sleep(delay)
+
+
+class AcceleratedClock(WallClock):
+    """
+    Clock starting at start_date and running speed times faster than real time.
+    Combined with a replayed exchange, it lets the PRODUCTION code path run offline,
+    e.g to measure decision latency without waiting for real bars to close.
+    """
+    def __init__(self, start_date : datetime, speed : float = 1) -> None:
+        if speed <= 0: raise ValueError("speed must be positive.")
+        self.start_date = start_date
+        self.speed = speed
+        self._start_time = time.perf_counter()
+
+    def now(self) -> datetime:
+        return self.start_date + timedelta(seconds= (time.perf_counter() - self._start_time) * self.speed)
+
+    async def sleep(self, delay : float) -> None:
+        await asyncio.sleep(delay / self.speed)
@@ -4,15 +4,20 @@ import numpy as np
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
 from typing import Tuple
+from collections import deque
 
 
 from .time_manager import AbstractTimeManager
+from .clock import WallClock
 from ..checkers import AbstractChecker
 from ..element import Mode
 
 class IntervalTimeManager(AbstractTimeManager, AbstractChecker):
-    def __init__(self, interval : timedelta, base_offset : timedelta = None, i_offset = None, simulation_start_date : datetime = None, simulation_end_date : datetime = None) -> None:
+    def __init__(self, interval : timedelta, base_offset : timedelta = None, i_offset = None, simulation_start_date : datetime = None, simulation_end_date : datetime = None, clock : WallClock = None) -> None:
         self.interval = interval
+        self.clock = clock if clock is not None else WallClock()
+        # Time (in clock seconds) elapsed between a bar close and the end of the step that processed it (PRODUCTION mode only)
+        self.decision_latencies = deque(maxlen= 10_000)
         self.base_offset = base_offset
         self.i_offset = i_offset
         self.simulation_start_date = simulation_start_date
@@ -34,7 +39,7 @@ class IntervalTimeManager(AbstractTimeManager, AbstractChecker):
                 self.__current_datetime = self.simulation_start_date
             
         elif self.mode.value == Mode.PRODUCTION.value:
-            self.__current_datetime = datetime.now(pytz.UTC)
+            self.__current_datetime = self.clock.now()
 
         self.__current_datetime = floor_time(self.__current_datetime, self.interval, self._random_offset())
         
@@ -48,12 +53,16 @@ class IntervalTimeManager(AbstractTimeManager, AbstractChecker):
         return relative_date - self.interval * step_back
     
     async def step(self):
+        if self.mode.value == Mode.PRODUCTION.value:
+            now = self.clock.now()
+            self.decision_latencies.append((now - self.__current_datetime).total_seconds())
+
         self.__current_datetime = await self.get_current_datetime() + self.interval
         
         if self.mode.value == Mode.PRODUCTION.value:
-            delay = (self.__current_datetime - datetime.now(pytz.UTC)).total_seconds()
+            delay = (self.__current_datetime - now).total_seconds()
             print(f"Waiting {delay:0.2f} sec...")
-            await asyncio.sleep(delay= delay)
+            await self.clock.sleep(delay)
 
     async def check(self) -> Tuple[bool, bool]:
         if self.mode.value == Mode.SIMULATION.value:
@@ -0,0 +1,162 @@
+import hashlib
+import os
+import tempfile
+import time
+import numpy as np
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Callable
+
+
+def code_fingerprint(code) -> str:
+    """Fingerprint of a code object that does not depend on the process (nested code objects are fingerprinted recursively)."""
+    parts = [code.co_code.hex(), repr(code.co_names)]
+    for const in code.co_consts:
+        if hasattr(const, "co_code"): parts.append(code_fingerprint(const))
+        elif isinstance(const, frozenset): parts.append(repr(sorted(const, key= repr))) # The order of a set depends on the hash seed
+        else: parts.append(repr(const))
+    return "|".join(parts)
+
+
+def function_fingerprint(func : Callable) -> str:
+    """
+    Fingerprint of a feature function : its code, its default arguments and the values it closes over
+    (e.g the parameters given to a factory function), hashed by content (see fingerprint). Module globals it reads are not included.
+    """
+    if hasattr(func, "func"): # functools.partial
+        return "partial|" + fingerprint(func.func, func.args, func.keywords)
+    code = getattr(func, "__code__", None)
+    if code is None: raise TypeError(f"Can not fingerprint {func!r} : only python functions and functools.partial are supported.")
+    closure = [cell.cell_contents for cell in func.__closure__] if func.__closure__ else []
+    return code_fingerprint(code) + "|" + fingerprint(func.__defaults__, func.__kwdefaults__, closure)
+
+
+# Types whose repr is exact and does not depend on the process
+_REPR_TYPES = (type(None), bool, int, float, complex, str, bytes, Decimal, date, timedelta, np.generic, np.dtype)
+
+def _update_fingerprint(sha, part) -> None:
+    if isinstance(part, np.ndarray):
+        if part.dtype.hasobject: raise TypeError("Can not fingerprint an array of objects by content.")
+        sha.update(repr(("ndarray", part.dtype.str, part.shape)).encode())
+        sha.update(np.ascontiguousarray(part).view(np.uint8).data)
+    elif isinstance(part, (tuple, list)):
+        sha.update(f"{type(part).__name__}({len(part)})".encode())
+        for item in part: _update_fingerprint(sha, item)
+    elif isinstance(part, dict):
+        sha.update(f"dict({len(part)})".encode())
+        for key, value in sorted(part.items(), key= lambda item : repr(item[0])):
+            _update_fingerprint(sha, key)
+            _update_fingerprint(sha, value)
+    elif isinstance(part, _REPR_TYPES):
+        sha.update(repr(part).encode())
+    elif callable(part):
+        sha.update(f"function({function_fingerprint(part)})".encode())
+    else:
+        # Other reprs may be truncated or contain memory addresses : the fingerprint would not follow the content
+        raise TypeError(f"Can not fingerprint {type(part).__name__} objects by content : use numpy arrays, python scalars, strings, or tuples, lists and dicts of them.")
+    sha.update(b"\x00")
+
+
+def fingerprint(*parts) -> str:
+    """
+    sha256 of the given parts, by content : numpy arrays by their bytes, tuples, lists and dicts item by item,
+    functions by function_fingerprint, scalars and strings by repr. Raises TypeError for any other object.
+    """
+    sha = hashlib.sha256()
+    for part in parts: _update_fingerprint(sha, part)
+    return sha.hexdigest()
+
+
+class FeatureCache:
+    """
+    Content-addressed on-disk cache of feature arrays, shared by every process using the same directory.
+        - Arrays are stored as .npy files named after their key, and loaded memory-mapped (read only).
+        - Writes are atomic (temporary file + os.replace) : readers never see a partial file.
+        - A lock file lets a single process compute a missing array while the others wait for it.
+        - Once the cache exceeds max_size bytes, the least recently used files are evicted.
+
+    Parameters
+    ----------
+    path : str
+        Cache directory (created if needed).
+    max_size : int
+        Size cap of the cache, in bytes.
+    lock_timeout : float
+        Seconds after which a lock is considered stale (its owner probably died) and is ignored.
+    """
+    def __init__(self, path : str, max_size : int = 10 * 1024**3, lock_timeout : float = 600) -> None:
+        self.path = path
+        self.max_size = max_size
+        self.lock_timeout = lock_timeout
+        os.makedirs(self.path, exist_ok= True)
+
+    def _file(self, key : str) -> str:
+        return os.path.join(self.path, f"{key}.npy")
+
+    def load(self, key : str):
+        """Return the memory-mapped array of key, or None if it is not in the cache."""
+        file = self._file(key)
+        try:
+            array = np.load(file, mmap_mode= "r")
+        except (FileNotFoundError, ValueError):
+            return None
+        try: os.utime(file) # Mark as recently used
+        except OSError: pass
+        return array
+
+    def save(self, key : str, array : np.ndarray) -> None:
+        file_descriptor, temporary_file = tempfile.mkstemp(dir= self.path, suffix= ".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                np.save(file, np.ascontiguousarray(array))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary_file, self._file(key))
+        except BaseException as e:
+            if os.path.exists(temporary_file): os.remove(temporary_file)
+            raise e
+        self.evict(keep= key)
+
+    def get_or_compute(self, key : str, compute : Callable[[], np.ndarray], poll_interval : float = 0.1) -> np.ndarray:
+        """Load the array of key, or compute and store it. If another process is already computing it, wait for its result."""
+        lock_file = os.path.join(self.path, f"{key}.lock")
+        while True:
+            array = self.load(key)
+            if array is not None: return array
+            try:
+                os.close(os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_file) > self.lock_timeout: os.remove(lock_file)
+                except FileNotFoundError: pass
+                time.sleep(poll_interval)
+                continue
+            try:
+                # Another process may have finished between our load and our lock
+                array = self.load(key)
+                if array is not None: return array
+                array = compute()
+                self.save(key, array)
+                return array
+            finally:
+                try: os.remove(lock_file)
+                except FileNotFoundError: pass
+
+    def evict(self, keep : str = None) -> None:
+        """Remove the least recently used files until the cache fits in max_size. The file of keep (e.g just saved) is never removed."""
+        entries = []
+        with os.scandir(self.path) as iterator:
+            for entry in iterator:
+                if not entry.name.endswith(".npy") or entry.name == f"{keep}.npy": continue
+                try: stat = entry.stat()
+                except FileNotFoundError: continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size = sum(size for _, size, _ in entries)
+        if keep is not None:
+            try: total_size += os.path.getsize(self._file(keep))
+            except FileNotFoundError: pass
+        for _, size, file in sorted(entries):
+            if total_size <= self.max_size: break
+            try: os.remove(file) # Memory-mapped readers keep their data until they close it
+            except FileNotFoundError: pass
+            total_size -= size
@@ -0,0 +1,81 @@
+import asyncio
+import re
+import time
+import weakref
+from typing import Dict, List, Tuple
+
+INTERVAL_UNITS = {"s" : 1, "m" : 60, "h" : 3_600, "d" : 86_400}
+
+
+class RateLimit:
+    """
+    At most `limit` weight per fixed window of `interval` seconds (windows are aligned on the epoch, as Binance does).
+    """
+    def __init__(self, limit : int, interval : float) -> None:
+        self.limit = limit
+        self.interval = interval
+        self.used = 0
+        self.window_start = 0
+
+    def _roll(self, now : float) -> None:
+        window_start = now - now % self.interval
+        if window_start != self.window_start:
+            self.window_start = window_start
+            self.used = 0
+
+    def wait_time(self, weight : int, now : float) -> float:
+        """Seconds to wait before weight can be consumed (a request heavier than the limit only waits for an empty window)."""
+        self._roll(now)
+        if self.used == 0 or self.used + weight <= self.limit: return 0
+        return self.window_start + self.interval - now
+
+    def consume(self, weight : int, now : float) -> None:
+        self._roll(now)
+        self.used += weight
+
+
+class RateLimiter:
+    """
+    Weight-aware rate limiter shared by every request sent to the same server.
+    Requests queue (in FIFO order) until every window has enough capacity, instead of failing.
+    The usage reported by the server (e.g X-MBX-USED-WEIGHT-1M headers) takes precedence over the local count.
+    """
+    shared_instances : Dict[str, "RateLimiter"] = {}
+
+    def __init__(self, limits : List[RateLimit]) -> None:
+        self.limits = limits
+        self.blocked_until = 0
+        # Shared instances may be used from several event loops : an asyncio.Lock is bound to one of them
+        self._locks : "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def get_shared(cls, key : str, limits : List[Tuple[int, float]]) -> "RateLimiter":
+        """Return the limiter of the process registered under key, creating it with limits [(limit, interval), ...] if needed."""
+        if key not in cls.shared_instances:
+            cls.shared_instances[key] = cls(limits = [RateLimit(limit= limit, interval= interval) for limit, interval in limits])
+        return cls.shared_instances[key]
+
+    async def acquire(self, weight : int = 1) -> None:
+        async with self._locks.setdefault(asyncio.get_running_loop(), asyncio.Lock()):
+            while True:
+                now = time.time()
+                wait = max([self.blocked_until - now] + [limit.wait_time(weight, now) for limit in self.limits])
+                if wait <= 0: break
+                await asyncio.sleep(wait)
+            for limit in self.limits:
+                limit.consume(weight, now)
+
+    def block(self, seconds : float) -> None:
+        """Stop sending requests for some seconds (e.g after a 429 response with a Retry-After header)."""
+        self.blocked_until = max(self.blocked_until, time.time() + seconds)
+
+    def update_from_headers(self, headers) -> None:
+        now = time.time()
+        for key, value in headers.items():
+            match = re.fullmatch(r"x-(?:mbx|sapi)-used(?:-ip)?-weight-(\d+)([smhd])", key.lower())
+            if match is None: continue
+            interval = int(match.group(1)) * INTERVAL_UNITS[match.group(2)]
+            for limit in self.limits:
+                if limit.interval == interval:
+                    limit._roll(now)
+                    limit.used = max(limit.used, int(value))
@@ -0,0 +1,71 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class StepMemo:
+    """
+    Memoize the results of coroutines within a scope (e.g the date of the current step and a market data version).
+    Setting a new scope drops every entry. Concurrent calls with the same key share a single computation.
+
+    Unlike utils.async_lru.AsyncLRUCache, no lock is taken : the dictionaries are only read and written
+    between two awaits, which the event loop never interleaves.
+    """
+    def __init__(self) -> None:
+        self.scope = None
+        self.values : Dict[Hashable, Any] = {}
+        self.inflight : Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def set_scope(self, scope : Hashable) -> None:
+        if scope != self.scope:
+            self.scope = scope
+            self.clear()
+
+    def clear(self) -> None:
+        self.values.clear()
+        self.inflight.clear()
+
+    async def get(self, key : Hashable, coro_factory : Callable[[], Awaitable]) -> Any:
+        if key in self.values:
+            self.hits += 1
+            return self.values[key]
+        if key in self.inflight:
+            self.hits += 1
+            future = self.inflight[key]
+            await asyncio.wait([future]) # Unlike await future, only raises CancelledError if this caller is cancelled
+            if future.cancelled(): # The owner was cancelled : compute it again
+                return await self.get(key, coro_factory)
+            return future.result()
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            value = await coro_factory()
+        except BaseException as e: # Including the cancellation of the owner : the future must not stay pending
+            if self.inflight.get(key) is future: del self.inflight[key]
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception() # Retrieved : no warning if nobody else was waiting
+            raise e
+
+        # The scope may have changed while we were waiting : the value is then not stored
+        if self.inflight.get(key) is future:
+            del self.inflight[key]
+            self.values[key] = value
+        future.set_result(value)
+        return value
+
+    @property
+    def hit_rate(self) -> float:
+        calls = self.hits + self.misses
+        return self.hits / calls if calls > 0 else 0
+
+    def get_stats(self) -> Dict[str, float]:
+        return {"hits" : self.hits, "misses" : self.misses, "hit_rate" : self.hit_rate}
+
+    def reset_stats(self) -> None:
+        self.hits, self.misses = 0, 0